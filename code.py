@@ -19,13 +19,4342 @@ except ValueError:
         exit(1)
 
 from gi.repository import WebKit2
-from gi.repository import Gtk, Gdk, Vte, GLib, Pango
+from gi.repository import Gtk, Gdk, Vte, GLib, Pango, Gio
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import sqlite3, queue, hashlib, socket, json, struct, errno, mmap, bisect, shutil, contextlib, collections, urllib.request
+import shlex, gzip, tempfile
+
+# Optional: only needed for the multi-UE scale mode
+try:
+    import zmq
+except ImportError:
+    zmq = None
+try:
+    import numpy as np
+except ImportError:
+    np = None
+# Optional: capture compression falls back to the zstd CLI
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 PLAY_SYMBOL = "\u25B6"  # ▶
 STOP_SYMBOL = "\u25A0"   # ■
 
+GNB_CONFIG_PATH = "/home/student/Downloads/gnb_zmq.yaml"
+UE_CONFIG_PATH = "/home/student/Downloads/ue_zmq.conf"
+
+CORE_IPERF_LOG = "/tmp/srs_core_iperf.log"
+UE_IPERF_LOG = "/tmp/srs_ue_iperf.log"
+
+METRICS_EXPORTER_PORT = 9877       # opt-in scrape endpoint, see APP_SETTINGS_DEFAULTS
+
+
+def get_real_user_home():
+    # The GUI usually runs under sudo; files we create belong in the invoking user's home
+    sudo_user = os.environ.get('SUDO_USER')
+    if sudo_user:
+        return os.path.expanduser(f'~{sudo_user}')
+    return os.path.expanduser('~')
+
+
+def chown_to_real_user(path):
+    # Hand files created as root back to the user who launched the GUI
+    sudo_user = os.environ.get('SUDO_USER')
+    if not sudo_user:
+        return
+    try:
+        import pwd
+        pw = pwd.getpwnam(sudo_user)
+        os.chown(path, pw.pw_uid, pw.pw_gid)
+    except Exception:
+        pass
+
+
+def get_app_data_dir():
+    path = os.path.join(get_real_user_home(), ".local", "share", "srsran_gui")
+    if not os.path.isdir(path):
+        try:
+            os.makedirs(path, exist_ok=True)
+            chown_to_real_user(path)
+        except Exception:
+            pass
+    return path
+
+
+APP_SETTINGS_DEFAULTS = {
+    "grafana_enabled": True,       # Grafana container alongside the native metrics view
+    "metrics_exporter_enabled": False,
+    "metrics_exporter_port": METRICS_EXPORTER_PORT,
+    "process_logs_enabled": True,  # tee core/gNB/UE/Grafana/tshark output to rotating logs
+    "process_log_compress": True,
+    "terminal_pool_size": 2,       # pre-spawned shells kept ready for new tabs (0 disables the pool)
+    "tab_memory_budget_mb": 256,   # MiB; read-only tabs beyond this are closed, least recently viewed first
+    "gnb_metrics_host": "127.0.0.1",  # 0.0.0.0 accepts gNB metrics from other machines too
+}
+
+
+def load_app_settings():
+    settings = dict(APP_SETTINGS_DEFAULTS)
+    try:
+        with open(os.path.join(get_app_data_dir(), "settings.json")) as f:
+            stored = json.load(f)
+        if isinstance(stored, dict):
+            settings.update(stored)
+    except (OSError, ValueError):
+        pass
+    return settings
+
+
+def save_app_settings(settings):
+    path = os.path.join(get_app_data_dir(), "settings.json")
+    try:
+        with open(path + ".tmp", 'w') as f:
+            json.dump(settings, f, indent=2)
+        os.replace(path + ".tmp", path)
+        chown_to_real_user(path)
+    except OSError as e:
+        print(f"Could not save settings: {e}")
+
+
+def parse_iperf_summary(log_path):
+    """
+    Extracts the final sender/receiver bitrates (in Mbit/s) from an iperf3 text log.
+    Returns a list of (role, mbps) tuples, empty if the test never finished.
+    """
+    scale = {'': 1e-6, 'K': 1e-3, 'M': 1.0, 'G': 1e3}
+    pattern = re.compile(r'([\d.]+)\s+([KMG]?)bits/sec.*\b(sender|receiver)\s*$')
+    results = {}
+    try:
+        with open(log_path, 'r', errors='ignore') as f:
+            for line in f:
+                m = pattern.search(line.rstrip())
+                if m:
+                    # Later summaries overwrite earlier ones (iperf3 -s prints one per test)
+                    results[m.group(3)] = float(m.group(1)) * scale[m.group(2)]
+    except OSError:
+        pass
+    return sorted(results.items())
+
+
+# -----------------------------------------------------------------------------
+# PROMETHEUS / OPENMETRICS EXPORTER
+# -----------------------------------------------------------------------------
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render_metrics(families, openmetrics=False):
+    """
+    Renders [(name, type, help, [(labels dict, value)])] in the Prometheus
+    text format, or OpenMetrics (counter families without '_total', '# EOF').
+    """
+    lines = []
+    for name, mtype, help_text, samples in families:
+        family = name[:-6] if openmetrics and mtype == "counter" and name.endswith("_total") else name
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {mtype}")
+        for labels, value in samples:
+            label_text = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                                  for k, v in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    if openmetrics:
+        lines.append("# EOF")
+    return ("\n".join(lines) + "\n").encode()
+
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+        body = self.server.exporter.payload(openmetrics)
+        self.send_response(200)
+        self.send_header("Content-Type", OPENMETRICS_CONTENT_TYPE if openmetrics else PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class MetricsExporter:
+    """
+    Scrape endpoint on its own thread. publish() renders the payloads once
+    and swaps them in; each scrape only writes the cached bytes, so scraping
+    never touches GUI state.
+    """
+    def __init__(self, port=METRICS_EXPORTER_PORT, host="0.0.0.0"):
+        self.port, self.host = port, host
+        self._payloads = (b"", b"# EOF\n")    # (Prometheus text, OpenMetrics)
+        self._server = None
+
+    @property
+    def running(self):
+        return self._server is not None
+
+    def publish(self, families):
+        self._payloads = (render_metrics(families), render_metrics(families, openmetrics=True))
+
+    def payload(self, openmetrics=False):
+        return self._payloads[1 if openmetrics else 0]
+
+    def start(self):
+        """Raises OSError when the port cannot be bound."""
+        if self._server:
+            return
+        server = ThreadingHTTPServer((self.host, self.port), _MetricsRequestHandler)
+        server.daemon_threads = True
+        server.exporter = self
+        self._server = server
+        threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.5}, daemon=True).start()
+
+    def stop(self):
+        server, self._server = self._server, None
+        if server:
+            server.shutdown()
+            server.server_close()
+
+
+# -----------------------------------------------------------------------------
+# RUN HISTORY (SQLite)
+# -----------------------------------------------------------------------------
+class RunHistoryStore:
+    """
+    Persistent history of testbed runs: process start/ready/stop times, crashes,
+    iperf throughput summaries and capture paths.
+
+    Writes are queued and committed in batches by a single writer thread, so the
+    GTK thread never touches the disk. Readers open their own connection (WAL mode)
+    and are expected to run off the main thread too.
+    """
+    BATCH_SIZE = 256
+    FLUSH_INTERVAL = 0.5
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at REAL NOT NULL,
+            ended_at REAL,
+            hostname TEXT
+        );
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            run_id INTEGER NOT NULL REFERENCES runs(id),
+            ts REAL NOT NULL,
+            process TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            value REAL,
+            detail TEXT,
+            config_hash TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_events_ts ON events(ts);
+        CREATE INDEX IF NOT EXISTS idx_events_kind_ts ON events(kind, ts);
+        CREATE INDEX IF NOT EXISTS idx_events_process_kind_ts ON events(process, kind, ts);
+        CREATE INDEX IF NOT EXISTS idx_events_config ON events(config_hash, kind);
+        CREATE INDEX IF NOT EXISTS idx_events_run ON events(run_id, ts);
+        CREATE INDEX IF NOT EXISTS idx_runs_started ON runs(started_at);
+    """
+
+    INSERT_EVENT = ("INSERT INTO events (run_id, ts, process, kind, value, detail, config_hash) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)")
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.run_id = None
+        self._queue = queue.Queue()
+        self._ready = threading.Event()
+        self._config_hash_cache = {}  # path -> ((size, mtime_ns), hash)
+        self._active_hash = {}        # process -> hash of the config it was started with
+        self.listeners = []           # fn(process, kind, value, detail), called in the writer thread
+        self._thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._thread.start()
+
+    # --- Public API (safe to call from any thread) ---
+
+    def record(self, process, kind, value=None, detail=None, config_path=None):
+        self._queue.put((time.time(), process, kind, value, detail, config_path, None))
+
+    def record_deferred(self, process, kind, producer):
+        # 'producer' runs in the writer thread and returns a list of (value, detail) pairs.
+        # Used for work that must not run on the GTK thread (e.g. parsing iperf logs).
+        self._queue.put((time.time(), process, kind, None, None, None, producer))
+
+    def close(self, timeout=2.0):
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def query_events(self, process=None, kind=None, since=None, limit=500):
+        clauses, params = [], []
+        if process:
+            clauses.append("process = ?")
+            params.append(process)
+        if kind:
+            clauses.append("kind = ?")
+            params.append(kind)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (f"SELECT ts, process, kind, value, detail, config_hash FROM events {where} "
+               f"ORDER BY ts DESC LIMIT ?")
+        params.append(limit)
+        return self._read(sql, params)
+
+    def query_kpi_summary(self, since):
+        # Ready times and throughputs grouped per config, so regressions stand out
+        sql = ("SELECT process, kind, config_hash, COUNT(*), AVG(value), MIN(value), MAX(value) "
+               "FROM events WHERE kind IN ('ready', 'throughput') AND ts >= ? "
+               "GROUP BY process, kind, config_hash ORDER BY process, kind")
+        return self._read(sql, [since])
+
+    # --- Internals ---
+
+    def _read(self, sql, params):
+        if not self._ready.wait(5) or not os.path.exists(self.db_path):
+            return []
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=5)
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+
+    def _config_hash(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        key = (st.st_size, st.st_mtime_ns)
+        cached = self._config_hash_cache.get(path)
+        if cached and cached[0] == key:
+            return cached[1]
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(65536), b''):
+                h.update(chunk)
+        digest = h.hexdigest()[:16]
+        self._config_hash_cache[path] = (key, digest)
+        return digest
+
+    def _resolve(self, item):
+        ts, process, kind, value, detail, config_path, producer = item
+        if config_path:
+            self._active_hash[process] = self._config_hash(config_path)
+        config_hash = self._active_hash.get(process)
+        if producer is None:
+            return [(self.run_id, ts, process, kind, value, detail, config_hash)]
+        try:
+            return [(self.run_id, ts, process, kind, v, d, config_hash) for v, d in producer()]
+        except Exception as e:
+            print(f"History: deferred record failed: {e}")
+            return []
+
+    def _writer_loop(self):
+        try:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            is_new = not os.path.exists(self.db_path)
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.SCHEMA)
+            with conn:
+                cur = conn.execute("INSERT INTO runs (started_at, hostname) VALUES (?, ?)",
+                                   (time.time(), socket.gethostname()))
+                self.run_id = cur.lastrowid
+            if is_new:
+                for suffix in ("", "-wal", "-shm"):
+                    chown_to_real_user(self.db_path + suffix)
+        except Exception as e:
+            print(f"History: could not open {self.db_path}: {e}")
+            self._ready.set()
+            # Keep draining so producers never block on a dead store
+            while self._queue.get() is not None:
+                pass
+            return
+        self._ready.set()
+
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.FLUSH_INTERVAL
+            while len(batch) < self.BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    nxt = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stopping = True
+                    break
+                batch.append(nxt)
+
+            rows = []
+            for it in batch:
+                rows.extend(self._resolve(it))
+            for row in rows:
+                for listener in self.listeners:
+                    try:
+                        listener(*row[2:6])
+                    except Exception as e:
+                        print(f"History: listener failed: {e}")
+            try:
+                with conn:
+                    conn.executemany(self.INSERT_EVENT, rows)
+            except sqlite3.Error as e:
+                print(f"History: write failed: {e}")
+
+        try:
+            with conn:
+                conn.execute("UPDATE runs SET ended_at = ? WHERE id = ?", (time.time(), self.run_id))
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+# -----------------------------------------------------------------------------
+# MULTI-UE SCALE MODE
+# -----------------------------------------------------------------------------
+SCALE_WORK_DIR = "/tmp/srsran_gui_scale"
+ZMQ_GNB_TX_PORT = 2000      # gNB serves downlink samples here (REP)
+ZMQ_GNB_RX_PORT = 2001      # gNB requests uplink samples here (REQ)
+ZMQ_UE_BASE_PORT = 2100     # UE n: tx = base + 2(n-1), rx = tx + 1
+SCALE_IPERF_BASE_PORT = 5301
+GNB_LOG_PATH = "/tmp/gnb.log"
+GNB_LATE_PATTERN = re.compile(rb'late|real-time failure|underflow|overflow', re.IGNORECASE)
+
+
+def ue_zmq_ports(index):
+    tx_port = ZMQ_UE_BASE_PORT + 2 * (index - 1)
+    return tx_port, tx_port + 1
+
+
+def generate_ue_config(template, index):
+    """
+    Derives the srsue config for UE number 'index' (1-based) from the single-UE
+    config: distinct ZMQ ports, consecutive IMSI, own namespace and log/pcap names.
+    Comments and unrelated keys are kept as they are.
+    """
+    tx_port, rx_port = ue_zmq_ports(index)
+    section = None
+    has_netns = False
+    out = []
+    for line in template.splitlines():
+        header = re.match(r'^\s*\[(\w+)\]', line)
+        if header:
+            section = header.group(1)
+            out.append(line)
+            continue
+
+        m = re.match(r'^(\s*)([A-Za-z_]\w*)(\s*=\s*)(.*?)\s*$', line)
+        if not m:
+            out.append(line)
+            continue
+        indent, key, sep, value = m.groups()
+
+        if section == "rf" and key == "device_args":
+            value = re.sub(r'tx_port=tcp://([^:,]+):\d+', rf'tx_port=tcp://\1:{tx_port}', value)
+            value = re.sub(r'rx_port=tcp://([^:,]+):\d+', rf'rx_port=tcp://\1:{rx_port}', value)
+        elif section == "usim" and key == "imsi" and value.isdigit():
+            value = str(int(value) + index - 1).zfill(len(value))
+        elif section == "gw" and key == "netns":
+            value = f"ue{index}"
+            has_netns = True
+        elif "filename" in key and "/" in value:
+            root, ext = os.path.splitext(value)
+            value = f"{root}_ue{index}{ext}"
+
+        out.append(f"{indent}{key}{sep}{value}")
+
+    if not has_netns:
+        raise ValueError("UE config template has no [gw] netns entry")
+    return "\n".join(out) + "\n"
+
+
+class ZmqSampleBroker:
+    """
+    Minimal replacement for the GNU Radio multi-UE flowgraph. The downlink buffer
+    requested from the gNB is fanned out to every UE, and the uplink buffers of all
+    UEs are summed (complex64) before being handed to the gNB.
+    Needs pyzmq and NumPy.
+    """
+    # Downlink rounds a UE may miss before the broker stops waiting for it
+    DEAD_AFTER_MISSES = 3
+
+    def __init__(self, n_ues, host="127.0.0.1", timeout_ms=1000):
+        self.n_ues = n_ues
+        self.host = host
+        self.timeout_ms = timeout_ms
+        self.running = False
+        self.dl_buffers = 0
+        self.ul_buffers = 0
+        self.dead_ues = set()       # 1-based UE numbers the downlink currently skips
+        self.stalled_ues = set()    # every UE that was ever marked dead during the run
+        self._ctx = None
+        self._threads = []
+
+    def start(self):
+        self._ctx = zmq.Context()
+        self.running = True
+        for target in (self._downlink_loop, self._uplink_loop):
+            t = threading.Thread(target=target, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self.running = False
+        for t in self._threads:
+            t.join(self.timeout_ms / 1000.0 * 2)
+        self._threads = []
+        if self._ctx:
+            self._ctx.term()
+            self._ctx = None
+
+    def _req_socket(self, port):
+        sock = self._ctx.socket(zmq.REQ)
+        sock.setsockopt(zmq.LINGER, 0)
+        sock.setsockopt(zmq.RCVTIMEO, self.timeout_ms)
+        sock.connect(f"tcp://{self.host}:{port}")
+        return sock
+
+    def _rep_socket(self, port):
+        sock = self._ctx.socket(zmq.REP)
+        sock.setsockopt(zmq.LINGER, 0)
+        sock.bind(f"tcp://{self.host}:{port}")
+        return sock
+
+    def _downlink_loop(self):
+        ue_servers = [self._rep_socket(ue_zmq_ports(i)[1]) for i in range(1, self.n_ues + 1)]
+        gnb = self._req_socket(ZMQ_GNB_TX_PORT)
+        poller = zmq.Poller()
+        for s in ue_servers:
+            poller.register(s, zmq.POLLIN)
+        missed = [0] * self.n_ues
+        try:
+            while self.running:
+                # 1. Wait until every live UE asked for its next buffer (they share the same
+                #    samples), but at most timeout_ms after the first one: a crashed or hung
+                #    srsue must not stall the downlink of the others
+                asked, deadline = set(), None
+                while self.running:
+                    live = {i for i in range(self.n_ues) if i + 1 not in self.dead_ues}
+                    if asked and live <= asked:
+                        break
+                    timeout = self.timeout_ms if deadline is None else int((deadline - time.monotonic()) * 1000)
+                    if timeout <= 0:
+                        break
+                    events = dict(poller.poll(timeout))
+                    for i, s in enumerate(ue_servers):
+                        if i not in asked and s in events:
+                            s.recv()
+                            asked.add(i)
+                    if asked and deadline is None:
+                        deadline = time.monotonic() + self.timeout_ms / 1000.0
+                if not self.running:
+                    break
+                for i in range(self.n_ues):
+                    if i in asked:
+                        missed[i] = 0
+                        if i + 1 in self.dead_ues:
+                            self.dead_ues.discard(i + 1)
+                            print(f"ZMQ broker (DL): UE {i + 1} is requesting samples again")
+                    elif i + 1 not in self.dead_ues:
+                        missed[i] += 1
+                        if missed[i] >= self.DEAD_AFTER_MISSES:
+                            self.dead_ues.add(i + 1)
+                            self.stalled_ues.add(i + 1)
+                            print(f"ZMQ broker (DL): UE {i + 1} missed {missed[i]} rounds, no longer waiting for it")
+
+                # 2. Fetch one buffer from the gNB (lazy-pirate retry on timeout)
+                samples = None
+                while samples is None and self.running:
+                    gnb.send(b'\x01')
+                    try:
+                        samples = gnb.recv()
+                    except zmq.Again:
+                        gnb.close()
+                        gnb = self._req_socket(ZMQ_GNB_TX_PORT)
+                if samples is None:
+                    break
+
+                # 3. Fan out to the UEs that asked (a REP socket may only answer a request)
+                for i in asked:
+                    ue_servers[i].send(samples)
+                self.dl_buffers += 1
+        except zmq.ZMQError as e:
+            if self.running:
+                print(f"ZMQ broker (DL) error: {e}")
+        finally:
+            for s in ue_servers + [gnb]:
+                s.close()
+
+    def _uplink_loop(self):
+        gnb_server = self._rep_socket(ZMQ_GNB_RX_PORT)
+        ue_clients = [self._req_socket(ue_zmq_ports(i)[0]) for i in range(1, self.n_ues + 1)]
+        last_len = 0
+        try:
+            while self.running:
+                if not gnb_server.poll(self.timeout_ms):
+                    continue
+                gnb_server.recv()
+
+                # Ask all UEs at once, then collect; a silent UE contributes nothing
+                for c in ue_clients:
+                    c.send(b'\x01')
+                acc = None
+                for i, c in enumerate(ue_clients):
+                    try:
+                        data = c.recv()
+                    except zmq.Again:
+                        c.close()
+                        ue_clients[i] = self._req_socket(ue_zmq_ports(i + 1)[0])
+                        continue
+                    arr = np.frombuffer(data, dtype=np.complex64)
+                    if acc is None:
+                        acc = arr.copy()
+                    else:
+                        n = min(len(acc), len(arr))
+                        acc = acc[:n]
+                        acc += arr[:n]
+
+                if acc is None:
+                    acc = np.zeros(last_len, dtype=np.complex64)
+                last_len = len(acc)
+                gnb_server.send(acc.tobytes())
+                self.ul_buffers += 1
+        except zmq.ZMQError as e:
+            if self.running:
+                print(f"ZMQ broker (UL) error: {e}")
+        finally:
+            for s in ue_clients + [gnb_server]:
+                s.close()
+
+
+class MultiUeScaleRun:
+    """
+    One scale test: N srsue instances in namespaces ue1..ueN behind a ZMQ broker,
+    each running an iperf3 downlink test against the host at the same time.
+    Progress and results are reported through callbacks from the worker thread.
+    """
+    def __init__(self, n_ues, duration, bitrate, on_status, on_finished):
+        self.n_ues = n_ues
+        self.duration = duration
+        self.bitrate = bitrate
+        self.on_status = on_status
+        self.on_finished = on_finished
+        self._stop = threading.Event()
+        self._procs = []
+        self._broker = None
+
+    def start(self):
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _sudo(self, args):
+        return subprocess.run(["sudo"] + args, capture_output=True, text=True)
+
+    def _ue_ip(self, index):
+        out = self._sudo(["ip", "netns", "exec", f"ue{index}", "ip", "-4", "-o", "addr", "show", "tun_srsue"]).stdout
+        m = re.search(r'inet (\d+(?:\.\d+){3})', out)
+        return m.group(1) if m else None
+
+    def _run(self):
+        result = {'ues': [], 'aggregate_mbps': 0.0, 'late_events': 0, 'stalled_ues': [], 'error': None}
+        try:
+            self._execute(result)
+        except Exception as e:
+            result['error'] = str(e)
+        finally:
+            self._teardown()
+        self.on_finished(result)
+
+    def _execute(self, result):
+        # 1. Per-UE configs
+        os.makedirs(SCALE_WORK_DIR, exist_ok=True)
+        with open(UE_CONFIG_PATH, 'r') as f:
+            template = f.read()
+        conf_paths = []
+        for i in range(1, self.n_ues + 1):
+            path = os.path.join(SCALE_WORK_DIR, f"ue{i}.conf")
+            with open(path, 'w') as f:
+                f.write(generate_ue_config(template, i))
+            conf_paths.append(path)
+
+        # 2. Namespaces
+        self.on_status(f"Creating {self.n_ues} namespaces...")
+        existing = self._sudo(["ip", "netns", "list"]).stdout.split()
+        for i in range(1, self.n_ues + 1):
+            if f"ue{i}" not in existing:
+                self._sudo(["ip", "netns", "add", f"ue{i}"])
+
+        # 3. Broker + UEs
+        self.on_status("Starting ZMQ broker...")
+        self._broker = ZmqSampleBroker(self.n_ues)
+        self._broker.start()
+        for i, path in enumerate(conf_paths, start=1):
+            if self._stop.is_set(): return
+            self.on_status(f"Starting srsue {i}/{self.n_ues}...")
+            log = open(os.path.join(SCALE_WORK_DIR, f"srsue{i}.out"), 'wb')
+            self._procs.append(subprocess.Popen(["sudo", "srsue", path], stdout=log, stderr=subprocess.STDOUT,
+                                                stdin=subprocess.DEVNULL, start_new_session=True))
+            log.close()
+            time.sleep(0.5)
+
+        # 4. Wait for every UE to attach
+        ips = {}
+        deadline = time.time() + 30 + 5 * self.n_ues
+        while len(ips) < self.n_ues and time.time() < deadline and not self._stop.is_set():
+            for i in range(1, self.n_ues + 1):
+                if i not in ips:
+                    ip = self._ue_ip(i)
+                    if ip: ips[i] = ip
+            self.on_status(f"Attached: {len(ips)}/{self.n_ues}")
+            time.sleep(1)
+        if self._stop.is_set(): return
+        if not ips:
+            raise RuntimeError("No UE attached (are the IMSIs provisioned in the core?)")
+
+        # 5. Routes (same as the single-UE speedtest)
+        self._sudo(["ip", "route", "replace", "10.45.0.0/16", "via", "10.53.1.2"])
+        for i in ips:
+            self._sudo(["ip", "netns", "exec", f"ue{i}", "ip", "route", "replace", "default",
+                        "via", "10.45.1.1", "dev", "tun_srsue"])
+
+        # 6. Concurrent iperf: one server port per UE, all clients started together
+        gnb_log_offset = os.path.getsize(GNB_LOG_PATH) if os.path.exists(GNB_LOG_PATH) else 0
+        self.on_status(f"Running iperf on {len(ips)} UEs for {self.duration}s...")
+        servers, clients = [], {}
+        for i in ips:
+            port = str(SCALE_IPERF_BASE_PORT + i)
+            servers.append(subprocess.Popen(["iperf3", "-s", "-1", "-p", port],
+                                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+            self._procs.append(servers[-1])
+        time.sleep(0.5)
+        for i in ips:
+            port = str(SCALE_IPERF_BASE_PORT + i)
+            clients[i] = subprocess.Popen(["sudo", "ip", "netns", "exec", f"ue{i}", "iperf3", "-c", "10.53.1.1",
+                                           "-p", port, "-t", str(self.duration), "-b", self.bitrate, "-R", "-J"],
+                                          stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            self._procs.append(clients[i])
+
+        deadline = time.time() + self.duration + 15
+        while any(c.poll() is None for c in clients.values()):
+            if self._stop.is_set() or time.time() > deadline:
+                return
+            time.sleep(0.5)
+
+        # 7. Collect
+        for i, proc in sorted(clients.items()):
+            mbps = None
+            try:
+                report = json.loads(proc.stdout.read() or b'{}')
+                mbps = report['end']['sum_received']['bits_per_second'] / 1e6
+            except (ValueError, KeyError):
+                pass
+            result['ues'].append({'ue': f"ue{i}", 'ip': ips[i], 'mbps': mbps})
+        result['aggregate_mbps'] = sum(u['mbps'] or 0.0 for u in result['ues'])
+        result['stalled_ues'] = [f"ue{i}" for i in sorted(self._broker.stalled_ues)]
+
+        # Real-time health: count late/underflow reports the gNB logged during the test
+        try:
+            with open(GNB_LOG_PATH, 'rb') as f:
+                f.seek(gnb_log_offset)
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    result['late_events'] += len(GNB_LATE_PATTERN.findall(chunk))
+        except OSError:
+            pass
+
+    def _teardown(self):
+        for proc in self._procs:
+            if proc.poll() is None:
+                try:
+                    proc.send_signal(signal.SIGINT)
+                except OSError:
+                    pass
+        deadline = time.time() + 5
+        for proc in self._procs:
+            try:
+                proc.wait(max(0.1, deadline - time.time()))
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        self._procs = []
+        if self._broker:
+            self._broker.stop()
+            self._broker = None
+
+# -----------------------------------------------------------------------------
+# LATENCY PROBE
+# -----------------------------------------------------------------------------
+LATENCY_ECHO_PORT = 7777
+CLONE_NEWNET = 0x40000000
+
+
+class HdrHistogram:
+    """
+    Log-linear (HDR-style) histogram of integer values, e.g. RTTs in microseconds.
+    Memory is fixed at construction: values above 'highest' are clamped, and every
+    recorded value keeps 'significant_figures' digits of precision.
+    """
+    def __init__(self, highest=60_000_000, significant_figures=3):
+        from array import array
+        largest_single_unit = 2 * 10 ** significant_figures
+        self.sub_bucket_count = 1 << (largest_single_unit - 1).bit_length()
+        self.sub_bucket_half_count = self.sub_bucket_count // 2
+        self.sub_bucket_half_count_magnitude = self.sub_bucket_half_count.bit_length() - 1
+        self.sub_bucket_mask = self.sub_bucket_count - 1
+        self.highest = highest
+
+        smallest_untrackable = self.sub_bucket_count
+        bucket_count = 1
+        while smallest_untrackable <= highest:
+            smallest_untrackable <<= 1
+            bucket_count += 1
+        self.counts = array('Q', bytes(8 * (bucket_count + 1) * self.sub_bucket_half_count))
+        self._zeros = array('Q', self.counts)
+        self.reset()
+
+    def reset(self):
+        self.counts[:] = self._zeros
+        self.total = 0
+        self.sum = 0
+        self.min = None
+        self.max = 0
+        self.clamped = 0
+
+    def _index(self, value):
+        bucket = (value | self.sub_bucket_mask).bit_length() - self.sub_bucket_half_count_magnitude - 1
+        sub_bucket = value >> bucket
+        return ((bucket + 1) << self.sub_bucket_half_count_magnitude) + sub_bucket - self.sub_bucket_half_count
+
+    def _highest_equivalent(self, index):
+        bucket = (index >> self.sub_bucket_half_count_magnitude) - 1
+        sub_bucket = (index & (self.sub_bucket_half_count - 1)) + self.sub_bucket_half_count
+        if bucket < 0:
+            sub_bucket -= self.sub_bucket_half_count
+            bucket = 0
+        return (sub_bucket << bucket) + (1 << bucket) - 1
+
+    def record(self, value):
+        value = max(0, int(value))
+        if value > self.highest:
+            value = self.highest
+            self.clamped += 1
+        self.counts[self._index(value)] += 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        self.min = value if self.min is None else min(self.min, value)
+
+    def add(self, other):
+        for i, c in enumerate(other.counts):
+            if c:
+                self.counts[i] += c
+        self.total += other.total
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+        self.clamped += other.clamped
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+
+    def mean(self):
+        return self.sum / self.total if self.total else 0.0
+
+    def percentiles(self, *quantiles):
+        """Values at the given percentiles (0-100), resolved in one pass over the buckets."""
+        if not self.total:
+            return [0 for _ in quantiles]
+        targets = sorted((max(1, int(q / 100.0 * self.total + 0.5)), i) for i, q in enumerate(quantiles))
+        results = [0] * len(quantiles)
+        cumulative = 0
+        t = 0
+        for index, count in enumerate(self.counts):
+            if not count:
+                continue
+            cumulative += count
+            while t < len(targets) and cumulative >= targets[t][0]:
+                results[targets[t][1]] = min(self._highest_equivalent(index), self.max)
+                t += 1
+            if t == len(targets):
+                break
+        return results
+
+
+def enter_netns(name):
+    """
+    Moves the *calling thread* into network namespace 'name' (needs root).
+    Sockets created afterwards live in that namespace.
+    """
+    fd = os.open(f"/var/run/netns/{name}", os.O_RDONLY)
+    try:
+        if hasattr(os, 'setns'):
+            os.setns(fd, CLONE_NEWNET)
+        else:
+            import ctypes
+            libc = ctypes.CDLL(None, use_errno=True)
+            if libc.setns(fd, CLONE_NEWNET) != 0:
+                err = ctypes.get_errno()
+                raise OSError(err, os.strerror(err))
+    finally:
+        os.close(fd)
+
+
+class UdpEchoServer:
+    """Reflects every datagram back to its sender. Runs in the host namespace."""
+    def __init__(self, port=LATENCY_ECHO_PORT):
+        self.port = port
+        self.running = False
+        self._sock = None
+
+    def start(self):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind(("0.0.0.0", self.port))
+        self._sock.settimeout(0.5)
+        self.running = True
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+
+    def _loop(self):
+        buf = bytearray(2048)
+        try:
+            while self.running:
+                try:
+                    n, addr = self._sock.recvfrom_into(buf)
+                except socket.timeout:
+                    continue
+                self._sock.sendto(memoryview(buf)[:n], addr)
+        except OSError as e:
+            if self.running:
+                print(f"Echo server error: {e}")
+        finally:
+            self._sock.close()
+
+
+class LatencyProbe:
+    """
+    Sends timestamped UDP packets from inside a UE namespace and records RTTs
+    (microseconds) into HDR histograms.
+
+    Sends are scheduled on absolute deadlines (t0 + n * interval) on the monotonic
+    clock, so the rate does not drift over long runs; if the thread falls behind,
+    missed slots are skipped and counted rather than sent in a burst. The send
+    timestamp travels in the packet, so no per-packet state is kept.
+    """
+    HEADER = struct.Struct('!IQ')   # sequence, send time (ns)
+
+    def __init__(self, netns, target, port=LATENCY_ECHO_PORT, interval_ms=10, payload=64):
+        self.netns = netns
+        self.target = target
+        self.port = port
+        self.interval_ns = int(interval_ms * 1e6)
+        self.payload = max(payload, self.HEADER.size)
+        self.running = False
+        self.error = None
+        self.lock = threading.Lock()
+        self.total = HdrHistogram()
+        self.window = HdrHistogram()
+        self.sent = 0
+        self.received = 0
+        self.skipped_slots = 0
+        self.reordered = 0
+        self.jitter_us = 0.0
+        self._last_rtt = None
+        self._highest_seq = -1
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def stop(self):
+        self.running = False
+
+    def snapshot(self, reset_window=True):
+        """Returns (window, total) stats dicts; the window restarts on each call."""
+        with self.lock:
+            stats = []
+            for hist in (self.window, self.total):
+                p50, p99, p999 = hist.percentiles(50, 99, 99.9)
+                stats.append({'count': hist.total, 'p50': p50, 'p99': p99, 'p999': p999,
+                              'min': hist.min or 0, 'max': hist.max, 'mean': hist.mean()})
+            stats[1].update(sent=self.sent, received=self.received, skipped=self.skipped_slots,
+                            reordered=self.reordered, jitter=self.jitter_us)
+            if reset_window:
+                self.window.reset()
+        return stats
+
+    def _record(self, data, now_ns):
+        seq, sent_ns = self.HEADER.unpack_from(data)
+        rtt_us = (now_ns - sent_ns) // 1000
+        with self.lock:
+            self.received += 1
+            self.total.record(rtt_us)
+            self.window.record(rtt_us)
+            if seq < self._highest_seq:
+                self.reordered += 1
+            self._highest_seq = max(self._highest_seq, seq)
+            # RFC 3550 style smoothed jitter of consecutive RTTs
+            if self._last_rtt is not None:
+                self.jitter_us += (abs(rtt_us - self._last_rtt) - self.jitter_us) / 16.0
+            self._last_rtt = rtt_us
+
+    def _loop(self):
+        import select
+        try:
+            if self.netns:
+                enter_netns(self.netns)
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setblocking(False)
+        except OSError as e:
+            self.error = str(e)
+            self.running = False
+            return
+
+        packet = bytearray(self.payload)
+        buf = bytearray(2048)
+        t0 = time.monotonic_ns()
+        seq = 0
+        try:
+            while self.running:
+                now = time.monotonic_ns()
+                next_send = t0 + seq * self.interval_ns
+                if now >= next_send:
+                    behind = (now - next_send) // self.interval_ns
+                    if behind:
+                        # Skip the slots we overslept through instead of bursting
+                        self.skipped_slots += behind
+                        seq += behind
+                    self.HEADER.pack_into(packet, 0, seq & 0xFFFFFFFF, time.monotonic_ns())
+                    try:
+                        sock.sendto(packet, (self.target, self.port))
+                        self.sent += 1
+                    except OSError:
+                        pass
+                    seq += 1
+                    continue
+
+                readable, _, _ = select.select([sock], [], [], (next_send - now) / 1e9)
+                if readable:
+                    while True:
+                        try:
+                            n = sock.recv_into(buf)
+                        except BlockingIOError:
+                            break
+                        if n >= self.HEADER.size:
+                            self._record(buf, time.monotonic_ns())
+        except OSError as e:
+            self.error = str(e)
+        finally:
+            sock.close()
+            self.running = False
+
+# -----------------------------------------------------------------------------
+# CAPTURE FILES
+# -----------------------------------------------------------------------------
+RING_SEGMENT_MB = 100
+RING_SEGMENT_SECONDS = 600
+RING_MAX_SEGMENTS = 10
+
+
+def tshark_is_confined():
+    # True if an enforcing AppArmor profile restricts where tshark/dumpcap may write
+    try:
+        with open("/sys/kernel/security/apparmor/profiles", 'r') as f:
+            for line in f:
+                name = line.split(" (")[0]
+                if ("tshark" in name or "dumpcap" in name) and "(enforce)" in line:
+                    return True
+    except OSError:
+        pass
+    return False
+
+
+def capture_staging_dir(capture_folder):
+    """
+    Directory tshark writes into while capturing. Staging on the capture folder's own
+    filesystem turns finalisation into a rename; /tmp is only used when tshark is
+    confined by AppArmor (or the folder is not writable).
+    """
+    if not tshark_is_confined():
+        path = os.path.join(capture_folder, ".incoming")
+        try:
+            os.makedirs(path, exist_ok=True)
+            chown_to_real_user(path)
+            return path
+        except OSError:
+            pass
+    return "/tmp"
+
+
+def capture_file_in_use(path):
+    """
+    True while a tshark/dumpcap process holds 'path' (or anything below it) open.
+    Without root the fd table of a capture started under sudo cannot be read; such
+    a process counts as holding the file until it exits.
+    """
+    path = os.path.realpath(path)
+    try:
+        pids = [p for p in os.listdir('/proc') if p.isdigit()]
+    except OSError:
+        return False
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/comm', 'r') as f:
+                if f.read().strip() not in ('tshark', 'dumpcap'):
+                    continue
+            fd_dir = f'/proc/{pid}/fd'
+            try:
+                fds = os.listdir(fd_dir)
+            except PermissionError:
+                return True
+            for fd in fds:
+                try:
+                    target = os.readlink(os.path.join(fd_dir, fd))
+                except OSError:
+                    continue
+                if target == path or target.startswith(path + '/'):
+                    return True
+        except OSError:
+            continue
+    return False
+
+
+def wait_for_capture_closed(path, timeout=10.0, poll=0.1):
+    # Replaces the old fixed 1.5 s sleep: returns as soon as tshark let go of the file
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not capture_file_in_use(path):
+            return True
+        time.sleep(poll)
+    return False
+
+
+def _copy_file_in_kernel(src, dst, progress=None, chunk=64 << 20):
+    # copy_file_range/sendfile keep the data inside the kernel; chunking only exists
+    # so progress can be reported for multi-GB files
+    total = os.path.getsize(src)
+    fd_in = os.open(src, os.O_RDONLY)
+    try:
+        fd_out = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            copied = 0
+            use_copy_file_range = hasattr(os, 'copy_file_range')
+            while copied < total:
+                count = min(chunk, total - copied)
+                if use_copy_file_range:
+                    try:
+                        n = os.copy_file_range(fd_in, fd_out, count)
+                    except OSError:
+                        # Older kernels refuse cross-filesystem copy_file_range
+                        use_copy_file_range = False
+                        continue
+                else:
+                    n = os.sendfile(fd_out, fd_in, None, count)
+                if n == 0:
+                    break
+                copied += n
+                if progress:
+                    progress(copied / total)
+        finally:
+            os.close(fd_out)
+    finally:
+        os.close(fd_in)
+
+
+def finalize_capture_file(src, dst, progress=None):
+    """
+    Moves a finished capture into the capture folder and hands it to the real user.
+    Same filesystem: a plain rename. Across filesystems (e.g. tmpfs /tmp): an
+    in-kernel copy with progress callbacks, to be run off the GTK thread.
+    Returns the method used.
+    """
+    try:
+        os.rename(src, dst)
+        chown_to_real_user(dst)
+        return "rename"
+    except PermissionError:
+        # GUI not running as root: keep the old sudo path
+        subprocess.run(["sudo", "mv", src, dst], check=True)
+        real_user = os.environ.get('SUDO_USER') or os.environ.get('USER')
+        if real_user:
+            subprocess.run(["sudo", "chown", f"{real_user}:{real_user}", dst], check=True)
+        return "sudo mv"
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    partial = dst + ".part"
+    _copy_file_in_kernel(src, partial, progress)
+    os.replace(partial, dst)
+    os.remove(src)
+    chown_to_real_user(dst)
+    return "copy"
+
+
+class RingCaptureMover:
+    """
+    Follows a tshark ring-buffer capture in a staging directory. Every segment
+    tshark has closed (i.e. a newer segment exists) is moved to the capture folder
+    straight away, and only the newest 'max_segments' moved segments are kept, so
+    both the staging area and the capture folder stay bounded on soak tests.
+    """
+    POLL_INTERVAL = 1.0
+
+    def __init__(self, staging_dir, dest_dir, prefix, max_segments=RING_MAX_SEGMENTS, on_segment=None,
+                 before_move=None):
+        self.staging_dir = staging_dir
+        self.dest_dir = dest_dir
+        self.prefix = prefix
+        self.max_segments = max_segments
+        self.on_segment = on_segment
+        self.before_move = before_move    # fn(staging path), called on the mover thread while it is still there
+        self.moved = []
+        self.dropped = 0
+        self.still_open = set()     # moved while tshark may still have been writing them
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def finish(self, on_done=None, timeout=10):
+        """Waits (in the background) for tshark to close the last segment, then moves it."""
+        def worker():
+            self._stop.set()
+            if self._thread:
+                self._thread.join()
+            closed = wait_for_capture_closed(self.staging_dir, timeout)
+            self._move_closed(include_newest=True, newest_open=not closed)
+            try:
+                os.rmdir(self.staging_dir)
+            except OSError:
+                pass
+            if on_done:
+                on_done(list(self.moved))
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _segments(self):
+        try:
+            names = [n for n in os.listdir(self.staging_dir) if n.startswith(self.prefix)]
+        except OSError:
+            return []
+        # tshark numbers segments (<prefix>_00001_<timestamp>.pcapng), so name order is write order
+        return sorted(names)
+
+    def _move_closed(self, include_newest=False, newest_open=False):
+        segments = self._segments()
+        if not include_newest:
+            segments = segments[:-1]
+        for n, name in enumerate(segments, 1):
+            src = os.path.join(self.staging_dir, name)
+            dst = os.path.join(self.dest_dir, name)
+            if self.before_move:
+                self.before_move(src)
+            try:
+                finalize_capture_file(src, dst)
+            except Exception as e:
+                print(f"Error moving capture segment {name}: {e}")
+                continue
+            self.moved.append(dst)
+            if newest_open and n == len(segments):
+                self.still_open.add(dst)
+            if self.on_segment:
+                # The mover is passed along: the app may already have dropped its reference while finishing
+                self.on_segment(dst, self)
+        self._enforce_retention()
+
+    def _enforce_retention(self):
+        while len(self.moved) > self.max_segments:
+            oldest = self.moved.pop(0)
+            # The segment may since have been compressed and/or indexed
+            removed = False
+            for path in (oldest, oldest + ZSTD_SUFFIX, oldest + INDEX_SUFFIX):
+                try:
+                    os.remove(path)
+                    removed = removed or path != oldest + INDEX_SUFFIX
+                except OSError:
+                    pass
+            if removed:
+                self.dropped += 1
+
+    def _loop(self):
+        while not self._stop.wait(self.POLL_INTERVAL):
+            self._move_closed()
+
+# -----------------------------------------------------------------------------
+# PCAP / NGAP ANALYSIS
+# -----------------------------------------------------------------------------
+LINKTYPE_NULL = 0
+LINKTYPE_ETHERNET = 1
+LINKTYPE_RAW = 101
+LINKTYPE_LINUX_SLL = 113
+LINKTYPE_IPV4 = 228
+LINKTYPE_IPV6 = 229
+LINKTYPE_LINUX_SLL2 = 276
+
+IPPROTO_UDP = 17
+IPPROTO_SCTP = 132
+NGAP_PPID = 60
+NGAP_PDU_TYPES = ("initiating", "successful", "unsuccessful")
+
+NGAP_PROCEDURES = {
+    0: "AMFConfigurationUpdate", 1: "AMFStatusIndication", 2: "CellTrafficTrace", 3: "DeactivateTrace",
+    4: "DownlinkNASTransport", 5: "DownlinkNonUEAssociatedNRPPaTransport",
+    6: "DownlinkRANConfigurationTransfer", 7: "DownlinkRANStatusTransfer",
+    8: "DownlinkUEAssociatedNRPPaTransport", 9: "ErrorIndication", 10: "HandoverCancel",
+    11: "HandoverNotification", 12: "HandoverPreparation", 13: "HandoverResourceAllocation",
+    14: "InitialContextSetup", 15: "InitialUEMessage", 16: "LocationReportingControl",
+    17: "LocationReportingFailureIndication", 18: "LocationReport", 19: "NASNonDeliveryIndication",
+    20: "NGReset", 21: "NGSetup", 22: "OverloadStart", 23: "OverloadStop", 24: "Paging",
+    25: "PathSwitchRequest", 26: "PDUSessionResourceModify", 27: "PDUSessionResourceModifyIndication",
+    28: "PDUSessionResourceRelease", 29: "PDUSessionResourceSetup", 30: "PDUSessionResourceNotify",
+    31: "PrivateMessage", 32: "PWSCancel", 33: "PWSFailureIndication", 34: "PWSRestartIndication",
+    35: "RANConfigurationUpdate", 36: "RerouteNASRequest", 37: "RRCInactiveTransitionReport",
+    38: "TraceFailureIndication", 39: "TraceStart", 40: "UEContextModification", 41: "UEContextRelease",
+    42: "UEContextReleaseRequest", 43: "UERadioCapabilityCheck", 44: "UERadioCapabilityInfoIndication",
+    45: "UETNLABindingRelease", 46: "UplinkNASTransport", 47: "UplinkNonUEAssociatedNRPPaTransport",
+    48: "UplinkRANConfigurationTransfer", 49: "UplinkRANStatusTransfer",
+    50: "UplinkUEAssociatedNRPPaTransport", 51: "WriteReplaceWarning", 52: "SecondaryRATDataUsageReport",
+}
+
+NGAP_IE_AMF_UE_ID = 10
+NGAP_IE_CAUSE = 15
+NGAP_IE_RAN_UE_ID = 85
+
+# Cause CHOICE alternatives: (name, bits of the root enumeration, root value names)
+NGAP_CAUSE_GROUPS = [
+    ("radioNetwork", 6, [
+        "unspecified", "txnrelocoverall-expiry", "successful-handover",
+        "release-due-to-ngran-generated-reason", "release-due-to-5gc-generated-reason",
+        "handover-cancelled", "partial-handover", "ho-failure-in-target-5GC-ngran-node-or-target-system",
+        "ho-target-not-allowed", "tngrelocoverall-expiry", "tngrelocprep-expiry", "cell-not-available",
+        "unknown-targetID", "no-radio-resources-available-in-target-cell", "unknown-local-UE-NGAP-ID",
+        "inconsistent-remote-UE-NGAP-ID", "handover-desirable-for-radio-reason", "time-critical-handover",
+        "resource-optimisation-handover", "reduce-load-in-serving-cell", "user-inactivity",
+        "radio-connection-with-ue-lost", "radio-resources-not-available", "invalid-qos-combination",
+        "failure-in-radio-interface-procedure", "interaction-with-other-procedure",
+        "unknown-PDU-session-ID", "unkown-qos-flow-ID", "multiple-PDU-session-ID-instances",
+        "multiple-qos-flow-ID-instances", "encryption-and-or-integrity-protection-algorithms-not-supported",
+        "ng-intra-system-handover-triggered", "ng-inter-system-handover-triggered", "xn-handover-triggered",
+        "not-supported-5QI-value", "ue-context-transfer", "ims-voice-eps-fallback-or-rat-fallback-triggered",
+        "up-integrity-protection-not-possible", "up-confidentiality-protection-not-possible",
+        "slice-not-supported", "ue-in-rrc-inactive-state-not-reachable", "redirection",
+        "resources-not-available-for-the-slice", "ue-max-integrity-protected-data-rate-reason",
+        "release-due-to-cn-detected-mobility"]),
+    ("transport", 1, ["transport-resource-unavailable", "unspecified"]),
+    ("nas", 2, ["normal-release", "authentication-failure", "deregister", "unspecified"]),
+    ("protocol", 3, [
+        "transfer-syntax-error", "abstract-syntax-error-reject", "abstract-syntax-error-ignore-and-notify",
+        "message-not-compatible-with-receiver-state", "semantic-error",
+        "abstract-syntax-error-falsely-constructed-message", "unspecified"]),
+    ("misc", 3, [
+        "control-processing-overload", "not-enough-user-plane-processing-resources", "hardware-failure",
+        "om-intervention", "unknown-PLMN-or-SNPN", "unspecified"]),
+]
+
+
+class PcapRecordParser:
+    """
+    Incremental parser for classic pcap and pcapng.
+
+    records(buf, base) walks 'buf', which holds the file bytes starting at absolute
+    offset 'base' (an mmap of the whole file, or a window of a stream), and yields
+    (offset, timestamp, linktype, orig_len, data) per packet, 'data' being a
+    memoryview slice (no copy). It stops at the first incomplete record; self.pos is
+    the absolute offset to resume from once more bytes are available.
+    """
+    PCAP_MAGICS = {
+        b'\xd4\xc3\xb2\xa1': ('<', 1e-6), b'\xa1\xb2\xc3\xd4': ('>', 1e-6),
+        b'\x4d\x3c\xb2\xa1': ('<', 1e-9), b'\xa1\xb2\x3c\x4d': ('>', 1e-9),
+    }
+    PCAPNG_SHB = b'\x0a\x0d\x0d\x0a'
+    MAX_RECORD = 256 << 20
+
+    def __init__(self):
+        self.format = None
+        self.endian = '<'
+        self.linktype = None
+        self.ts_scale = 1e-6
+        self.interfaces = []   # pcapng: [(linktype, ts_scale)]
+        self.pos = 0
+
+    def records(self, buf, base=0):
+        mv = memoryview(buf)
+        n = len(mv)
+        if self.format is None:
+            if n - (self.pos - base) < 24:
+                return
+            i = self.pos - base
+            magic = bytes(mv[i:i + 4])
+            if magic in self.PCAP_MAGICS:
+                self.format = 'pcap'
+                self.endian, self.ts_scale = self.PCAP_MAGICS[magic]
+                self.linktype = struct.unpack_from(self.endian + 'I', mv, i + 20)[0]
+                self.pos += 24
+            elif magic == self.PCAPNG_SHB:
+                self.format = 'pcapng'
+            else:
+                raise ValueError("Not a pcap or pcapng file")
+
+        if self.format == 'pcap':
+            yield from self._pcap_records(mv, n, base)
+        else:
+            yield from self._pcapng_records(mv, n, base)
+
+    def _pcap_records(self, mv, n, base):
+        hdr = struct.Struct(self.endian + 'IIII')
+        linktype, scale = self.linktype, self.ts_scale
+        i = self.pos - base
+        while i + 16 <= n:
+            ts_sec, ts_frac, incl_len, orig_len = hdr.unpack_from(mv, i)
+            if incl_len > self.MAX_RECORD:
+                raise ValueError(f"Corrupt pcap record at offset {self.pos}")
+            end = i + 16 + incl_len
+            if end > n:
+                break
+            yield self.pos, ts_sec + ts_frac * scale, linktype, orig_len, mv[i + 16:end]
+            self.pos += end - i
+            i = end
+
+    def _pcapng_records(self, mv, n, base):
+        i = self.pos - base
+        while i + 12 <= n:
+            block_type = bytes(mv[i:i + 4])
+            if block_type == self.PCAPNG_SHB:
+                bom = bytes(mv[i + 8:i + 12])
+                self.endian = '<' if bom == b'\x4d\x3c\x2b\x1a' else '>'
+                self.interfaces = []
+            e = self.endian
+            btype, blen = struct.unpack_from(e + 'II', mv, i)
+            if blen < 12 or blen % 4 or blen > self.MAX_RECORD:
+                raise ValueError(f"Corrupt pcapng block at offset {self.pos}")
+            if i + blen > n:
+                break
+
+            if btype == 6:      # Enhanced Packet Block
+                iface, ts_hi, ts_lo, cap_len, orig_len = struct.unpack_from(e + 'IIIII', mv, i + 8)
+                linktype, scale = self.interfaces[iface] if iface < len(self.interfaces) else (None, 1e-6)
+                yield self.pos, ((ts_hi << 32) | ts_lo) * scale, linktype, orig_len, mv[i + 28:i + 28 + cap_len]
+            elif btype == 3:    # Simple Packet Block (no timestamp)
+                orig_len = struct.unpack_from(e + 'I', mv, i + 8)[0]
+                cap_len = min(orig_len, blen - 16)
+                linktype = self.interfaces[0][0] if self.interfaces else None
+                yield self.pos, None, linktype, orig_len, mv[i + 12:i + 12 + cap_len]
+            elif btype == 1:    # Interface Description Block
+                linktype = struct.unpack_from(e + 'H', mv, i + 8)[0]
+                self.interfaces.append((linktype, self._if_tsresol(mv, i + 16, i + blen - 4, e)))
+
+            self.pos += blen
+            i += blen
+
+    @staticmethod
+    def _if_tsresol(mv, i, end, e):
+        while i + 4 <= end:
+            code, length = struct.unpack_from(e + 'HH', mv, i)
+            if code == 0:
+                break
+            if code == 9 and length >= 1:
+                v = mv[i + 4]
+                return 2.0 ** -(v & 0x7F) if v & 0x80 else 10.0 ** -v
+            i += 4 + ((length + 3) & ~3)
+        return 1e-6
+
+
+def ip_layer(linktype, data):
+    """
+    Locates the IP header behind the link layer. Returns (ip_proto, l4_offset,
+    ip_offset, ip_version), or None for non-IP packets and non-first IPv4 fragments.
+    """
+    n = len(data)
+    if linktype == LINKTYPE_LINUX_SLL:
+        if n < 16: return None
+        off, ethertype = 16, (data[14] << 8) | data[15]
+    elif linktype == LINKTYPE_LINUX_SLL2:
+        if n < 20: return None
+        off, ethertype = 20, (data[0] << 8) | data[1]
+    elif linktype == LINKTYPE_ETHERNET:
+        if n < 14: return None
+        off, ethertype = 14, (data[12] << 8) | data[13]
+        while ethertype in (0x8100, 0x88A8) and off + 4 <= n:
+            ethertype = (data[off + 2] << 8) | data[off + 3]
+            off += 4
+    elif linktype in (LINKTYPE_RAW, LINKTYPE_IPV4, LINKTYPE_IPV6, LINKTYPE_NULL):
+        off = 4 if linktype == LINKTYPE_NULL else 0
+        if n <= off: return None
+        ethertype = 0x0800 if data[off] >> 4 == 4 else 0x86DD
+    else:
+        return None
+
+    if ethertype == 0x0800:
+        if n < off + 20: return None
+        if ((data[off + 6] & 0x1F) << 8) | data[off + 7]:
+            return None
+        return data[off + 9], off + (data[off] & 0x0F) * 4, off, 4
+    if ethertype == 0x86DD:
+        if n < off + 40: return None
+        return data[off + 6], off + 40, off, 6
+    return None
+
+
+def sctp_data_chunks(data, off):
+    """Yields (ppid, payload) for every DATA chunk that starts a user message."""
+    end = len(data)
+    i = off + 12
+    while i + 4 <= end:
+        chunk_type = data[i]
+        chunk_len = (data[i + 2] << 8) | data[i + 3]
+        if chunk_len < 4:
+            break
+        # Only the first fragment (B bit) carries the NGAP header we decode
+        if chunk_type == 0 and chunk_len >= 16 and data[i + 1] & 0x02:
+            ppid = int.from_bytes(data[i + 12:i + 16], 'big')
+            yield ppid, data[i + 16:min(i + chunk_len, end)]
+        i += (chunk_len + 3) & ~3
+
+
+def _aper_length(buf, i):
+    b = buf[i]
+    if not b & 0x80:
+        return b, i + 1
+    if b & 0xC0 == 0x80:
+        return ((b & 0x3F) << 8) | buf[i + 1], i + 2
+    raise ValueError("fragmented APER length")
+
+
+def decode_ngap_cause(v):
+    if not len(v):
+        return "unknown"
+    word = (v[0] << 8) | (v[1] if len(v) > 1 else 0)
+    choice = word >> 13
+    if choice >= len(NGAP_CAUSE_GROUPS):
+        return "choice-extension"
+    group, bits, names = NGAP_CAUSE_GROUPS[choice]
+    if (word >> 12) & 1:
+        return f"{group}/extension"
+    value = (word >> (12 - bits)) & ((1 << bits) - 1)
+    return f"{group}/{names[value] if value < len(names) else value}"
+
+
+def decode_ngap(pdu):
+    """
+    Decodes the NGAP-PDU header (APER) plus the few IEs the analyzers use:
+    RAN/AMF UE NGAP IDs and Cause. Returns (pdu_type, procedure_code, ies) or None.
+    """
+    try:
+        if len(pdu) < 4 or pdu[0] & 0x80:
+            return None
+        pdu_type = (pdu[0] >> 5) & 0x03
+        if pdu_type > 2:
+            return None
+        procedure = pdu[1]
+        length, i = _aper_length(pdu, 3)
+        end = min(len(pdu), i + length)
+        ies = {}
+        # Message value: SEQUENCE { protocolIEs, ... } -> extension bit octet + 16-bit IE count
+        if i + 3 > end:
+            return pdu_type, procedure, ies
+        count = (pdu[i + 1] << 8) | pdu[i + 2]
+        i += 3
+        for _ in range(count):
+            if i + 4 > end:
+                break
+            ie_id = (pdu[i] << 8) | pdu[i + 1]
+            vlen, j = _aper_length(pdu, i + 3)
+            if vlen and j + vlen <= end:
+                if ie_id == NGAP_IE_RAN_UE_ID:
+                    n = (pdu[j] >> 6) + 1
+                    ies['ran_ue_id'] = int.from_bytes(pdu[j + 1:j + 1 + n], 'big')
+                elif ie_id == NGAP_IE_AMF_UE_ID:
+                    n = (pdu[j] >> 5) + 1
+                    ies['amf_ue_id'] = int.from_bytes(pdu[j + 1:j + 1 + n], 'big')
+                elif ie_id == NGAP_IE_CAUSE:
+                    ies['cause'] = decode_ngap_cause(pdu[j:j + vlen])
+            i = j + vlen
+        return pdu_type, procedure, ies
+    except (IndexError, ValueError):
+        return None
+
+
+def ngap_procedure_name(code):
+    return NGAP_PROCEDURES.get(code, f"Procedure#{code}")
+
+
+def iter_ngap_messages(parser, buf, base=0):
+    """Yields (offset, timestamp, orig_len, decoded) for packets carrying NGAP, plus
+    (offset, timestamp, orig_len, None) for every other packet so callers can count them."""
+    for offset, ts, linktype, orig_len, data in parser.records(buf, base):
+        # A packet with several chunks counts as NGAP once any of them decoded
+        any_ngap = False
+        ip = ip_layer(linktype, data)
+        if ip and ip[0] == IPPROTO_SCTP:
+            for ppid, payload in sctp_data_chunks(data, ip[1]):
+                if ppid == NGAP_PPID:
+                    decoded = decode_ngap(payload)
+                    if decoded:
+                        any_ngap = True
+                        yield offset, ts, orig_len, decoded
+        if not any_ngap:
+            yield offset, ts, orig_len, None
+
+
+class NgapCaptureAnalyzer:
+    """
+    Aggregates NGAP messages into per-procedure counts, failure causes and timings
+    for NG Setup, Registration (InitialUEMessage -> InitialContextSetupResponse) and
+    PDU Session setup. Memory is bounded: timings go into HDR histograms and at most
+    MAX_PENDING transactions per procedure are tracked.
+    """
+    MAX_PENDING = 65536
+    # name: (start (pdu_type, proc), outcome procedure, keyed per UE)
+    TIMED = {
+        "NG Setup": ((0, 21), 21, False),
+        "Registration": ((0, 15), 14, True),
+        "PDU Session Setup": ((0, 29), 29, True),
+    }
+
+    def __init__(self):
+        self.packets = 0
+        self.bytes = 0
+        self.ngap_messages = 0
+        self.first_ts = None
+        self.last_ts = None
+        self.elapsed = 0.0
+        self.counts = {}      # (procedure, pdu_type) -> count
+        self.causes = {}      # (procedure, cause) -> count
+        self.timings = {name: HdrHistogram(highest=600_000_000) for name in self.TIMED}
+        self.failures = {name: 0 for name in self.TIMED}
+        self._pending = {name: {} for name in self.TIMED}
+        self._starts = {spec[0]: name for name, spec in self.TIMED.items()}
+        self._outcomes = {spec[1]: name for name, spec in self.TIMED.items()}
+
+    def add_packet(self, ts, orig_len):
+        self.packets += 1
+        self.bytes += orig_len
+        if ts is not None:
+            if self.first_ts is None:
+                self.first_ts = ts
+            self.last_ts = ts
+
+    def add_message(self, ts, decoded):
+        pdu_type, proc, ies = decoded
+        self.ngap_messages += 1
+        key = (proc, pdu_type)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        cause = ies.get('cause')
+        if cause:
+            ckey = (proc, cause)
+            self.causes[ckey] = self.causes.get(ckey, 0) + 1
+        if ts is None:
+            return
+
+        name = self._starts.get((pdu_type, proc))
+        if name:
+            pending = self._pending[name]
+            ue_key = ies.get('ran_ue_id') if self.TIMED[name][2] else 0
+            if len(pending) >= self.MAX_PENDING:
+                pending.pop(next(iter(pending)))
+            pending[ue_key] = ts
+            return
+
+        name = self._outcomes.get(proc)
+        if name and pdu_type in (1, 2):
+            ue_key = ies.get('ran_ue_id') if self.TIMED[name][2] else 0
+            started = self._pending[name].pop(ue_key, None)
+            if started is None:
+                return
+            if pdu_type == 1:
+                self.timings[name].record((ts - started) * 1e6)
+            else:
+                self.failures[name] += 1
+
+    def consume(self, parser, buf, base=0, progress=None, total=None):
+        n = 0
+        last_offset = None
+        for offset, ts, orig_len, decoded in iter_ngap_messages(parser, buf, base):
+            # A packet may bundle several NGAP chunks; count it once
+            if offset != last_offset:
+                self.add_packet(ts, orig_len)
+                last_offset = offset
+            if decoded is not None:
+                self.add_message(ts, decoded)
+            n += 1
+            if progress and total and not n & 0xFFFF:
+                progress(parser.pos / total)
+
+    def format_report(self):
+        lines = []
+        duration = (self.last_ts - self.first_ts) if self.first_ts is not None else 0.0
+        lines.append(f"Packets: {self.packets}   NGAP messages: {self.ngap_messages}   "
+                     f"Bytes: {self.bytes / 1e6:.2f} MB   Span: {duration:.1f} s")
+        if self.elapsed:
+            lines.append(f"Analyzed in {self.elapsed:.2f} s")
+        lines.append("")
+        lines.append(f"{'Procedure':<38}{'Init':>8}{'Success':>9}{'Fail':>7}")
+        procs = sorted({p for p, _ in self.counts})
+        for p in procs:
+            c = [self.counts.get((p, t), 0) for t in range(3)]
+            lines.append(f"{ngap_procedure_name(p):<38}{c[0]:>8}{c[1]:>9}{c[2]:>7}")
+        lines.append("")
+        lines.append(f"{'Timing (ms)':<20}{'n':>6}{'fail':>6}{'min':>9}{'p50':>9}{'p99':>9}{'max':>9}")
+        for name, hist in self.timings.items():
+            p50, p99 = hist.percentiles(50, 99)
+            lines.append(f"{name:<20}{hist.total:>6}{self.failures[name]:>6}{(hist.min or 0) / 1e3:>9.2f}"
+                         f"{p50 / 1e3:>9.2f}{p99 / 1e3:>9.2f}{hist.max / 1e3:>9.2f}")
+        if self.causes:
+            lines.append("")
+            lines.append("Causes:")
+            for (p, cause), n in sorted(self.causes.items(), key=lambda kv: -kv[1]):
+                lines.append(f"  {n:>6}  {ngap_procedure_name(p)}: {cause}")
+        return "\n".join(lines)
+
+
+ZSTD_SUFFIX = ".zst"
+ZSTD_READ_CHUNK = 4 << 20
+
+
+@contextlib.contextmanager
+def open_zstd_reader(raw):
+    """Decompressing reader over an open .zst file (python-zstandard, else the zstd CLI)."""
+    if zstandard is not None:
+        with zstandard.ZstdDecompressor().stream_reader(raw, closefd=False) as reader:
+            yield reader
+        return
+    if not shutil.which("zstd"):
+        raise OSError("Reading .zst captures needs python3-zstandard or the zstd tool")
+    proc = subprocess.Popen(["zstd", "-dcq"], stdin=raw, stdout=subprocess.PIPE)
+    try:
+        yield proc.stdout
+    finally:
+        proc.stdout.close()
+        proc.kill()
+        proc.wait()
+
+
+def feed_capture(path, consume, progress=None):
+    """
+    Runs consume(parser, buf, base, progress, total) over a whole capture: a single
+    mmap for plain files, or a sliding window of decompressed chunks for .zst, so
+    neither form is ever loaded whole.
+    """
+    size = os.path.getsize(path)
+    if not size:
+        return
+    parser = PcapRecordParser()
+    if path.endswith(ZSTD_SUFFIX):
+        with open(path, 'rb') as raw, open_zstd_reader(raw) as reader:
+            buf, base = b'', 0
+            while True:
+                chunk = reader.read(ZSTD_READ_CHUNK)
+                if not chunk:
+                    break
+                # Keep only the incomplete tail record, then append the new chunk
+                buf = buf[parser.pos - base:] + chunk
+                base = parser.pos
+                consume(parser, buf, base, None, None)
+                if progress:
+                    progress(raw.tell() / size)
+        return
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if hasattr(mm, 'madvise'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            consume(parser, mm, 0, progress, size)
+        finally:
+            mm.close()
+
+
+def analyze_capture(path, progress=None):
+    """Streams a pcap/pcapng (optionally .zst) through the NGAP analyzer; nothing is loaded whole."""
+    analyzer = NgapCaptureAnalyzer()
+    started = time.perf_counter()
+    feed_capture(path, analyzer.consume, progress)
+    analyzer.elapsed = time.perf_counter() - started
+    return analyzer
+
+
+def _aper_length_bytes(n):
+    return bytes([n]) if n < 128 else bytes([0x80 | (n >> 8), n & 0xFF])
+
+
+def build_ngap_pdu(pdu_type, procedure, ies):
+    """Encodes a minimal NGAP-PDU; 'ies' is a list of (id, encoded value). Used for synthetic captures."""
+    body = b'\x00' + len(ies).to_bytes(2, 'big')
+    for ie_id, value in ies:
+        body += ie_id.to_bytes(2, 'big') + b'\x00' + _aper_length_bytes(len(value)) + value
+    return bytes([pdu_type << 5, procedure, 0x00]) + _aper_length_bytes(len(body)) + body
+
+
+def write_synthetic_ngap_pcap(path, n_ues, nas_size=64, start_ts=1_700_000_000.0):
+    """
+    Writes a classic pcap (LINUX_SLL / IPv4 / SCTP) with one NG Setup followed by a
+    registration + PDU session flow per UE. Returns the number of packets written.
+    """
+    def ran_id(v):
+        n = max(1, (v.bit_length() + 7) // 8)
+        return bytes([(n - 1) << 6]) + v.to_bytes(n, 'big')
+
+    def amf_id(v):
+        n = max(1, (v.bit_length() + 7) // 8)
+        return bytes([(n - 1) << 5]) + v.to_bytes(n, 'big')
+
+    nas = (38, b'\x7e' * nas_size)   # NAS-PDU IE, opaque payload
+    rec = struct.Struct('<IIII')
+    packets = 0
+    tsn = 0
+
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, 65535, LINKTYPE_LINUX_SLL))
+
+        def emit(ts, pdu):
+            nonlocal packets, tsn
+            chunk_len = 16 + len(pdu)
+            chunk = (struct.pack('!BBHIHHI', 0, 0x03, chunk_len, tsn, 0, 0, NGAP_PPID) + pdu
+                     + b'\x00' * (-chunk_len % 4))
+            sctp = struct.pack('!HHII', 38412, 38412, 0, 0) + chunk
+            ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(sctp), 0, 0, 64, IPPROTO_SCTP, 0,
+                             bytes([10, 53, 1, 1]), bytes([10, 53, 1, 2])) + sctp
+            sll = struct.pack('!HHH8sH', 0, 772, 0, b'\x00' * 8, 0x0800) + ip
+            sec = int(ts)
+            f.write(rec.pack(sec, int((ts - sec) * 1e6), len(sll), len(sll)))
+            f.write(sll)
+            packets += 1
+            tsn += 1
+
+        ts = start_ts
+        emit(ts, build_ngap_pdu(0, 21, []))
+        emit(ts + 0.004, build_ngap_pdu(1, 21, []))
+        for ue in range(n_ues):
+            ts += 0.01
+            r, a = ran_id(ue), amf_id(ue + 1)
+            emit(ts, build_ngap_pdu(0, 15, [(NGAP_IE_RAN_UE_ID, r), nas]))
+            emit(ts + 0.002, build_ngap_pdu(0, 4, [(NGAP_IE_AMF_UE_ID, a), (NGAP_IE_RAN_UE_ID, r), nas]))
+            emit(ts + 0.004, build_ngap_pdu(0, 46, [(NGAP_IE_AMF_UE_ID, a), (NGAP_IE_RAN_UE_ID, r), nas]))
+            emit(ts + 0.006, build_ngap_pdu(0, 14, [(NGAP_IE_AMF_UE_ID, a), (NGAP_IE_RAN_UE_ID, r), nas]))
+            emit(ts + 0.009, build_ngap_pdu(1, 14, [(NGAP_IE_AMF_UE_ID, a), (NGAP_IE_RAN_UE_ID, r)]))
+            emit(ts + 0.011, build_ngap_pdu(0, 29, [(NGAP_IE_AMF_UE_ID, a), (NGAP_IE_RAN_UE_ID, r), nas]))
+            emit(ts + 0.015, build_ngap_pdu(1, 29, [(NGAP_IE_AMF_UE_ID, a), (NGAP_IE_RAN_UE_ID, r)]))
+            if ue % 10 == 9:
+                # misc/unspecified
+                emit(ts + 0.02, build_ngap_pdu(0, 42, [(NGAP_IE_AMF_UE_ID, a), (NGAP_IE_RAN_UE_ID, r),
+                                                      (NGAP_IE_CAUSE, b'\x8a')]))
+    return packets
+
+
+def benchmark_ngap_analyzer(size_mb=200, path=None):
+    """Generates a synthetic NGAP capture of roughly 'size_mb' MB and reports analyzer throughput."""
+    import resource, tempfile
+    path = path or os.path.join(tempfile.gettempdir(), "srs_ngap_bench.pcap")
+    n_ues = max(1, int(size_mb * 1e6 / 1000))   # ~1 KB of capture per UE flow
+    t0 = time.perf_counter()
+    packets = write_synthetic_ngap_pcap(path, n_ues)
+    size = os.path.getsize(path)
+    print(f"Generated {packets} packets ({size / 1e6:.1f} MB) in {time.perf_counter() - t0:.1f} s: {path}")
+
+    analyzer = analyze_capture(path)
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Analyzed in {analyzer.elapsed:.2f} s: {size / 1e6 / analyzer.elapsed:.1f} MB/s, "
+          f"{analyzer.packets / analyzer.elapsed:.0f} packets/s, peak RSS {rss_mb:.0f} MB")
+    print(analyzer.format_report())
+    os.remove(path)
+
+# -----------------------------------------------------------------------------
+# CAPTURE OFFSET INDEX
+# -----------------------------------------------------------------------------
+# Sidecar "<capture>.idx" next to each capture:
+#   header | records sorted by time | (procedure, record#) sorted | (RAN UE id, record#) sorted
+# Fixed-size records so every lookup is a bisect straight over the mmap.
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b'SRSNGIDX'
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct('<8sIQqIII')       # magic, version, source size, source mtime_ns, n, n_proc, n_ue
+INDEX_RECORD = struct.Struct('<dQQIBBxx')       # ts, offset, amf_ue_id, ran_ue_id, procedure, pdu_type
+INDEX_KEYREF = struct.Struct('<QI')             # key, record number
+INDEX_NO_ID = 0xFFFFFFFF
+INDEX_NO_AMF_ID = 0xFFFFFFFFFFFFFFFF
+PCAP_TIMELINE_ROWS = 500
+NGAP_LIVE_REFRESH_MS = 250     # live counter redraw rate (4 Hz), independent of message rate
+TSHARK_CAPTURE_MODES = {"ngap": "NGAP (control plane)", "gtpu": "GTP-U headers (user plane)"}
+
+
+def capture_index_path(capture_path):
+    return capture_path + INDEX_SUFFIX
+
+
+class _PackedColumn:
+    """Sequence view of one field of a packed array in a buffer, so bisect can run over it."""
+    def __init__(self, buf, start, rec, count, field=0):
+        self.buf, self.start, self.rec, self.count, self.field = buf, start, rec, count, field
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        return self.rec.unpack_from(self.buf, self.start + i * self.rec.size)[self.field]
+
+
+class CaptureIndexBuilder:
+    """
+    Collects index entries for one capture. update() consumes only the complete
+    records appended since the last call, so it can follow a capture while tshark
+    is still writing it and the file is never scanned twice.
+    """
+    def __init__(self):
+        self.parser = PcapRecordParser()
+        self.entries = bytearray()
+        self.count = 0
+        self.in_order = True
+        self._last_ts = 0.0
+
+    def update(self, path, on_message=None):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        if size <= self.parser.pos:
+            return
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+            try:
+                self._consume(mm, on_message)
+            finally:
+                mm.close()
+
+    def _consume(self, buf, on_message, progress=None, total=None):
+        pack = INDEX_RECORD.pack
+        n = 0
+        for offset, ts, orig_len, decoded in iter_ngap_messages(self.parser, buf):
+            n += 1
+            if progress and not n & 0xFFFF:
+                progress(self.parser.pos / total)
+            if decoded is None:
+                continue
+            pdu_type, proc, ies = decoded
+            if ts is None:
+                ts = self._last_ts
+            elif ts < self._last_ts:
+                self.in_order = False
+            self._last_ts = ts
+            self.entries += pack(ts, offset, ies.get('amf_ue_id', INDEX_NO_AMF_ID),
+                                 ies.get('ran_ue_id', INDEX_NO_ID) & 0xFFFFFFFF, proc, pdu_type)
+            self.count += 1
+            if on_message:
+                on_message(ts, decoded)
+
+    def write(self, capture_path):
+        """Writes the sidecar atomically, stamped with the capture's size and mtime."""
+        records = self.entries
+        if not self.in_order:
+            rows = sorted(INDEX_RECORD.iter_unpack(records), key=lambda r: (r[0], r[1]))
+            records = b''.join(INDEX_RECORD.pack(*r) for r in rows)
+
+        by_proc, by_ue = [], []
+        for i, (ts, offset, amf_id, ran_id, proc, pdu_type) in enumerate(INDEX_RECORD.iter_unpack(records)):
+            by_proc.append((proc, i))
+            if ran_id != INDEX_NO_ID:
+                by_ue.append((ran_id, i))
+        by_proc.sort()
+        by_ue.sort()
+
+        st = os.stat(capture_path)
+        index_path = capture_index_path(capture_path)
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, st.st_size, st.st_mtime_ns,
+                                      self.count, len(by_proc), len(by_ue)))
+            f.write(records)
+            for section in (by_proc, by_ue):
+                f.write(b''.join(INDEX_KEYREF.pack(k, i) for k, i in section))
+        os.replace(tmp_path, index_path)
+        chown_to_real_user(index_path)
+        return index_path
+
+
+class CaptureIndex:
+    """Read-only sidecar index; every lookup is O(log n) over the mmap."""
+    def __init__(self, index_path, capture_path=None):
+        self.capture_path = capture_path
+        self._file = open(index_path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.source_size, self.source_mtime_ns, n, n_proc, n_ue = \
+            INDEX_HEADER.unpack_from(self._mm, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self.close()
+            raise ValueError(f"Not a capture index: {index_path}")
+        self.count = n
+        records_at = INDEX_HEADER.size
+        proc_at = records_at + n * INDEX_RECORD.size
+        ue_at = proc_at + n_proc * INDEX_KEYREF.size
+        self._times = _PackedColumn(self._mm, records_at, INDEX_RECORD, n)
+        self._procs = _PackedColumn(self._mm, proc_at, INDEX_KEYREF, n_proc)
+        self._ues = _PackedColumn(self._mm, ue_at, INDEX_KEYREF, n_ue)
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._times = self._procs = self._ues = None
+        try:
+            self._mm.close()
+        finally:
+            self._file.close()
+
+    @staticmethod
+    def is_current(index_path, capture_path):
+        try:
+            st = os.stat(capture_path)
+            with open(index_path, 'rb') as f:
+                magic, version, size, mtime_ns = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))[:4]
+            return (magic, version, size, mtime_ns) == (INDEX_MAGIC, INDEX_VERSION, st.st_size, st.st_mtime_ns)
+        except (OSError, struct.error):
+            return False
+
+    def record(self, i):
+        """Returns (ts, offset, procedure, pdu_type, ran_ue_id, amf_ue_id); missing IDs are None."""
+        ts, offset, amf_id, ran_id, proc, pdu_type = INDEX_RECORD.unpack_from(
+            self._mm, INDEX_HEADER.size + i * INDEX_RECORD.size)
+        return (ts, offset, proc, pdu_type,
+                None if ran_id == INDEX_NO_ID else ran_id,
+                None if amf_id == INDEX_NO_AMF_ID else amf_id)
+
+    def first_at_or_after(self, ts):
+        """Record number of the first message at or after 'ts'."""
+        return bisect.bisect_left(self._times, ts)
+
+    def _refs(self, column, key, start_ts=None, limit=None):
+        lo = bisect.bisect_left(column, key)
+        hi = bisect.bisect_right(column, key)
+        if start_ts is not None:
+            # Record numbers are time-ordered within a key, so narrow to the first one at start_ts
+            first = self.first_at_or_after(start_ts)
+            refs = _PackedColumn(self._mm, column.start, INDEX_KEYREF, hi, field=1)
+            lo = max(lo, bisect.bisect_left(refs, first, lo, hi))
+        if limit is not None:
+            hi = min(hi, lo + limit)
+        return [column.rec.unpack_from(self._mm, column.start + j * INDEX_KEYREF.size)[1] for j in range(lo, hi)]
+
+    def by_procedure(self, procedure, start_ts=None, limit=None):
+        return self._refs(self._procs, procedure, start_ts, limit)
+
+    def by_ue(self, ran_ue_id, start_ts=None, limit=None):
+        return self._refs(self._ues, ran_ue_id, start_ts, limit)
+
+
+def get_timeline_cache_dir():
+    path = os.path.join(get_app_data_dir(), "timeline")
+    os.makedirs(path, exist_ok=True)
+    chown_to_real_user(path)
+    return path
+
+
+def decompress_for_timeline(capture_path, progress=None):
+    """
+    Returns a plain copy of a .zst capture for random access. It is decompressed
+    once into the timeline cache and reused while the archive is unchanged; only
+    the most recently opened capture is kept there.
+    """
+    st = os.stat(capture_path)
+    key = hashlib.sha1(os.path.realpath(capture_path).encode()).hexdigest()[:12]
+    base = os.path.basename(capture_path)[:-len(ZSTD_SUFFIX)]
+    name = f"{key}_{st.st_size}_{st.st_mtime_ns}_{base}"
+    cache_dir = get_timeline_cache_dir()
+    plain = os.path.join(cache_dir, name)
+    if not os.path.exists(plain):
+        tmp_path = plain + ".tmp"
+        try:
+            with open(capture_path, 'rb') as raw, open_zstd_reader(raw) as reader, open(tmp_path, 'wb') as out:
+                for chunk in iter(lambda: reader.read(ZSTD_READ_CHUNK), b''):
+                    out.write(chunk)
+                    if progress and st.st_size:
+                        progress(min(1.0, raw.tell() / st.st_size))
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, plain)
+        chown_to_real_user(plain)
+    for other in os.listdir(cache_dir):
+        if other not in (name, os.path.basename(capture_index_path(plain))):
+            with contextlib.suppress(OSError):
+                os.remove(os.path.join(cache_dir, other))
+    return plain
+
+
+def open_capture_index(capture_path, progress=None):
+    """
+    Opens the capture's sidecar index, building it first if it is missing or stale.
+    A .zst capture is indexed through its decompressed copy; 'capture_path' on the
+    returned index is the file that record offsets refer to.
+    """
+    if capture_path.endswith(ZSTD_SUFFIX):
+        capture_path = decompress_for_timeline(capture_path, progress)
+    index_path = capture_index_path(capture_path)
+    if not CaptureIndex.is_current(index_path, capture_path):
+        builder = CaptureIndexBuilder()
+        size = os.path.getsize(capture_path)
+        if size:
+            with open(capture_path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                try:
+                    if hasattr(mm, 'madvise'):
+                        mm.madvise(mmap.MADV_SEQUENTIAL)
+                    builder._consume(mm, None, progress, size)
+                finally:
+                    mm.close()
+        builder.write(capture_path)
+    return CaptureIndex(index_path, capture_path)
+
+def read_capture_record(capture_path, offset):
+    """
+    Reads the single packet record at 'offset' without scanning the capture.
+    Returns (ts, linktype, orig_len, data bytes) or None.
+    """
+    with open(capture_path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            parser = PcapRecordParser()
+            # The first record teaches the parser the format, link type and pcapng interfaces
+            records = parser.records(mm)
+            first = next(records, None)
+            records.close()
+            if first is None:
+                return None
+            del first
+            parser.pos = offset
+            records = parser.records(mm)
+            rec = next(records, None)
+            records.close()
+            if rec is None:
+                return None
+            _, ts, linktype, orig_len, data = rec
+            result = (ts, linktype, orig_len, bytes(data))
+            del rec, data
+            return result
+        finally:
+            mm.close()
+
+
+class LiveCaptureIndexer:
+    """
+    Follows a capture while tshark writes it, passing every NGAP message to
+    'on_message'. For a single file finish() writes the sidecar index; with
+    follow_dir the path is a ring staging dir and the newest segment is tailed
+    (moved segments are indexed lazily when opened); the ring mover reports each
+    segment through segment_closed() before taking it away.
+    """
+    POLL_INTERVAL = 0.25
+
+    def __init__(self, path, on_message=None, follow_dir=False):
+        self.path = path
+        self.on_message = on_message
+        self.follow_dir = follow_dir
+        self.builder = CaptureIndexBuilder()
+        self._following = None if follow_dir else path
+        self._drained = set()   # rotated-out segments already read to the end, until the mover takes them
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def _newest_segment(self):
+        try:
+            names = sorted(n for n in os.listdir(self.path) if n.endswith((".pcap", ".pcapng")))
+        except OSError:
+            return None
+        return os.path.join(self.path, names[-1]) if names else None
+
+    def _loop(self):
+        while not self._stop.wait(self.POLL_INTERVAL):
+            path = self._newest_segment() if self.follow_dir else self.path
+            if path is None:
+                continue
+            with self._lock:
+                if path != self._following:
+                    # tshark rotated: drain the closed segment unless the mover already handed it over
+                    if self._following:
+                        self._drain(self._following)
+                        self._drained.add(self._following)
+                    self.builder = CaptureIndexBuilder()
+                    self._following = path
+                self._drain(path)
+
+    def segment_closed(self, path):
+        """Counts the rest of a ring segment the mover is about to move out of staging."""
+        with self._lock:
+            if path in self._drained:
+                self._drained.discard(path)
+            elif path == self._following:
+                self._drain(path)
+                self._following = None
+            else:
+                # Rotated out before a poll ever saw it
+                self._drain(path, CaptureIndexBuilder())
+
+    def _drain(self, path, builder=None):
+        try:
+            (builder or self.builder).update(path, self.on_message)
+        except (OSError, ValueError) as e:
+            print(f"Capture indexer: {e}")
+
+    def _update(self, path):
+        with self._lock:
+            self._drain(path)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def finish(self, final_path):
+        """Picks up the tail of the (now closed and moved) capture and writes its index."""
+        self.stop()
+        self._update(final_path)
+        self.on_message = None
+        try:
+            self.builder.write(final_path)
+        except OSError as e:
+            print(f"Could not write capture index for {final_path}: {e}")
+
+class LiveNgapCounters:
+    """
+    Per-procedure and per-UE NGAP counters fed from the capture tail thread.
+    add() is a few dict updates per message; the UI pulls snapshot() on its own
+    fixed timer, so a burst of messages never turns into a burst of redraws.
+    """
+    MAX_UES = 4096
+    RATE_WINDOW = 1.0
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = 0
+        self.procedures = {}   # procedure -> [count, failures]
+        self.ues = {}          # ran_ue_id -> [count, last procedure, last pdu_type]; insertion order = recency
+        self._rate_base = (time.monotonic(), 0, {})
+        self._rates = (0.0, {})
+
+    def add(self, ts, decoded):
+        pdu_type, proc, ies = decoded
+        ran_ue_id = ies.get('ran_ue_id')
+        with self._lock:
+            self.total += 1
+            counts = self.procedures.get(proc)
+            if counts is None:
+                counts = self.procedures[proc] = [0, 0]
+            counts[0] += 1
+            if pdu_type == 2:
+                counts[1] += 1
+            if ran_ue_id is not None:
+                ue = self.ues.pop(ran_ue_id, None)
+                if ue is None:
+                    if len(self.ues) >= self.MAX_UES:
+                        self.ues.pop(next(iter(self.ues)))
+                    ue = [0, proc, pdu_type]
+                ue[0] += 1
+                ue[1], ue[2] = proc, pdu_type
+                self.ues[ran_ue_id] = ue
+
+    def snapshot(self, max_ues=100):
+        """
+        Returns (total, rate, [(procedure, count, failures, rate)], [(ran_ue_id, count, procedure, pdu_type)]).
+        Rates are messages/s over the last RATE_WINDOW; UEs are most recently active first.
+        """
+        with self._lock:
+            total = self.total
+            procs = {p: (c[0], c[1]) for p, c in self.procedures.items()}
+            ues = []
+            for ran_ue_id in reversed(self.ues):
+                ues.append((ran_ue_id, *self.ues[ran_ue_id]))
+                if len(ues) >= max_ues:
+                    break
+
+        now = time.monotonic()
+        base_t, base_total, base_procs = self._rate_base
+        if now - base_t >= self.RATE_WINDOW:
+            dt = now - base_t
+            self._rates = ((total - base_total) / dt,
+                           {p: (c - base_procs.get(p, (0, 0))[0]) / dt for p, (c, _) in procs.items()})
+            self._rate_base = (now, total, procs)
+        rate, proc_rates = self._rates
+        rows = [(p, c, f, proc_rates.get(p, 0.0)) for p, (c, f) in sorted(procs.items())]
+        return total, rate, rows, ues
+
+# -----------------------------------------------------------------------------
+# GTP-U USER-PLANE ANALYSIS
+# -----------------------------------------------------------------------------
+GTPU_PORT = 2152
+GTPU_SNAPLEN = 96       # link + outer IPv4/UDP + GTP-U with a PDU session container + inner IPv4 header
+GTPU_BATCH = 65536
+GTPU_SIZE_BINS = (0, 64, 128, 256, 512, 1024, 1280, 1501, 65536)
+GTPU_DIRECTIONS = {0: "DL", 1: "UL", -1: "?"}
+
+
+def _ipv4_str(v):
+    return socket.inet_ntoa(int(v).to_bytes(4, 'big'))
+
+
+class GtpuCaptureAnalyzer:
+    """
+    Per-TEID / per-UE user-plane statistics from a header-only GTP-U capture.
+    Each packet's first GTPU_SNAPLEN bytes are copied into a fixed (batch x snaplen)
+    matrix; headers are then decoded with NumPy a whole batch at a time, and only
+    small per-TEID accumulators survive between batches.
+    """
+    def __init__(self, batch=GTPU_BATCH):
+        self.batch = batch
+        self._hdr = np.zeros((batch, GTPU_SNAPLEN), dtype=np.uint8)
+        self._hdr_flat = memoryview(self._hdr.reshape(-1))
+        self._caplen = np.zeros(batch, dtype=np.int64)
+        self._ts = np.zeros(batch, dtype=np.float64)
+        self._orig = np.zeros(batch, dtype=np.int64)
+        self._link = np.zeros(batch, dtype=np.int64)
+        self._n = 0
+        self.packets = 0
+        self.gtpu_packets = 0
+        self.first_ts = None
+        self.last_ts = None
+        self.elapsed = 0.0
+        self.teids = {}
+        self.size_hist = np.zeros(len(GTPU_SIZE_BINS) - 1, dtype=np.int64)
+        self.iat_bins_us = np.logspace(0, 7, 71)     # 1 us .. 10 s
+        self.iat_hist = np.zeros(len(self.iat_bins_us) - 1, dtype=np.int64)
+
+    def consume(self, parser, buf, base=0, progress=None, total=None):
+        hdr, caplen, tss, origs, links = self._hdr_flat, self._caplen, self._ts, self._orig, self._link
+        snap = GTPU_SNAPLEN
+        for offset, ts, linktype, orig_len, data in parser.records(buf, base):
+            k = self._n
+            n = len(data) if len(data) < snap else snap
+            hdr[k * snap:k * snap + n] = data[:n]
+            caplen[k] = n
+            tss[k] = ts or 0.0
+            origs[k] = orig_len
+            links[k] = linktype if linktype is not None else -1
+            self._n = k + 1
+            if self._n == self.batch:
+                self._flush()
+                if progress and total:
+                    progress(parser.pos / total)
+        self._flush()
+
+    def _flush(self):
+        n = self._n
+        if not n:
+            return
+        self._n = 0
+        self.packets += n
+        hdr = self._hdr[:n]
+        cap = self._caplen[:n]
+        ts = self._ts[:n]
+        link = self._link[:n]
+        rows = np.arange(n)
+        if self.first_ts is None:
+            self.first_ts = float(ts[0])
+        self.last_ts = float(ts[-1])
+
+        def col(c):
+            return hdr[rows, np.clip(c, 0, GTPU_SNAPLEN - 1)].astype(np.int64)
+
+        def u16(c):
+            return (col(c) << 8) | col(c + 1)
+
+        def u32(c):
+            return (u16(c) << 16) | u16(c + 2)
+
+        # --- Link layer -> L3 offset and ethertype ---
+        l3 = np.full(n, -1, dtype=np.int64)
+        ethertype = np.zeros(n, dtype=np.int64)
+        for lt, off, et_at in ((LINKTYPE_LINUX_SLL, 16, 14), (LINKTYPE_LINUX_SLL2, 20, 0), (LINKTYPE_ETHERNET, 14, 12)):
+            sel = link == lt
+            l3[sel] = off
+            ethertype[sel] = u16(np.full(n, et_at))[sel]
+        vlan = (link == LINKTYPE_ETHERNET) & (ethertype == 0x8100)
+        ethertype[vlan] = u16(np.full(n, 16))[vlan]
+        l3[vlan] += 4
+        for lt, off in ((LINKTYPE_RAW, 0), (LINKTYPE_IPV4, 0), (LINKTYPE_IPV6, 0), (LINKTYPE_NULL, 4)):
+            sel = link == lt
+            l3[sel] = off
+            ethertype[sel] = np.where(col(np.full(n, off)) >> 4 == 4, 0x0800, 0x86DD)[sel]
+
+        # --- Outer IP / UDP ---
+        v4 = ethertype == 0x0800
+        v6 = ethertype == 0x86DD
+        proto = np.where(v4, col(l3 + 9), col(l3 + 6))
+        l4 = np.where(v4, l3 + (col(l3) & 0x0F) * 4, l3 + 40)
+        ok = (l3 >= 0) & (v4 | v6) & (proto == IPPROTO_UDP)
+        ok &= (u16(l4) == GTPU_PORT) | (u16(l4 + 2) == GTPU_PORT)
+
+        # --- GTP-U: version 1, G-PDU, then walk extension headers ---
+        g = l4 + 8
+        flags = col(g)
+        ok &= ((flags >> 5) == 1) & (col(g + 1) == 0xFF) & (g + 8 <= cap)
+        teid = u32(g + 4)
+        inner = g + 8 + np.where(flags & 0x07, 4, 0)
+        next_ext = np.where(flags & 0x04, col(g + 11), 0)
+        pdu_type = np.full(n, -1, dtype=np.int64)
+        for _ in range(4):
+            more = ok & (next_ext != 0)
+            if not more.any():
+                break
+            ext_len = col(inner) * 4
+            ok &= ~(more & (ext_len == 0))
+            # PDU Session Container: first nibble is the PDU type (0 = DL, 1 = UL)
+            pdu_type = np.where(more & (next_ext == 0x85) & (pdu_type < 0), col(inner + 1) >> 4, pdu_type)
+            next_ext = np.where(more, col(inner + ext_len - 1), 0)
+            inner = np.where(more, inner + ext_len, inner)
+
+        # --- Inner IP: user-plane bytes and UE address ---
+        inner_v4 = (col(inner) >> 4 == 4) & (inner + 20 <= cap)
+        length = np.where(inner_v4, u16(inner + 2), np.maximum(self._orig[:n] - inner, 0))
+        src = np.where(inner_v4, u32(inner + 12), 0)
+        dst = np.where(inner_v4, u32(inner + 16), 0)
+
+        if not ok.any():
+            return
+        ts, teid, length, pdu_type = ts[ok], teid[ok], length[ok], pdu_type[ok]
+        src, dst, orig = src[ok], dst[ok], self._orig[:n][ok]
+        self.gtpu_packets += len(ts)
+        self.size_hist += np.histogram(orig, bins=GTPU_SIZE_BINS)[0]
+
+        # --- Group by TEID (time-ordered inside each group) ---
+        order = np.lexsort((ts, teid))
+        teid, ts, length, pdu_type, src, dst = (a[order] for a in (teid, ts, length, pdu_type, src, dst))
+        uniq, starts, counts = np.unique(teid, return_index=True, return_counts=True)
+        byte_sums = np.add.reduceat(length, starts)
+
+        iat = np.diff(ts)
+        same = teid[1:] == teid[:-1]
+        group = np.searchsorted(uniq, teid[1:][same])
+        iat = iat[same]
+        iat_n = np.bincount(group, minlength=len(uniq))
+        iat_sum = np.bincount(group, weights=iat, minlength=len(uniq))
+        iat_sq = np.bincount(group, weights=iat * iat, minlength=len(uniq))
+        iat_max = np.zeros(len(uniq))
+        np.maximum.at(iat_max, group, iat)
+        self.iat_hist += np.histogram(iat * 1e6, bins=self.iat_bins_us)[0]
+        seconds = (ts - self.first_ts).astype(np.int64)
+
+        for j, t in enumerate(uniq.tolist()):
+            s, e = starts[j], starts[j] + counts[j]
+            stats = self.teids.get(t)
+            if stats is None:
+                stats = self.teids[t] = {
+                    'packets': 0, 'bytes': 0, 'first': float(ts[s]), 'last': float(ts[s]),
+                    'direction': -1, 'ue_ip': 0, 'iat_n': 0, 'iat_sum': 0.0, 'iat_sq': 0.0, 'iat_max': 0.0,
+                    'per_second': np.zeros(0),
+                }
+            else:
+                # Gap between this batch and the previous one
+                gap = float(ts[s]) - stats['last']
+                stats['iat_n'] += 1
+                stats['iat_sum'] += gap
+                stats['iat_sq'] += gap * gap
+                stats['iat_max'] = max(stats['iat_max'], gap)
+                self.iat_hist += np.histogram(gap * 1e6, bins=self.iat_bins_us)[0]
+            stats['packets'] += int(counts[j])
+            stats['bytes'] += int(byte_sums[j])
+            stats['last'] = float(ts[e - 1])
+            stats['iat_n'] += int(iat_n[j])
+            stats['iat_sum'] += float(iat_sum[j])
+            stats['iat_sq'] += float(iat_sq[j])
+            stats['iat_max'] = max(stats['iat_max'], float(iat_max[j]))
+
+            if stats['direction'] < 0:
+                kinds = pdu_type[s:e]
+                kinds = kinds[kinds >= 0]
+                if len(kinds):
+                    stats['direction'] = int(kinds[0])
+                elif src[s:e].min() == src[s:e].max() and dst[s:e].min() != dst[s:e].max():
+                    stats['direction'] = 1
+                elif dst[s:e].min() == dst[s:e].max() and src[s:e].min() != src[s:e].max():
+                    stats['direction'] = 0
+            stats['ue_ip'] = int(src[s] if stats['direction'] == 1 else dst[s])
+
+            per_sec = np.bincount(seconds[s:e], weights=length[s:e])
+            acc = stats['per_second']
+            if len(acc) < len(per_sec):
+                acc = np.concatenate([acc, np.zeros(len(per_sec) - len(acc))])
+            acc[:len(per_sec)] += per_sec
+            stats['per_second'] = acc
+
+    def iat_percentiles(self, *qs):
+        cum = np.cumsum(self.iat_hist)
+        if not cum[-1]:
+            return [0.0 for _ in qs]
+        edges = self.iat_bins_us[1:]
+        return [float(edges[np.searchsorted(cum, cum[-1] * q / 100.0)]) for q in qs]
+
+    def format_report(self):
+        lines = []
+        span = (self.last_ts - self.first_ts) if self.first_ts is not None else 0.0
+        lines.append(f"Packets: {self.packets}   GTP-U: {self.gtpu_packets}   TEIDs: {len(self.teids)}   "
+                     f"Span: {span:.1f} s")
+        if self.elapsed:
+            lines.append(f"Analyzed in {self.elapsed:.2f} s")
+        lines.append("")
+        lines.append(f"{'TEID':<12}{'Dir':<5}{'UE IP':<17}{'Packets':>9}{'MB':>9}{'Avg Mbit/s':>12}"
+                     f"{'Peak 1s':>9}{'IAT ms':>9}{'sd':>8}{'max':>9}")
+        per_ue = {}
+        for t, s in sorted(self.teids.items(), key=lambda kv: -kv[1]['bytes']):
+            duration = s['last'] - s['first']
+            avg = s['bytes'] * 8 / duration / 1e6 if duration > 0 else 0.0
+            peak = s['per_second'].max() * 8 / 1e6 if len(s['per_second']) else 0.0
+            mean = s['iat_sum'] / s['iat_n'] if s['iat_n'] else 0.0
+            sd = (max(s['iat_sq'] / s['iat_n'] - mean * mean, 0.0) ** 0.5) if s['iat_n'] else 0.0
+            direction = GTPU_DIRECTIONS[s['direction']]
+            ue = _ipv4_str(s['ue_ip'])
+            lines.append(f"0x{t:08x}  {direction:<5}{ue:<17}{s['packets']:>9}{s['bytes'] / 1e6:>9.2f}{avg:>12.2f}"
+                         f"{peak:>9.2f}{mean * 1e3:>9.3f}{sd * 1e3:>8.3f}{s['iat_max'] * 1e3:>9.2f}")
+            per_ue.setdefault(ue, {}).setdefault(direction, []).append(avg)
+
+        lines.append("")
+        lines.append("Per UE (avg Mbit/s of inner IP bytes, compare with iperf):")
+        for ue, dirs in sorted(per_ue.items()):
+            parts = "   ".join(f"{d} {sum(v):.2f}" for d, v in sorted(dirs.items()))
+            lines.append(f"  {ue:<17}{parts}")
+
+        lines.append("")
+        lines.append("Packet sizes (on the wire):")
+        total = int(self.size_hist.sum()) or 1
+        for lo, hi, count in zip(GTPU_SIZE_BINS[:-1], GTPU_SIZE_BINS[1:], self.size_hist.tolist()):
+            lines.append(f"  {lo:>5}-{hi - 1:<6}{count:>10}  {100.0 * count / total:5.1f}%")
+        p50, p90, p99 = self.iat_percentiles(50, 90, 99)
+        lines.append("")
+        lines.append(f"Inter-arrival within TEID: p50 <= {p50 / 1e3:.3f} ms   p90 <= {p90 / 1e3:.3f} ms   "
+                     f"p99 <= {p99 / 1e3:.3f} ms")
+        return "\n".join(lines)
+
+
+def analyze_gtpu_capture(path, progress=None):
+    """Streams a header-only GTP-U capture (optionally .zst) into a GtpuCaptureAnalyzer."""
+    analyzer = GtpuCaptureAnalyzer()
+    started = time.perf_counter()
+    feed_capture(path, analyzer.consume, progress)
+    analyzer.elapsed = time.perf_counter() - started
+    return analyzer
+
+# -----------------------------------------------------------------------------
+# CAPTURE LIBRARY
+# -----------------------------------------------------------------------------
+CAPTURE_EXTENSIONS = (".pcap", ".pcapng", ".pcap.zst", ".pcapng.zst")
+
+
+def capture_quick_stats(path):
+    """Single streaming pass: (packets, first_ts, last_ts)."""
+    stats = [0, None, None]
+
+    def consume(parser, buf, base, progress, total):
+        for _, ts, _, _, _ in parser.records(buf, base):
+            stats[0] += 1
+            if ts is not None:
+                if stats[1] is None:
+                    stats[1] = ts
+                stats[2] = ts
+
+    feed_capture(path, consume)
+    return tuple(stats)
+
+
+def compute_capture_metadata(path):
+    """Duration, packet count and a one-line summary for the capture library."""
+    if os.path.basename(path).startswith("srs_gtpu_"):
+        packets, first_ts, last_ts = capture_quick_stats(path)
+        summary = "GTP-U headers"
+    else:
+        a = analyze_capture(path)
+        packets, first_ts, last_ts = a.packets, a.first_ts, a.last_ts
+        reg, pdu = a.timings["Registration"], a.timings["PDU Session Setup"]
+        summary = (f"NGAP {a.ngap_messages} msgs, Reg {reg.total} ok/{a.failures['Registration']} fail, "
+                   f"PDU {pdu.total} ok/{a.failures['PDU Session Setup']} fail")
+        if a.causes:
+            summary += f", {sum(a.causes.values())} causes"
+    return {
+        'packets': packets,
+        'duration': (last_ts - first_ts) if first_ts is not None else 0.0,
+        'first_ts': first_ts,
+        'summary': summary,
+    }
+
+
+class CaptureMetadataCache:
+    """
+    Per-capture metadata computed lazily on a small thread pool and persisted as
+    JSON keyed by path, size and mtime_ns. Reopening a folder costs one scandir;
+    captures are only read again when they change.
+    """
+    SAVE_DELAY = 2.0
+
+    def __init__(self, cache_path, workers=2):
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        self._pending = set()
+        self._save_timer = None
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="capture-meta")
+
+    def _load(self):
+        try:
+            with open(self.cache_path) as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def scan(self, folder):
+        """
+        Lists captures in 'folder' (dot-entries such as the staging dir are skipped).
+        Returns [(name, path, size, mtime_ns, metadata or None)], newest first.
+        """
+        rows = []
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    if entry.name.startswith(".") or not entry.name.endswith(CAPTURE_EXTENSIONS):
+                        continue
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                    rows.append((entry.name, entry.path, st.st_size, st.st_mtime_ns,
+                                 self.lookup(entry.path, st.st_size, st.st_mtime_ns)))
+        except OSError:
+            pass
+        rows.sort(key=lambda r: r[3], reverse=True)
+
+        # Forget captures that were deleted from this folder
+        present = {r[1] for r in rows}
+        with self._lock:
+            stale = [p for p in self._entries if os.path.dirname(p) == folder and p not in present]
+            for p in stale:
+                del self._entries[p]
+        if stale:
+            self._schedule_save()
+        return rows
+
+    def lookup(self, path, size, mtime_ns):
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry and entry.get('size') == size and entry.get('mtime_ns') == mtime_ns:
+            return entry.get('meta')
+        return None
+
+    def request(self, path, size, mtime_ns, on_ready):
+        """Computes metadata in the background unless cached or already queued; on_ready(path, meta) runs on the pool."""
+        with self._lock:
+            if path in self._pending:
+                return
+            self._pending.add(path)
+        try:
+            self._pool.submit(self._compute, path, size, mtime_ns, on_ready)
+        except RuntimeError:
+            # Pool already shut down (app is closing)
+            with self._lock:
+                self._pending.discard(path)
+
+    def _compute(self, path, size, mtime_ns, on_ready):
+        try:
+            meta = compute_capture_metadata(path)
+        except (OSError, ValueError) as e:
+            meta = {'packets': None, 'duration': None, 'first_ts': None, 'summary': f"unreadable: {e}"}
+        with self._lock:
+            self._pending.discard(path)
+            self._entries[path] = {'size': size, 'mtime_ns': mtime_ns, 'meta': meta}
+        self._schedule_save()
+        on_ready(path, meta)
+
+    def _schedule_save(self):
+        # Coalesce bursts of results into one write
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(self.SAVE_DELAY, self.save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def save(self):
+        with self._lock:
+            self._save_timer = None
+            data = json.dumps(self._entries)
+        tmp_path = self.cache_path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.cache_path)
+            chown_to_real_user(self.cache_path)
+        except OSError as e:
+            print(f"Could not save capture metadata cache: {e}")
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        with self._lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer:
+            timer.cancel()
+        self.save()
+
+# -----------------------------------------------------------------------------
+# CAPTURE COMPRESSION / ARCHIVAL
+# -----------------------------------------------------------------------------
+ZSTD_LEVEL = 3
+ZSTD_WRITE_CHUNK = 1 << 20
+
+
+def zstd_available():
+    return zstandard is not None or shutil.which("zstd") is not None
+
+
+def compress_capture(path, level=ZSTD_LEVEL, archive=None):
+    """
+    Compresses 'path' to 'path.zst' (written to a temp name, original mtime kept,
+    then renamed) and removes the original and its index. If 'archive' already
+    holds identical content, the new name becomes a hardlink to it instead.
+    If the original is removed meanwhile, nothing is published and FileNotFoundError
+    is raised. Returns (dest, bytes_in, bytes_out, seconds, deduplicated).
+    """
+    dest = path + ZSTD_SUFFIX
+    tmp_path = dest + ".tmp"
+    st = os.stat(path)
+    digest = hashlib.sha256()
+    started = time.perf_counter()
+
+    with open(path, 'rb') as src, open(tmp_path, 'wb') as dst:
+        if zstandard is not None:
+            cctx = zstandard.ZstdCompressor(level=level, write_checksum=True)
+            with cctx.stream_writer(dst, closefd=False) as writer:
+                for chunk in iter(lambda: src.read(ZSTD_WRITE_CHUNK), b''):
+                    digest.update(chunk)
+                    writer.write(chunk)
+        else:
+            proc = subprocess.Popen(["zstd", f"-{level}", "-qc"], stdin=subprocess.PIPE, stdout=dst)
+            try:
+                for chunk in iter(lambda: src.read(ZSTD_WRITE_CHUNK), b''):
+                    digest.update(chunk)
+                    proc.stdin.write(chunk)
+            finally:
+                proc.stdin.close()
+            if proc.wait() != 0:
+                os.remove(tmp_path)
+                raise OSError(f"zstd exited with status {proc.returncode}")
+
+    deduplicated = False
+    existing = archive.lookup(digest.hexdigest()) if archive else None
+    if existing and existing != dest:
+        link_path = dest + ".link"
+        try:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(link_path)
+            os.link(existing, link_path)
+            os.replace(link_path, tmp_path)
+            deduplicated = True
+        except OSError:
+            # Different filesystem or hardlinks not allowed: keep our own copy
+            with contextlib.suppress(OSError):
+                os.remove(link_path)
+    if not deduplicated:
+        os.utime(tmp_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    # Ring retention may drop the segment while it is being compressed; never publish an orphan
+    if not os.path.exists(path):
+        os.remove(tmp_path)
+        raise FileNotFoundError(f"{path} was removed while it was being compressed")
+    os.replace(tmp_path, dest)
+    chown_to_real_user(dest)
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        # Removed between the check and the rename: retention wanted the archive gone too
+        with contextlib.suppress(OSError):
+            os.remove(dest)
+        raise FileNotFoundError(f"{path} was removed while it was being compressed")
+    try:
+        os.remove(capture_index_path(path))
+    except OSError:
+        pass
+    if archive and not deduplicated:
+        archive.remember(digest.hexdigest(), dest)
+    return dest, st.st_size, os.path.getsize(dest), time.perf_counter() - started, deduplicated
+
+
+class CaptureArchiver:
+    """
+    Compresses finished captures on a small worker pool, off the main loop.
+    A manifest of content hashes lets identical captures share one file on disk.
+    """
+    def __init__(self, manifest_path, workers=2, level=ZSTD_LEVEL):
+        self.manifest_path = manifest_path
+        self.level = level
+        self._lock = threading.Lock()
+        try:
+            with open(manifest_path) as f:
+                self._manifest = json.load(f)
+        except (OSError, ValueError):
+            self._manifest = {}
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="capture-zstd")
+
+    def lookup(self, digest):
+        with self._lock:
+            path = self._manifest.get(digest)
+        return path if path and os.path.exists(path) else None
+
+    def remember(self, digest, path):
+        with self._lock:
+            self._manifest[digest] = path
+            # Drop entries whose archive has been deleted
+            self._manifest = {d: p for d, p in self._manifest.items() if os.path.exists(p)}
+            data = json.dumps(self._manifest)
+        tmp_path = self.manifest_path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self.manifest_path)
+            chown_to_real_user(self.manifest_path)
+        except OSError as e:
+            print(f"Could not save capture archive manifest: {e}")
+
+    def submit(self, path, on_done=None):
+        """Queues 'path' for compression; on_done(path, result or None) runs on the worker."""
+        try:
+            self._pool.submit(self._run, path, on_done)
+        except RuntimeError:
+            pass
+
+    def _run(self, path, on_done):
+        try:
+            result = compress_capture(path, self.level, self)
+        except OSError as e:
+            print(f"Could not compress {path}: {e}")
+            result = None
+        if on_done:
+            on_done(path, result)
+
+    def close(self):
+        # Queued captures stay uncompressed; the one in progress is allowed to finish
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def benchmark_zstd(size_mb=200, level=ZSTD_LEVEL):
+    """Compresses a synthetic capture and compares compression throughput with the capture's own data rate."""
+    import tempfile
+    if not zstd_available():
+        print("Neither python3-zstandard nor the zstd tool is installed.")
+        return
+    path = os.path.join(tempfile.gettempdir(), "srs_zstd_bench.pcap")
+    write_synthetic_ngap_pcap(path, max(1, int(size_mb * 1e6 / 1000)))
+    packets, first_ts, last_ts = capture_quick_stats(path)
+    capture_rate = os.path.getsize(path) / max(last_ts - first_ts, 1e-9)
+
+    dest, size_in, size_out, seconds, _ = compress_capture(path, level)
+    rate = size_in / seconds
+    print(f"Compressed {size_in / 1e6:.1f} MB -> {size_out / 1e6:.1f} MB (ratio {size_in / size_out:.1f}x) "
+          f"in {seconds:.2f} s: {rate / 1e6:.1f} MB/s per worker, level {level}")
+    print(f"Capture data rate {capture_rate / 1e6:.3f} MB/s: one worker keeps up with "
+          f"{rate / capture_rate:.0f}x real time")
+
+    analyzer = analyze_capture(dest)
+    print(f"Analyzed the .zst stream in {analyzer.elapsed:.2f} s: "
+          f"{size_in / 1e6 / analyzer.elapsed:.1f} MB/s uncompressed, {analyzer.ngap_messages} NGAP messages")
+    os.remove(dest)
+
+# -----------------------------------------------------------------------------
+# PROCESS OUTPUT LOGS
+# -----------------------------------------------------------------------------
+PROCESS_LOG_ROTATE_BYTES = 16 * 1024 * 1024
+PROCESS_LOG_KEEP = 8               # rotated segments kept per process, newest first
+PROCESS_LOG_READ_CHUNK = 64 * 1024
+PROCESS_LOG_QUEUE_BYTES = 8 * 1024 * 1024   # output buffered for the disk before it is dropped
+PROCESS_LOG_RETRY = 5.0            # seconds between attempts to reopen a log that failed
+
+
+def get_process_log_dir():
+    path = os.path.join(get_app_data_dir(), "logs")
+    if not os.path.isdir(path):
+        try:
+            os.makedirs(path, exist_ok=True)
+            chown_to_real_user(path)
+        except OSError:
+            pass
+    return path
+
+
+def compress_log_segment(path):
+    """Gzips a rotated log segment to path.gz (temp name, then renamed) and removes the original."""
+    tmp_path = path + ".gz.tmp"
+    with open(path, 'rb') as src, gzip.open(tmp_path, 'wb', compresslevel=6) as dst:
+        shutil.copyfileobj(src, dst, PROCESS_LOG_READ_CHUNK)
+    os.replace(tmp_path, path + ".gz")
+    chown_to_real_user(path + ".gz")
+    os.remove(path)
+
+
+class ProcessOutputLog:
+    """
+    Streams one managed process's console output into <log dir>/<name>.log.
+    The command runs under `script`, which copies everything it prints to a
+    FIFO. A reader thread drains the FIFO in fixed-size chunks into 'ring'
+    (the output tail for crash bundles) and a bounded queue; a writer thread
+    empties the queue to disk and rotates the log at a line boundary once it
+    passes PROCESS_LOG_ROTATE_BYTES. Between runs the reader just sits in
+    open() waiting for the next writer.
+
+    The reader never waits for the disk and never closes the FIFO while
+    `script` holds it: when the log cannot be written or the queue is full,
+    output is dropped and counted in 'dropped', 'error' says why, and the log
+    is reopened every PROCESS_LOG_RETRY seconds.
+    """
+    def __init__(self, name, log_dir, fifo_dir, on_rotated=None):
+        self.name = name
+        self.log_dir = log_dir
+        self.path = os.path.join(log_dir, f"{name}.log")
+        self.fifo_path = os.path.join(fifo_dir, f"{name}.fifo")
+        self.on_rotated = on_rotated
+        self.ring = ByteRing(CRASH_RING_BYTES)
+        self.error = None           # why output is being dropped, None while the log is healthy
+        self.dropped = 0            # bytes never written to the log
+        self._stop = threading.Event()
+        self._attached = threading.Event()
+        self._file = None
+        self._retry_at = 0.0
+        self._pending = collections.deque()
+        self._pending_bytes = 0
+        self._reader_done = False
+        self._cond = threading.Condition()
+        # The FIFO is read into one reusable buffer; only what is queued for the disk is copied
+        self._chunk = bytearray(PROCESS_LOG_READ_CHUNK)
+        self._chunk_view = memoryview(self._chunk)
+        os.mkfifo(self.fifo_path, 0o600)
+        threading.Thread(target=self._run, name=f"log-{name}", daemon=True).start()
+        self._writer = threading.Thread(target=self._write_loop, name=f"log-{name}-disk", daemon=True)
+        self._writer.start()
+
+    def wrap(self, command):
+        """Shell command running 'command' on its own pty under script, teed into this log."""
+        return f"script -qfec {shlex.quote(command)} {shlex.quote(self.fifo_path)}"
+
+    def _open_log(self):
+        self._file = open(self.path, 'ab')
+        chown_to_real_user(self.path)
+
+    def _write(self, data):
+        if self._file.tell() + len(data) > PROCESS_LOG_ROTATE_BYTES:
+            cut = data.rfind(b"\n") + 1
+            self._file.write(data[:cut])
+            self._rotate()
+            data = data[cut:]
+        self._file.write(data)
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        segment = os.path.join(self.log_dir, f"{self.name}.{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.log")
+        os.replace(self.path, segment)
+        self._open_log()
+        prefix = f"{self.name}."
+        old = sorted((f for f in os.listdir(self.log_dir)
+                      if f.startswith(prefix) and f[len(prefix):len(prefix) + 1].isdigit()), reverse=True)
+        for stale in old[PROCESS_LOG_KEEP:]:
+            with contextlib.suppress(OSError):
+                os.remove(os.path.join(self.log_dir, stale))
+        if self.on_rotated:
+            self.on_rotated(segment)
+
+    def _queue(self, data):
+        with self._cond:
+            if self._pending_bytes + len(data) > PROCESS_LOG_QUEUE_BYTES:
+                # The disk is not keeping up; dropping here keeps `script` from blocking
+                self._drop(len(data))
+                if self.error is None:
+                    self.error = "log disk too slow"
+                    print(f"Output log for {self.name}: {self.error}, dropping output")
+                return
+            self._pending.append(bytes(data))
+            self._pending_bytes += len(data)
+            self._cond.notify()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                with open(self.fifo_path, 'rb', buffering=0) as fifo:
+                    if self._stop.is_set():
+                        break
+                    self._queue(f"\n===== {self.name} started {datetime.now().isoformat(' ', 'seconds')} =====\n".encode())
+                    self._attached.set()
+                    try:
+                        while True:
+                            n = fifo.readinto(self._chunk)
+                            if not n:
+                                break
+                            data = self._chunk_view[:n]
+                            self.ring.write(data)
+                            self._queue(data)
+                    finally:
+                        self._attached.clear()
+            except OSError as e:
+                # Only opening or reading the FIFO itself gets here
+                print(f"Output log for {self.name} failed: {e}")
+                self._stop.wait(1.0)
+        with self._cond:
+            self._reader_done = True
+            self._cond.notify()
+
+    def _write_loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._reader_done:
+                    self._cond.wait()
+                if not self._pending:
+                    break
+                data = self._pending.popleft()
+                self._pending_bytes -= len(data)
+                more = bool(self._pending)
+            self._store(data, flush=not more)
+        if self._file:
+            with contextlib.suppress(OSError):
+                self._file.close()
+
+    def _store(self, data, flush):
+        if self._file is None:
+            if time.monotonic() < self._retry_at:
+                self._drop(len(data))
+                return
+            try:
+                self._open_log()
+            except OSError as e:
+                self._failed(e, len(data))
+                return
+        try:
+            if self.error is not None:
+                self._file.write(f"\n===== {self.name}: {self.dropped} bytes of output not logged so far "
+                                 f"({self.error}) =====\n".encode())
+            self._write(data)
+            if flush or self.error is not None:
+                self._file.flush()
+        except OSError as e:
+            self._failed(e, len(data))
+            return
+        if self.error is not None:
+            print(f"Output log for {self.name} recovered; {self.dropped} bytes were dropped")
+            self.error = None
+
+    def _drop(self, size):
+        with self._cond:
+            self.dropped += size
+
+    def _failed(self, error, size):
+        self._drop(size)
+        if self.error is None:
+            print(f"Output log for {self.name} failed: {error}; dropping output, retrying in {PROCESS_LOG_RETRY:.0f}s")
+        self.error = str(error)
+        self._retry_at = time.monotonic() + PROCESS_LOG_RETRY
+        if self._file:
+            with contextlib.suppress(OSError):
+                self._file.close()
+            self._file = None
+
+    def wait_drained(self, timeout):
+        """Waits until the FIFO's writer (the exited process's script) has been read to EOF."""
+        deadline = time.monotonic() + timeout
+        while self._attached.is_set() and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def close(self):
+        self._stop.set()
+        # Wake a thread blocked in open(); fails harmlessly if a writer is attached or nobody waits
+        with contextlib.suppress(OSError):
+            os.close(os.open(self.fifo_path, os.O_WRONLY | os.O_NONBLOCK))
+        # The writer empties the queue once the reader is done; a stuck disk must not hold up the exit
+        self._writer.join(timeout=0.5)
+
+
+class ProcessLogManager:
+    """
+    One ProcessOutputLog per managed process, created on first use. Rotated
+    segments are gzipped on a single background worker when compress is set.
+    """
+    def __init__(self, log_dir, compress=True):
+        self.log_dir = log_dir
+        self.compress = compress
+        self.available = shutil.which("script") is not None
+        self._logs = {}
+        self._fifo_dir = None
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-gzip")
+
+    def wrap(self, name, command):
+        """'command' teed into the log for 'name', or unchanged if logging cannot be set up."""
+        log = self._logs.get(name)
+        if log is None:
+            if not self.available:
+                return command
+            try:
+                if self._fifo_dir is None:
+                    self._fifo_dir = tempfile.mkdtemp(prefix="srsran_gui_logs_")
+                log = self._logs[name] = ProcessOutputLog(name, self.log_dir, self._fifo_dir,
+                                                          on_rotated=self._on_rotated)
+            except OSError as e:
+                print(f"Cannot log {name} output: {e}")
+                return command
+        return log.wrap(command)
+
+    def log_path(self, name):
+        return os.path.join(self.log_dir, f"{name}.log")
+
+    def get(self, name):
+        return self._logs.get(name)
+
+    def _on_rotated(self, segment):
+        if not self.compress:
+            return
+        try:
+            self._pool.submit(self._compress, segment)
+        except RuntimeError:
+            pass
+
+    def _compress(self, segment):
+        try:
+            compress_log_segment(segment)
+        except OSError as e:
+            print(f"Could not compress {segment}: {e}")
+
+    def close(self):
+        for log in self._logs.values():
+            log.close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        if self._fifo_dir:
+            shutil.rmtree(self._fifo_dir, ignore_errors=True)
+
+
+# -----------------------------------------------------------------------------
+# CRASH FORENSICS
+# -----------------------------------------------------------------------------
+CRASH_RING_BYTES = 256 * 1024      # output tail kept per managed process
+CRASH_SAMPLE_SLOTS = 300           # /proc samples per process: 10 min at the watchdog's 2 s
+CRASH_DRAIN_TIMEOUT = 1.0          # how long a bundle waits for the last output to arrive
+CRASH_CONFIGS = {"gnb": GNB_CONFIG_PATH, "ue": UE_CONFIG_PATH}
+# What resources.csv measures: the processes the watchdog matches in the tab's job
+CRASH_RESOURCE_SCOPE = {
+    "core": "docker compose CLI only; the 5GC containers run under dockerd and are not included",
+}
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+def get_crash_dir():
+    path = os.path.join(get_app_data_dir(), "crashes")
+    if not os.path.isdir(path):
+        try:
+            os.makedirs(path, exist_ok=True)
+            chown_to_real_user(path)
+        except OSError:
+            pass
+    return path
+
+
+class ByteRing:
+    """Last 'size' bytes written, in one preallocated bytearray; writes copy in place."""
+    def __init__(self, size):
+        self.size = size
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        self._pos = 0
+        self._filled = False
+        self._lock = threading.Lock()
+
+    def write(self, data):
+        n = len(data)
+        with self._lock:
+            if n >= self.size:
+                self._view[:] = data[n - self.size:]
+                self._pos, self._filled = 0, True
+                return
+            end = self._pos + n
+            if end <= self.size:
+                self._view[self._pos:end] = data
+            else:
+                first = self.size - self._pos
+                self._view[self._pos:] = data[:first]
+                self._view[:n - first] = data[first:]
+            if end >= self.size:
+                self._filled = True
+            self._pos = end % self.size
+
+    def snapshot(self):
+        with self._lock:
+            if not self._filled:
+                return bytes(self._view[:self._pos])
+            return bytes(self._view[self._pos:]) + bytes(self._view[:self._pos])
+
+
+class ResourceRing:
+    """
+    Fixed ring of /proc samples (time, CPU seconds, RSS KiB, threads) summed
+    over a process's matching pids; the arrays are allocated once up front.
+    """
+    FIELDS = ("time", "cpu_seconds", "rss_kb", "threads")
+
+    def __init__(self, slots=CRASH_SAMPLE_SLOTS):
+        self.slots = slots
+        self._cols = [array('d', bytes(8 * slots)) for _ in self.FIELDS]
+        self._head = self._count = 0
+        self._lock = threading.Lock()
+
+    def add(self, ts, cpu_seconds, rss_kb, threads):
+        with self._lock:
+            i = self._head
+            ts_col, cpu_col, rss_col, thr_col = self._cols
+            ts_col[i], cpu_col[i], rss_col[i], thr_col[i] = ts, cpu_seconds, rss_kb, threads
+            self._head = (i + 1) % self.slots
+            self._count = min(self._count + 1, self.slots)
+
+    def rows(self):
+        with self._lock:
+            start = (self._head - self._count) % self.slots
+            return [tuple(col[(start + k) % self.slots] for col in self._cols) for k in range(self._count)]
+
+
+def read_proc_usage(pid):
+    """(cpu_seconds, rss_kb, threads) of pid from /proc/<pid>/stat, or None once it is gone."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    fields = data[data.rfind(b")") + 2:].split()
+    return ((int(fields[11]) + int(fields[12])) / CLOCK_TICKS,
+            int(fields[21]) * PAGE_KB, int(fields[17]))
+
+
+def write_crash_bundle(crash_dir, key, reason, output, samples, config_path=None):
+    """
+    Writes <crash_dir>/<key>_<timestamp>/ with the output tail, the resource
+    samples, a copy of the active config and meta.json. The bundle is built
+    under a temporary name and renamed into place, so a bundle that exists is
+    complete. Returns its path.
+    """
+    final = os.path.join(crash_dir, f"{key}_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+    tmp_dir = final + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    with open(os.path.join(tmp_dir, "output.log"), 'wb') as f:
+        f.write(output if output is not None else b"(output not captured: process logs are disabled)\n")
+    with open(os.path.join(tmp_dir, "resources.csv"), 'w') as f:
+        f.write(",".join(ResourceRing.FIELDS) + "\n")
+        for ts, cpu, rss, threads in samples:
+            f.write(f"{ts:.1f},{cpu:.2f},{int(rss)},{int(threads)}\n")
+
+    meta = {"process": key, "reason": reason, "time": time.time(), "config_path": config_path,
+            "resources": CRASH_RESOURCE_SCOPE.get(key, "the process and its wrappers (script, sudo)")}
+    if config_path and os.path.isfile(config_path):
+        shutil.copy2(config_path, os.path.join(tmp_dir, os.path.basename(config_path)))
+        with open(config_path, 'rb') as f:
+            meta["config_sha256"] = hashlib.sha256(f.read()).hexdigest()
+    with open(os.path.join(tmp_dir, "meta.json"), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    if os.path.exists(final):
+        final += f"_{int(time.time() * 1000) % 1000:03d}"
+    os.rename(tmp_dir, final)
+    for name in os.listdir(final):
+        chown_to_real_user(os.path.join(final, name))
+    chown_to_real_user(final)
+    return final
+
+
+# -----------------------------------------------------------------------------
+# TERMINAL POOL
+# -----------------------------------------------------------------------------
+TERMINAL_SCROLLBACK_LINES = 1000
+# Tabs that run a managed process; their terminals are never recycled
+MANAGED_TERMINAL_KEYS = {"core", "gnb", "ue", "tshark", "grafana", "core_iperf", "ue_iperf"}
+
+
+def terminal_text(terminal):
+    # get_text() is deprecated from VTE 0.76 on, where get_text_format() replaces it
+    if hasattr(terminal, "get_text_format"):
+        return terminal.get_text_format(Vte.Format.TEXT) or ""
+    return terminal.get_text(None, None)[0] or ""
+
+
+class TerminalPool:
+    """
+    Keeps 'size' Vte terminals with an idle /bin/bash already running, so a
+    new tab only packs a terminal instead of constructing one and waiting for
+    a shell. Closed tabs whose shell is back at its prompt are reset and
+    returned to the pool rather than destroyed. Refills happen one terminal
+    per low-priority idle callback. GTK thread only.
+    """
+    def __init__(self, size):
+        self.size = max(0, int(size))
+        self._idle = []
+        self._refill_id = None
+        self.handed_out = collections.Counter()     # "pooled" / "fresh"
+        # Seconds from handing a terminal out until a command's output shows up, per kind
+        self.first_output = {"pooled": collections.deque(maxlen=200), "fresh": collections.deque(maxlen=200)}
+        self.refill()
+
+    def _spawn(self):
+        terminal = Vte.Terminal()
+        terminal.set_scrollback_lines(TERMINAL_SCROLLBACK_LINES)
+        terminal.shell_pid = None
+        def on_spawned(term, pid, error, *_):
+            if error is None and pid > 0:
+                term.shell_pid = pid
+        terminal.spawn_async(Vte.PtyFlags.DEFAULT, os.environ['HOME'], ["/bin/bash"], [],
+                             GLib.SpawnFlags.DEFAULT, None, None, -1, None, on_spawned, None)
+        terminal.connect("child-exited", self._on_child_exited)
+        return terminal
+
+    def _on_child_exited(self, terminal, _status):
+        terminal.shell_pid = None
+        if terminal in self._idle:
+            self._idle.remove(terminal)
+            self.refill()
+
+    def refill(self):
+        if self._refill_id is None and len(self._idle) < self.size:
+            self._refill_id = GLib.idle_add(self._refill_one, priority=GLib.PRIORITY_LOW)
+
+    def _refill_one(self):
+        if len(self._idle) < self.size:
+            self._idle.append(self._spawn())
+        if len(self._idle) < self.size:
+            return True
+        self._refill_id = None
+        return False
+
+    def resize(self, size):
+        self.size = max(0, int(size))
+        dropped = self._idle[self.size:]
+        del self._idle[self.size:]
+        for terminal in dropped:
+            terminal.destroy()
+        self.refill()
+
+    def acquire(self):
+        """A terminal for a new tab: a pre-spawned one if available, else a fresh spawn."""
+        kind = "pooled" if self._idle else "fresh"
+        terminal = self._idle.pop() if self._idle else self._spawn()
+        self.handed_out[kind] += 1
+        terminal.handed_out_at = (kind, time.perf_counter())
+        self.refill()
+        return terminal
+
+    def measure_output(self, terminal, command):
+        """
+        Records the time from hand-out until 'command', typed into the tab, prints
+        its first output (anything after its echoed line). A pooled terminal already
+        shows its prompt while a fresh one has yet to draw it, so both are timed to
+        the output of a command instead. Only a tab's first command is timed.
+        """
+        handed_out = getattr(terminal, "handed_out_at", None)
+        lines = command.strip().splitlines()
+        if handed_out is None or not lines:
+            return
+        terminal.handed_out_at = None
+        kind, started = handed_out
+        line = lines[-1]
+        def on_contents(term):
+            text = terminal_text(term)
+            at = text.rfind(line)
+            if at >= 0 and text[at + len(line):].strip():
+                self.first_output[kind].append(time.perf_counter() - started)
+                term.disconnect(term.output_probe)
+                term.output_probe = None
+        terminal.output_probe = terminal.connect("contents-changed", on_contents)
+
+    def at_prompt(self, terminal, nested=False):
+        """
+        True once the terminal's bash is running and nothing else is in the foreground.
+        With 'nested', a shell started from it (e.g. 'sudo su') waiting at its own
+        prompt counts too.
+        """
+        pid = getattr(terminal, "shell_pid", None)
+        pty = terminal.get_pty()
+        if not pid or pty is None:
+            return False
+        try:
+            pgid = os.tcgetpgrp(pty.get_fd())
+        except OSError:
+            return False
+        if pgid == pid or not nested:
+            return pgid == pid
+        names = []
+        for job_pid in foreground_job_pids(pgid):
+            try:
+                with open(f"/proc/{job_pid}/comm") as f:
+                    names.append(f.read().strip())
+            except OSError:
+                pass
+        return all(name in SHELL_NAMES or name == "sudo" for name in names)
+
+    def release(self, terminal):
+        """Takes back a closed tab's terminal if the pool has room and its shell is idle."""
+        if len(self._idle) >= self.size or not self.at_prompt(terminal):
+            return False
+        parent = terminal.get_parent()
+        if parent:
+            parent.remove(terminal)
+        if getattr(terminal, "output_probe", None):
+            # Closed before its command printed anything; the next tab is timed afresh
+            terminal.disconnect(terminal.output_probe)
+            terminal.output_probe = None
+        terminal.reset(True, True)
+        terminal.feed_child(b"\x0c")    # readline redraws a fresh prompt on the cleared screen
+        self._idle.append(terminal)
+        return True
+
+    def stats(self):
+        # sorted() copies each deque in one step under the GIL, so the exporter thread may call this
+        def p50(values):
+            return sorted(values)[len(values) // 2] if values else None
+        return {kind: (self.handed_out[kind], p50(values)) for kind, values in self.first_output.items()}
+
+
+# -----------------------------------------------------------------------------
+# TAB MEMORY BUDGET
+# -----------------------------------------------------------------------------
+TAB_MEMORY_INTERVAL = 5            # seconds between measurements
+VTE_BYTES_PER_CELL = 16            # rough in-memory cost of one VTE cell (character plus attributes)
+
+
+def process_tree_rss(root_pids):
+    """RSS in bytes of each root pid plus everything below it, from one pass over /proc."""
+    children = collections.defaultdict(list)
+    rss = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", "rb") as f:
+                data = f.read()
+        except OSError:
+            continue
+        fields = data[data.rfind(b")") + 2:].split()
+        pid = int(name)
+        children[int(fields[1])].append(pid)
+        rss[pid] = int(fields[21]) * PAGE_KB * 1024
+    totals = {}
+    for root in root_pids:
+        total, stack, seen = 0, [root], set()
+        while stack:
+            pid = stack.pop()
+            if pid in seen:
+                continue
+            seen.add(pid)
+            total += rss.get(pid, 0)
+            stack.extend(children.get(pid, ()))
+        totals[root] = total
+    return totals
+
+
+class TabMemoryManager:
+    """
+    Tracks what each terminal tab costs (an estimate of its VTE buffer plus
+    the RSS of its shell and everything running under it) and picks the
+    least recently viewed read-only tabs to close when those tabs together
+    exceed the budget. Protected tabs are measured and reported but neither
+    evicted nor counted against the budget: their cost is the testbed itself.
+    """
+    def __init__(self, budget_bytes):
+        self.budget = budget_bytes
+        self.last_viewed = {}       # key -> time.monotonic() of the last view
+        self.usage = {}             # key -> (buffer bytes, rss bytes); replaced whole on each measurement
+        self.evictions = 0
+
+    def touch(self, key):
+        self.last_viewed[key] = time.monotonic()
+
+    def forget(self, key):
+        self.last_viewed.pop(key, None)
+
+    @staticmethod
+    def measure(tabs):
+        """tabs: {key: (buffer bytes, shell pid or None)}. Reads /proc, so it runs off the GTK thread."""
+        rss = process_tree_rss([pid for _, pid in tabs.values() if pid])
+        return {key: (buffer_bytes, rss.get(pid, 0)) for key, (buffer_bytes, pid) in tabs.items()}
+
+    def totals(self, protected=()):
+        """(budgeted bytes, protected bytes) of the last measurement."""
+        budgeted = sum(sum(cost) for key, cost in self.usage.items() if key not in protected)
+        return budgeted, sum(sum(cost) for key, cost in self.usage.items() if key in protected)
+
+    def victims(self, protected, keep=()):
+        """Tabs to close, least recently viewed first, until the budgeted tabs fit."""
+        total, _ = self.totals(protected)
+        candidates = sorted((key for key in self.usage if key not in protected and key not in keep),
+                            key=lambda key: self.last_viewed.get(key, 0))
+        chosen = []
+        for key in candidates:
+            if total <= self.budget:
+                break
+            chosen.append(key)
+            total -= sum(self.usage[key])
+        return chosen
+
+
+# -----------------------------------------------------------------------------
+# TIME-SERIES STORE
+# -----------------------------------------------------------------------------
+# (bucket seconds, slots) per resolution, finest first; 0 keeps raw samples.
+# Defaults: 600 raw samples, 15 min at 1 s, 3 h at 10 s and 24 h at 1 min.
+TS_RESOLUTIONS = ((0, 600), (1, 900), (10, 1080), (60, 1440))
+
+
+class _SeriesRing:
+    """Preallocated ring of (ts, min, max, mean) buckets at one resolution."""
+    __slots__ = ("step", "size", "ts", "lo", "hi", "mean", "head", "count",
+                 "_bucket", "_n", "_sum", "_lo", "_hi")
+
+    def __init__(self, step, size):
+        self.step, self.size = step, size
+        self.ts = array('d', bytes(8 * size))
+        self.mean = array('d', bytes(8 * size))
+        # A raw ring holds one sample per slot, so min and max are the value itself
+        self.lo = array('d', bytes(8 * size)) if step else self.mean
+        self.hi = array('d', bytes(8 * size)) if step else self.mean
+        self.head = self.count = 0
+        self._bucket = None
+
+    def add(self, ts, value):
+        if not self.step:
+            if not self.count or ts >= self.ts[self.head - 1]:
+                self._push(ts, value, value, value)
+            return
+        bucket = ts - ts % self.step
+        if self._bucket is None or bucket > self._bucket:
+            if self._bucket is not None:
+                self._push(self._bucket, self._lo, self._hi, self._sum / self._n)
+            self._bucket, self._n, self._sum, self._lo, self._hi = bucket, 0, 0.0, value, value
+        # Late samples fold into the open bucket so the ring stays sorted
+        self._n += 1
+        self._sum += value
+        if value < self._lo:
+            self._lo = value
+        elif value > self._hi:
+            self._hi = value
+
+    def _push(self, ts, lo, hi, mean):
+        i = self.head
+        self.ts[i] = ts
+        self.mean[i] = mean
+        if self.step:
+            self.lo[i] = lo
+            self.hi[i] = hi
+        self.head = (i + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+    def covers(self, since):
+        """True if nothing at or after 'since' has been overwritten yet."""
+        return self.count < self.size or self.ts[self.head] <= since
+
+    def _search(self, t, right=False):
+        # First logical slot with ts >= t (ts > t when 'right')
+        base, size = self.head - self.count, self.size
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            v = self.ts[(base + mid) % size]
+            if v < t or (right and v == t):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def count_between(self, since, until):
+        return self._search(until, right=True) - self._search(since) + (self._bucket is not None)
+
+    def buckets(self, since, until):
+        """[(ts, min, max, mean)] within [since, until], the open bucket included."""
+        base, size = self.head - self.count, self.size
+        out = []
+        for i in range(self._search(since), self._search(until, right=True)):
+            j = (base + i) % size
+            out.append((self.ts[j], self.lo[j], self.hi[j], self.mean[j]))
+        if self._bucket is not None and since <= self._bucket <= until:
+            out.append((self._bucket, self._lo, self._hi, self._sum / self._n))
+        return out
+
+
+def lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets downsampling of [(x, y)], keeping the first and last point."""
+    n = len(points)
+    if n <= threshold or threshold < 3:
+        return list(points)
+    out = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        nxt = points[end:min(int((i + 2) * every) + 1, n)] or points[-1:]
+        avg_x = sum(p[0] for p in nxt) / len(nxt)
+        avg_y = sum(p[1] for p in nxt) / len(nxt)
+        ax, ay = points[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        out.append(points[best])
+        a = best
+    out.append(points[-1])
+    return out
+
+
+class TimeSeriesStore:
+    """
+    Thread-safe store of numeric series keyed by any hashable id. Each sample
+    goes into one fixed-size ring per resolution, so memory per series is
+    constant and a query reads the finest ring that still covers its window
+    with a few buckets per output point, then downsamples with LTTB.
+    """
+    OVERSAMPLE = 4    # buckets per output point before falling back to a coarser ring
+
+    def __init__(self, resolutions=TS_RESOLUTIONS):
+        self.resolutions = tuple(resolutions)
+        self._lock = threading.Lock()
+        self._series = {}      # key -> [_SeriesRing per resolution]
+
+    def add(self, key, ts, value):
+        value = float(value)
+        with self._lock:
+            rings = self._series.get(key)
+            if rings is None:
+                rings = self._series[key] = [_SeriesRing(step, size) for step, size in self.resolutions]
+            for ring in rings:
+                ring.add(ts, value)
+
+    def keys(self):
+        with self._lock:
+            return list(self._series)
+
+    def _pick(self, rings, since, until, max_points):
+        for ring in rings:
+            if ring.covers(since) and (max_points is None or
+                                       ring.count_between(since, until) <= max_points * self.OVERSAMPLE):
+                return ring
+        return rings[-1]
+
+    def rollups(self, key, since=None, until=None, max_points=None):
+        """[(ts, min, max, mean)] from the finest suitable resolution."""
+        since = float("-inf") if since is None else since
+        until = float("inf") if until is None else until
+        with self._lock:
+            rings = self._series.get(key)
+            if not rings:
+                return []
+            return self._pick(rings, since, until, max_points).buckets(since, until)
+
+    def series(self, key, since=None, until=None, max_points=None):
+        """[(ts, mean)] over [since, until], at most 'max_points' long when given."""
+        points = [(ts, mean) for ts, _, _, mean in self.rollups(key, since, until, max_points)]
+        return lttb(points, max_points) if max_points else points
+
+
+# -----------------------------------------------------------------------------
+# NATIVE gNB METRICS
+# -----------------------------------------------------------------------------
+# The gNB sends one JSON report per period over UDP when its config has
+#   metrics: { enable_json_metrics: true, addr: 127.0.0.1, port: 55555 }
+GNB_METRICS_PORT = 55555
+GNB_METRICS_HOST = "127.0.0.1"     # the gNB normally reports from the same machine
+
+# Grafana from the srsRAN docker compose file; kept warm across gNB restarts
+GRAFANA_URL = "http://127.0.0.1:3300/"
+GRAFANA_START_GRACE = 2.0          # seconds a cold Grafana gets before the gNB starts anyway
+GRAFANA_STOP_GRACE = 15.0          # seconds 'docker compose up' gets to stop after Ctrl+C
+GNB_METRICS_WINDOWS = [(120, "2 min"), (900, "15 min"), (3600, "1 h"), (6 * 3600, "6 h"), (86400, "24 h")]
+
+# (title, unit, scale, [(field, label, rgb)])
+GNB_METRICS_CHARTS = [
+    ("Throughput", "Mbit/s", 1e-6, [("dl_brate", "DL", (0.30, 0.75, 0.95)), ("ul_brate", "UL", (0.95, 0.65, 0.25))]),
+    ("MCS", "", 1.0, [("dl_mcs", "DL", (0.30, 0.75, 0.95)), ("ul_mcs", "UL", (0.95, 0.65, 0.25))]),
+    ("Channel quality", "", 1.0, [("cqi", "CQI", (0.55, 0.85, 0.45)), ("pusch_snr_db", "PUSCH SNR dB", (0.85, 0.45, 0.85))]),
+    ("BLER", "%", 1.0, [("dl_bler", "DL", (0.30, 0.75, 0.95)), ("ul_bler", "UL", (0.95, 0.65, 0.25))]),
+]
+
+
+def gnb_metrics_config_issue(config_path=GNB_CONFIG_PATH, port=GNB_METRICS_PORT, host=GNB_METRICS_HOST):
+    """
+    Looks for the JSON metrics section the native charts need in the gNB config.
+    Returns None when it is there, else a short hint for the metrics status line.
+    Only the top-level 'metrics' block is read, in block or flow style.
+    """
+    try:
+        with open(config_path) as f:
+            lines = f.read().splitlines()
+    except OSError as e:
+        return f"could not read {config_path}: {e.strerror}"
+    section, inside = {}, False
+    for line in lines:
+        text = line.split('#', 1)[0].rstrip()
+        if not text.strip():
+            continue
+        if not text[0].isspace():
+            key, _, rest = text.partition(':')
+            inside = key.strip() == "metrics"
+            rest = rest.strip()
+            if inside and rest.startswith('{'):
+                for item in rest.strip('{}').split(','):
+                    k, _, v = item.partition(':')
+                    section[k.strip()] = v.strip()
+            continue
+        if inside:
+            k, _, v = text.strip().partition(':')
+            section[k.strip()] = v.strip()
+    name = os.path.basename(config_path)
+    if not section:
+        return f"{name} has no 'metrics' section"
+    if section.get("enable_json_metrics", "").lower() != "true":
+        return f"{name} does not set metrics: enable_json_metrics: true"
+    if section.get("port", str(port)) != str(port):
+        return f"{name} sends metrics to port {section['port']}"
+    addr = section.get("addr", GNB_METRICS_HOST)
+    if host != "0.0.0.0" and addr != host:
+        return f"{name} sends metrics to {addr}, but the GUI listens on {host}"
+    return None
+
+
+def parse_gnb_metrics(report):
+    """
+    Normalizes one gNB JSON metrics report, either the legacy layout
+    ({"ue_list": [{"ue_container": {...}}]}) or the per-cell one
+    ({"cells": [{"cell_metrics": {...}, "ue_list": [...]}]}), into
+    (timestamp or None, [cell dicts], [ue dicts]).
+    """
+    cells, ues = [], []
+    for cell in report.get("cells") or []:
+        cell_metrics = dict(cell.get("cell_metrics") or {})
+        cell_ues = [u.get("ue_container", u) for u in cell.get("ue_list") or []]
+        if "pci" not in cell_metrics and cell_ues:
+            cell_metrics["pci"] = cell_ues[0].get("pci")
+        cells.append(cell_metrics)
+        ues.extend(cell_ues)
+    for item in report.get("ue_list") or []:
+        ues.append(item.get("ue_container", item))
+    return report.get("timestamp"), cells, ues
+
+
+class GnbMetricsStore:
+    """Per-UE and per-cell metric histories in a TimeSeriesStore keyed by (scope, key, field)."""
+    def __init__(self, resolutions=TS_RESOLUTIONS):
+        self.store = TimeSeriesStore(resolutions)
+        self.reports = 0
+        self.last_report = None
+
+    def ingest(self, report, now=None):
+        ts, cells, ues = parse_gnb_metrics(report)
+        ts = ts if isinstance(ts, (int, float)) else (now or time.time())
+        totals = {}
+        add = self.store.add
+        self.reports += 1
+        self.last_report = ts
+        for ue in ues:
+            key = f"{ue.get('pci', '?')}/{ue.get('rnti', '?')}"
+            for field, value in ue.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    add(("ue", key, field), ts, value)
+            for direction in ("dl", "ul"):
+                ok, nok = ue.get(f"{direction}_nof_ok") or 0, ue.get(f"{direction}_nof_nok") or 0
+                if ok + nok:
+                    add(("ue", key, f"{direction}_bler"), ts, 100.0 * nok / (ok + nok))
+            cell_totals = totals.setdefault(ue.get('pci', '?'), {"dl_brate": 0.0, "ul_brate": 0.0, "nof_ues": 0})
+            cell_totals["dl_brate"] += ue.get("dl_brate") or 0.0
+            cell_totals["ul_brate"] += ue.get("ul_brate") or 0.0
+            cell_totals["nof_ues"] += 1
+        for cell in cells:
+            for field, value in cell.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool) and field != "pci":
+                    add(("cell", str(cell.get("pci", "?")), field), ts, value)
+        for pci, fields in totals.items():
+            for field, value in fields.items():
+                add(("cell", str(pci), field), ts, value)
+
+    def keys(self, scope):
+        return sorted({k for s, k, _ in self.store.keys() if s == scope})
+
+    def series(self, scope, key, field, since=None, max_points=None):
+        return self.store.series((scope, key, field), since, max_points=max_points)
+
+
+class GnbMetricsReceiver:
+    """Receives the gNB's JSON metrics datagrams and feeds them into a GnbMetricsStore."""
+    def __init__(self, store, port=GNB_METRICS_PORT, host=GNB_METRICS_HOST):
+        self.store = store
+        self.port = port
+        self.host = host
+        self.datagrams = 0
+        self.errors = 0
+        self._sock = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.settimeout(0.5)
+        self._sock = sock
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                data = self._sock.recv(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.datagrams += 1
+            # Usually one JSON object per datagram; tolerate newline-separated batches
+            for line in data.splitlines():
+                if not line.strip():
+                    continue
+                try:
+                    self.store.ingest(json.loads(line))
+                except (ValueError, AttributeError, TypeError):
+                    self.errors += 1
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+
+
+def run_fake_gnb_metrics(port=GNB_METRICS_PORT, n_ues=2, interval=1.0, legacy=False):
+    """Stands in for the gNB: sends synthetic JSON metrics to localhost until interrupted."""
+    import math, random
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    print(f"Sending {'legacy' if legacy else 'per-cell'} gNB metrics for {n_ues} UE(s) to 127.0.0.1:{port}, Ctrl+C to stop")
+    t = 0
+    try:
+        while True:
+            ues = []
+            for i in range(n_ues):
+                phase = t / 20.0 + i
+                dl_ok = random.randint(800, 1000)
+                ul_ok = random.randint(300, 400)
+                ues.append({
+                    "pci": 1, "rnti": 17921 + i, "cqi": 12 + int(3 * math.sin(phase)),
+                    "dl_mcs": 20 + int(7 * math.sin(phase)), "ul_mcs": 18 + int(6 * math.cos(phase)),
+                    "dl_brate": 20e6 * (1.2 + math.sin(phase)), "ul_brate": 5e6 * (1.2 + math.cos(phase)),
+                    "dl_nof_ok": dl_ok, "dl_nof_nok": random.randint(0, dl_ok // 20),
+                    "ul_nof_ok": ul_ok, "ul_nof_nok": random.randint(0, ul_ok // 20),
+                    "pusch_snr_db": 25 + 5 * math.sin(phase), "bsr": random.randint(0, 5000), "ta_ns": 0,
+                })
+            if legacy:
+                report = {"timestamp": time.time(), "ue_list": [{"ue_container": u} for u in ues]}
+            else:
+                report = {"timestamp": time.time(),
+                          "cells": [{"cell_metrics": {"pci": 1, "average_latency": 250 + 50 * random.random(),
+                                                      "nof_failed_pdcch_allocs": 0},
+                                     "ue_list": ues}]}
+            sock.sendto(json.dumps(report).encode(), ("127.0.0.1", port))
+            t += 1
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sock.close()
+
+
+def grafana_is_healthy(timeout=0.5):
+    """True if the Grafana at GRAFANA_URL answers its health endpoint with a working database."""
+    try:
+        with urllib.request.urlopen(GRAFANA_URL + "api/health", timeout=timeout) as resp:
+            return resp.status == 200 and json.loads(resp.read() or b"{}").get("database") == "ok"
+    except (OSError, ValueError):
+        return False
+
+
+def draw_time_series(cr, width, height, title, unit, series, start, end):
+    """Cairo line chart: 'series' is [(label, rgb, [(ts, value)])] over [start, end]."""
+    left, right, top, bottom = 48, 10, 24, 20
+    plot_w, plot_h = max(width - left - right, 1), max(height - top - bottom, 1)
+
+    cr.set_source_rgb(0.16, 0.18, 0.22)
+    cr.rectangle(0, 0, width, height)
+    cr.fill()
+
+    values = [v for _, _, points in series for _, v in points]
+    vmax = max(values) if values else 1.0
+    vmin = min(0.0, min(values)) if values else 0.0
+    if vmax - vmin < 1e-9:
+        vmax = vmin + 1.0
+    vmax += (vmax - vmin) * 0.1
+
+    # Grid and y labels
+    cr.set_font_size(10)
+    cr.set_line_width(1)
+    for i in range(5):
+        y = top + plot_h * i / 4
+        cr.set_source_rgba(1, 1, 1, 0.08)
+        cr.move_to(left, y)
+        cr.line_to(left + plot_w, y)
+        cr.stroke()
+        cr.set_source_rgba(1, 1, 1, 0.6)
+        cr.move_to(4, y + 4)
+        cr.show_text(f"{vmax - (vmax - vmin) * i / 4:.1f}")
+
+    # Title and legend
+    cr.set_font_size(12)
+    cr.set_source_rgb(0.9, 0.9, 0.9)
+    cr.move_to(left, 16)
+    cr.show_text(f"{title} ({unit})" if unit else title)
+    x_legend = left + plot_w
+    for label, rgb, _ in reversed(series):
+        extents = cr.text_extents(label)
+        x_legend -= extents.x_advance + 22
+        cr.set_source_rgb(*rgb)
+        cr.rectangle(x_legend, 8, 10, 10)
+        cr.fill()
+        cr.move_to(x_legend + 14, 17)
+        cr.show_text(label)
+
+    span = max(end - start, 1e-9)
+    cr.set_line_width(1.5)
+    for label, rgb, points in series:
+        if not points:
+            continue
+        cr.set_source_rgb(*rgb)
+        for i, (ts, v) in enumerate(points):
+            x = left + plot_w * (ts - start) / span
+            y = top + plot_h * (1 - (v - vmin) / (vmax - vmin))
+            if i == 0:
+                cr.move_to(x, y)
+            else:
+                cr.line_to(x, y)
+        cr.stroke()
+
+    cr.set_font_size(10)
+    cr.set_source_rgba(1, 1, 1, 0.6)
+    cr.move_to(left, height - 5)
+    cr.show_text(f"-{int(span)} s" if span < 600 else f"-{span / 60:.0f} min" if span < 7200 else f"-{span / 3600:.0f} h")
+    cr.move_to(left + plot_w - 24, height - 5)
+    cr.show_text("now")
+
+
+# -----------------------------------------------------------------------------
+# FUZZY FILTER
+# -----------------------------------------------------------------------------
+def fuzzy_match(query, text):
+    """True if the characters of 'query' appear in 'text' in order (both lower-case)."""
+    chars = iter(text)
+    return all(c in chars for c in query)
+
+
+class FuzzyFilterIndex:
+    """
+    Incremental fuzzy filter over a fixed list of names. Whatever matches a
+    query also matches each of its prefixes, so a query is only checked
+    against the cached matches of its longest previously seen prefix: typing
+    narrows the candidate set instead of rescanning every name.
+    """
+    MAX_CACHED = 64
+
+    def __init__(self, names):
+        self._lower = [n.lower() for n in names]
+        self._all = list(range(len(self._lower)))
+        self._cache = {"": self._all}
+
+    def matches(self, query):
+        """Indices of matching names, in their original order."""
+        query = query.strip().lower()
+        hit = self._cache.get(query)
+        if hit is not None:
+            return hit
+        base = query[:-1]
+        while base not in self._cache:
+            base = base[:-1]
+        lower = self._lower
+        result = [i for i in self._cache[base] if fuzzy_match(query, lower[i])]
+        if len(self._cache) >= self.MAX_CACHED:
+            self._cache = {"": self._all}
+        self._cache[query] = result
+        return result
+
+
+class DirectoryListingCache:
+    """
+    Local directory listings produced by a background os.scandir worker and
+    cached per directory. A Gio.FileMonitor on each cached directory drops its
+    entry on change (and calls on_change(path)), so repeat visits are served
+    from memory and only a directory that changed is scanned again.
+    Everything except the scan itself runs on the GTK thread.
+    """
+    MONITOR_RATE_LIMIT_MS = 500
+
+    def __init__(self, on_change=None):
+        self.on_change = on_change
+        self._entries = {}                          # path -> sorted [(name, is_dir)]
+        self._monitors = {}                         # path -> Gio.FileMonitor
+        self._generation = collections.Counter()    # bumped on invalidation; stale scans are not cached
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="dir-scan")
+
+    def request(self, path, on_ready):
+        """
+        Calls on_ready(entries, or None if unreadable) on the GTK thread.
+        Returns True if it was answered from the cache, synchronously.
+        """
+        cached = self._entries.get(path)
+        if cached is not None:
+            on_ready(cached)
+            return True
+        try:
+            self._pool.submit(self._scan, path, self._generation[path], on_ready)
+        except RuntimeError:
+            pass
+        return False
+
+    def _scan(self, path, generation, on_ready):
+        try:
+            with os.scandir(path) as it:
+                entries = []
+                for entry in it:
+                    try:
+                        entries.append((entry.name, entry.is_dir()))
+                    except OSError:
+                        entries.append((entry.name, False))
+            entries.sort()
+        except OSError:
+            entries = None
+        GLib.idle_add(self._deliver, path, generation, entries, on_ready)
+
+    def _deliver(self, path, generation, entries, on_ready):
+        if entries is not None and generation == self._generation[path] and self._watch(path):
+            self._entries[path] = entries
+        on_ready(entries)
+        return False
+
+    def _watch(self, path):
+        if path in self._monitors:
+            return True
+        try:
+            monitor = Gio.File.new_for_path(path).monitor_directory(Gio.FileMonitorFlags.NONE, None)
+        except GLib.Error as e:
+            # Without change notifications the listing is not cached at all
+            print(f"Cannot watch {path}: {e}")
+            return False
+        monitor.set_rate_limit(self.MONITOR_RATE_LIMIT_MS)
+        monitor.connect("changed", lambda *args: self.invalidate(path))
+        self._monitors[path] = monitor
+        return True
+
+    def invalidate(self, path):
+        self._generation[path] += 1
+        if self._entries.pop(path, None) is not None and self.on_change:
+            self.on_change(path)
+
+    def close(self):
+        for monitor in self._monitors.values():
+            monitor.cancel()
+        self._monitors.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+# -----------------------------------------------------------------------------
+# SHUTDOWN COORDINATION
+# -----------------------------------------------------------------------------
+# Each step: (signal, seconds the process gets to exit before the next one)
+SHUTDOWN_ESCALATION = ((signal.SIGINT, 4.0), (signal.SIGTERM, 2.0), (signal.SIGKILL, 1.0))
+# Longer first step where Ctrl+C starts a graceful stop of its own (docker compose stops its containers)
+SHUTDOWN_GRACE = {"core": 12.0, "grafana": 12.0}
+# Tabs stopped stage by stage: clients before the gNB, the gNB before the core,
+# and the capture last so it still records the NGAP teardown
+SHUTDOWN_ORDER = (("ue", "ue_iperf", "core_iperf"), ("gnb",), ("core", "grafana"), ("tshark",))
+SHUTDOWN_POLL_INTERVAL = 0.05
+SHELL_NAMES = {"bash", "sh", "dash", "su"}
+
+def _proc_stat(pid):
+    """(state, ppid, pgrp) of pid from /proc, or None once it is gone."""
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # comm may contain spaces and parentheses; the fixed fields follow the last ')'
+    fields = data[data.rfind(b")") + 2:].split()
+    return fields[0].decode(), int(fields[1]), int(fields[2])
+
+def process_alive(pid):
+    stat = _proc_stat(pid)
+    return stat is not None and stat[0] not in ("Z", "X")
+
+def foreground_job_pids(pgid):
+    """
+    Processes of the foreground job pgid plus all their descendants (sudo runs
+    its command in a new session). Empty when the foreground is just a shell
+    prompt, i.e. nothing is running in the tab.
+    """
+    children = collections.defaultdict(list)
+    stack = []
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        stat = _proc_stat(name)
+        if stat is None:
+            continue
+        children[stat[1]].append(int(name))
+        if stat[2] == pgid:
+            stack.append(int(name))
+    pids = set()
+    while stack:
+        pid = stack.pop()
+        if pid not in pids:
+            pids.add(pid)
+            stack.extend(children.get(pid, ()))
+    if pids == {pgid}:
+        try:
+            with open(f"/proc/{pgid}/comm") as f:
+                if f.read().strip() in SHELL_NAMES:
+                    return []
+        except OSError:
+            return []
+    return sorted(pids)
+
+class ShutdownCoordinator:
+    """
+    Stops managed processes in dependency order while waiting on them
+    concurrently: stages run one after another, but every process of a stage
+    is signalled at once and polled together. Each process gets SIGINT, then
+    SIGTERM, then SIGKILL, moving on when its deadline for the current signal
+    passes.
+
+    The SIGINT is interrupt(name) when given, i.e. Ctrl+C fed into the tab's
+    pty, which needs no privileges. Signals the GUI may not send (a job started
+    with sudo while the GUI is not root) are retried through 'sudo -n kill'.
+    """
+    def __init__(self, escalation=SHUTDOWN_ESCALATION, grace=None, interrupt=None):
+        self.escalation = escalation
+        self.grace = grace or {}
+        self.interrupt = interrupt
+
+    def run(self, stages):
+        """
+        stages: [[(name, pgid, pids), ...], ...]. Blocks until every process
+        has exited or run out of signals. Returns (report, elapsed) with one
+        (name, outcome, seconds) per process; outcome is the name of the
+        signal it exited on, or "still running".
+        """
+        started = time.monotonic()
+        report = []
+        for stage in stages:
+            report.extend(self._stop_stage(stage))
+        return report, time.monotonic() - started
+
+    def _signal(self, name, pgid, pids, step):
+        sig, deadline = self.escalation[step]
+        if step == 0:
+            deadline = self.grace.get(name, deadline)
+            if self.interrupt:
+                self.interrupt(name)
+                return time.monotonic() + deadline
+        denied = []
+        if step == 0:
+            try:
+                os.killpg(pgid, sig)
+            except ProcessLookupError:
+                pass
+            except PermissionError:
+                denied = pids
+        else:
+            # Keep going past a pid we may not signal: the rest of the job still needs it
+            for pid in pids:
+                try:
+                    os.kill(pid, sig)
+                except ProcessLookupError:
+                    pass
+                except PermissionError:
+                    denied.append(pid)
+        if denied:
+            self._sudo_kill(name, sig, denied)
+        return time.monotonic() + deadline
+
+    def _sudo_kill(self, name, sig, pids):
+        # Non-interactive: without cached credentials this fails and the next step follows
+        command = ["sudo", "-n", "kill", f"-{sig.name[3:]}"] + [str(pid) for pid in pids]
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=5)
+            error = result.returncode and (result.stderr.strip() or f"exit status {result.returncode}")
+        except (OSError, subprocess.TimeoutExpired) as e:
+            error = str(e)
+        if error:
+            print(f"Shutdown: cannot send {sig.name} to {name}: {error}")
+
+    def _stop_stage(self, stage):
+        started = time.monotonic()
+        # name -> [pgid, pids still alive, escalation step, deadline]
+        pending = {name: [pgid, pids, 0, self._signal(name, pgid, pids, 0)] for name, pgid, pids in stage}
+        report = []
+        while pending:
+            time.sleep(SHUTDOWN_POLL_INTERVAL)
+            now = time.monotonic()
+            for name, entry in list(pending.items()):
+                pgid, pids, step, deadline = entry
+                entry[1] = pids = [pid for pid in pids if process_alive(pid)]
+                if not pids:
+                    report.append((name, self.escalation[step][0].name, now - started))
+                elif now < deadline:
+                    continue
+                elif step + 1 < len(self.escalation):
+                    entry[2] = step + 1
+                    entry[3] = self._signal(name, pgid, pids, step + 1)
+                    continue
+                else:
+                    report.append((name, "still running", now - started))
+                del pending[name]
+        return report
+
+
+# -----------------------------------------------------------------------------
+# OBSERVABLE STATE
+# -----------------------------------------------------------------------------
+_UNSET = object()
+
+
+class StateStore:
+    """
+    Thread-safe application state with change subscriptions.
+
+    set() may be called from any thread. Changes are coalesced: subscribers
+    run on the GTK thread in a single flush, scheduled at most once per main
+    loop iteration ahead of layout and redraw, and only see the latest value
+    of each key that changed since the previous flush.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+        self._pending = {}
+        self._subscribers = {}     # key -> [callback(value)]
+        self._scheduled = False
+        self._closed = False
+
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+    def snapshot(self):
+        """Consistent copy of every value, for readers off the GTK thread."""
+        with self._lock:
+            return dict(self._values)
+
+    def set(self, key, value, force=False):
+        """Stores 'value'; subscribers are notified on change, or always with 'force'."""
+        with self._lock:
+            if not force and self._values.get(key, _UNSET) == value:
+                return
+            self._values[key] = value
+            if key not in self._subscribers or self._closed:
+                return
+            self._pending[key] = value
+            if self._scheduled:
+                return
+            self._scheduled = True
+        GLib.idle_add(self.flush, priority=GLib.PRIORITY_HIGH_IDLE)
+
+    def subscribe(self, key, callback):
+        with self._lock:
+            self._subscribers.setdefault(key, []).append(callback)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._scheduled = False
+            if self._closed:
+                return False
+        for key, value in pending.items():
+            for callback in self._subscribers.get(key, ()):
+                try:
+                    callback(value)
+                except Exception as e:
+                    print(f"State: subscriber for '{key}' failed: {e}")
+        return False
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._pending.clear()
+
+
+class SupervisionQueue:
+    """
+    Hands watchdog actions to the GTK thread with at most one queued or
+    running handler per process key. Repeats posted while one is still
+    outstanding (e.g. the main loop sits in a modal dialog) are dropped and
+    counted in 'drops'.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._outstanding = set()
+        self.posted = collections.Counter()
+        self.drops = collections.Counter()
+
+    def post(self, key, handler, *args):
+        """Queues handler(*args) unless one for 'key' is outstanding; returns whether it was queued."""
+        with self._lock:
+            if key in self._outstanding:
+                self.drops[key] += 1
+                return False
+            self._outstanding.add(key)
+            self.posted[key] += 1
+        GLib.idle_add(self._run, key, handler, args)
+        return True
+
+    def _run(self, key, handler, args):
+        try:
+            handler(*args)
+        except Exception as e:
+            print(f"Supervision: handler for '{key}' failed: {e}")
+        finally:
+            with self._lock:
+                self._outstanding.discard(key)
+        return False
+
+    def counts(self):
+        with self._lock:
+            return dict(self.posted), dict(self.drops)
+
+
+def state_property(key):
+    """Attribute backed by the instance's StateStore (self.state)."""
+    return property(lambda self: self.state.get(key), lambda self, value: self.state.set(key, value))
+
+
 class SrsRanGuiApp(Gtk.Window):
+    # Process flags and IPs live in self.state so any thread can read and set them
+    core_running = state_property("core_running")
+    gnb_running = state_property("gnb_running")
+    ue_running = state_property("ue_running")
+    tshark_running = state_property("tshark_running")
+    core_iperf_running = state_property("core_iperf_running")
+    ue_iperf_running = state_property("ue_iperf_running")
+    core_ip = state_property("core_ip")
+    gnb_link_ip = state_property("gnb_link_ip")
+    ue_ip = state_property("ue_ip")
+
     def __init__(self):
         super().__init__(title="srsRAN 5G Test Bed")
         settings = Gtk.Settings.get_default()
@@ -35,6 +4364,10 @@ class SrsRanGuiApp(Gtk.Window):
         self.terminals = {}
         self.closing_terminals = []
         self.is_closing = False
+        self.state = StateStore()
+        self.supervision = SupervisionQueue()
+        self.dir_listings = DirectoryListingCache(on_change=self._on_listed_directory_changed)
+        self.displayed_file_lists = {}   # directory -> [(holder, extension, key_prefix)] currently on screen
 
         # Runtime control state
         self.gnb_running = False
@@ -60,11 +4393,26 @@ class SrsRanGuiApp(Gtk.Window):
         self.tshark_terminal_ref = None
         self.tshark_button_ref = None
         self.tshark_scheduler_id = None
+        self.tshark_ring_mode = False
+        self.ring_mover = None
+        self.tshark_capture_mode = "ngap"
+        self.tshark_compress = False
+        self.capture_indexer = None
+        self.pcap_index = None
+        self.ngap_live = None
+        self.ngap_live_update_id = None
+        self.ngap_live_proc_rows = {}
 
         self.core_running = False
         self.core_button_ref = None
         self.core_terminal_ref = None
 
+        self.scale_run = None
+
+        self.latency_probe = None
+        self.latency_echo_server = None
+        self.latency_update_id = None
+
         # Determine desktop path for captures
         sudo_user = os.environ.get('SUDO_USER')
         if sudo_user:
@@ -74,6 +4422,25 @@ class SrsRanGuiApp(Gtk.Window):
             desktop_path = GLib.get_user_special_dir(GLib.UserDirectory.DIRECTORY_DESKTOP)
 
         self.capture_folder_path = os.path.join(desktop_path, "srsRAN_Captures")
+
+        # Persistent run/KPI history (written off the main thread)
+        self.history = RunHistoryStore(os.path.join(get_app_data_dir(), "history.db"))
+        self.capture_cache = CaptureMetadataCache(os.path.join(get_app_data_dir(), "capture_metadata.json"))
+        self.capture_archiver = CaptureArchiver(os.path.join(get_app_data_dir(), "capture_archive.json"))
+        self.settings = load_app_settings()
+        self.output_logs = ProcessLogManager(get_process_log_dir(), compress=self.settings["process_log_compress"])
+        # Filled by the watchdog; the rings are preallocated
+        self.resource_rings = {key: ResourceRing() for key in ("core", "gnb", "ue", "tshark")}
+        self.terminal_pool = TerminalPool(self.settings["terminal_pool_size"])
+        self.tab_memory = TabMemoryManager(self.settings["tab_memory_budget_mb"] * 2**20)
+        self.tab_memory_update_id = None
+        self._tab_memory_measuring = False
+        self.gnb_metrics = GnbMetricsStore()
+        self.gnb_metrics_receiver = GnbMetricsReceiver(self.gnb_metrics, host=self.settings["gnb_metrics_host"])
+        self.metrics_update_id = None
+        self.metrics_charts = []
+        self.pcap_rows = {}
+        self.process_start_times = {}
         
         self.is_terminal_position_set = False
 
@@ -100,7 +4467,8 @@ class SrsRanGuiApp(Gtk.Window):
 
         # Sidebar
         sidebar = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=0)
-        self.main_menu_items = ["Network Overview", "5G Core Network", "gNB", "User Equipment"]
+        self.main_menu_items = ["Network Overview", "5G Core Network", "gNB", "User Equipment", "Run History",
+                                "Capture Library"]
         self.listbox = Gtk.ListBox()
         self.listbox.set_selection_mode(Gtk.SelectionMode.SINGLE)
         for title in self.main_menu_items:
@@ -129,16 +4497,63 @@ class SrsRanGuiApp(Gtk.Window):
         self.content_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
         self.content_paned.pack1(self.content_box, resize=True, shrink=False)
 
+        # Sections are built on first visit and kept; switching flips the visible page
+        self.view_stack = Gtk.Stack()
+        self.view_stack.set_transition_type(Gtk.StackTransitionType.NONE)
+        self.content_box.pack_start(self.view_stack, True, True, 0)
+        self.section_box = None
+        self.section_builders = {
+            "Network Overview": self.show_network_overview,
+            "5G Core Network": self.show_core_menu,
+            "gNB": self.show_gnb_menu,
+            "User Equipment": self.show_ue_menu,
+            "Run History": self.show_history_menu,
+            "Capture Library": self.show_capture_library,
+        }
+        # Re-sync a cached page with state that changed while it was hidden
+        self.section_refreshers = {
+            "Network Overview": self._draw_live_ngap_stats,
+            "gNB": self._refresh_gnb_section,
+            "Run History": self._refresh_history_view,
+            "Capture Library": lambda: self._ensure_capture_browser(self.library_browser_holder, "Capture Library", 320),
+        }
+
         # Terminal Notebook
         self.terminal_notebook = Gtk.Notebook()
         self.terminal_notebook.set_scrollable(True)
+        self.terminal_notebook.connect("switch-page", self.on_terminal_page_switched)
+        self.tab_memory_label = Gtk.Label(label="")
+        self.tab_memory_label.set_margin_end(8)
+        self.tab_memory_label.show()
+        self.terminal_notebook.set_action_widget(self.tab_memory_label, Gtk.PackType.END)
+        self.tab_memory_update_id = GLib.timeout_add_seconds(TAB_MEMORY_INTERVAL, self._check_tab_memory)
         self.terminal_notebook.hide()
         self.default_terminal_pane_position=260
         self.content_paned.pack2(self.terminal_notebook, resize=True, shrink=False)
 
         self.paned.set_position(280)
         self.listbox.select_row(self.listbox.get_row_at_index(0))
+
+        # Widgets follow the state store; one flush applies whatever changed since the last
+        for key, attr, text in (("core_ip", "core_ip_label", "AMF IP: {}"),
+                                ("gnb_link_ip", "gnb_ip_label", "gNB IP: {}"),
+                                ("ue_ip", "ue_ip_label", "UE IP: {}")):
+            self.state.subscribe(key, lambda value, attr=attr, text=text: self._set_label_text(attr, text.format(value)))
+        for key, label in (("core", "Start 5G Core"), ("gnb", "Start gNB"), ("ue", "Start UE"),
+                           ("tshark", "Start Tshark"), ("core_iperf", "Start Speedtest"),
+                           ("ue_iperf", "Start Speedtest")):
+            self.state.subscribe(f"{key}_button", lambda _, key=key, label=label: self._render_start_button(key, label))
+        self.state.subscribe("tshark_button", lambda _: self._on_tshark_idle())
         
+        # Opt-in scrape endpoint for lab monitoring; republished by the watchdog loop
+        self.exporter_counters = collections.Counter()   # (kind, process) -> events
+        self.exporter_iperf = {}                          # (process, role) -> last Mbit/s
+        self._exporter_lock = threading.Lock()
+        self.metrics_exporter = None
+        self.history.listeners.append(self._on_history_event)
+        if self.settings["metrics_exporter_enabled"]:
+            self.start_metrics_exporter(self.settings["metrics_exporter_port"])
+
         # Performance Fix: Run watchdog in a separate thread, not the main UI loop
         self.watchdog_running = True
         threading.Thread(target=self._watchdog_loop, daemon=True).start()
@@ -171,20 +4586,8 @@ class SrsRanGuiApp(Gtk.Window):
     def on_menu_selected(self, listbox, row):
         if not row or row.get_index() == self.current_menu_index:
             return
-        
-        protected_keys = ["gnb", "ue", "tshark", "core","grafana","core_iperf","ue_iperf"]
-        for key in list(self.terminals.keys()):
-            if key not in protected_keys:
-                if key == "tshark" and self.tshark_running:
-                    self.toggle_tshark_process(None)
-                
-                terminal_info = self.terminals.pop(key, None)
-                if terminal_info:
-                    frame = terminal_info['frame']
-                    page_num = self.terminal_notebook.page_num(frame)
-                    if page_num != -1:
-                        self.terminal_notebook.remove_page(page_num)
 
+        # Terminal tabs outlive the section that opened them, like the pages themselves
         new_index = row.get_index()
         self._restore_main_view()
         self.current_menu_index = new_index
@@ -201,20 +4604,76 @@ class SrsRanGuiApp(Gtk.Window):
                 return False
             GLib.idle_add(hide_terminal_pane)
 
-        if row:
-            for child in self.content_box.get_children():
-                if child != self.terminal_notebook:
-                    self.content_box.remove(child)
-
-            if section == "Network Overview":
-                self.show_network_overview()
-            elif section == "5G Core Network":
-                self.show_core_menu()
-            elif section == "gNB":
-                self.show_gnb_menu()
-            elif section == "User Equipment":
-                self.show_ue_menu()
-            self.content_box.show_all()
+        self.show_section(section)
+
+    def show_section(self, section):
+        page = self.view_stack.get_child_by_name(section)
+        if page is None:
+            # First visit: the show_* builders pack into self.section_box
+            page = self.section_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+            self.section_builders[section]()
+            self.view_stack.add_named(page, section)
+            page.show_all()
+            self.view_stack.set_visible_child(page)
+            return
+        self.view_stack.set_visible_child(page)
+        refresh = self.section_refreshers.get(section)
+        if refresh:
+            refresh()
+
+    def benchmark_menu_switching(self, rounds=50):
+        """Cycles through the sidebar and prints first-visit vs cached switch latency, then quits."""
+        import tracemalloc
+        def switch(index):
+            t0 = time.perf_counter()
+            self.listbox.select_row(self.listbox.get_row_at_index(index))
+            while Gtk.events_pending():
+                Gtk.main_iteration()
+            return time.perf_counter() - t0
+
+        n = len(self.main_menu_items)
+        first = [switch(i) for i in range(1, n)]
+        switch(0)
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        cached = sorted(switch(i % n) for i in range(1, rounds * n + 1))
+        grown = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        ms = lambda s: f"{s * 1000:.2f} ms"
+        print(f"First visit (build): mean {ms(sum(first) / len(first))}, max {ms(max(first))}")
+        print(f"Cached switch over {len(cached)} switches: p50 {ms(cached[len(cached) // 2])}, "
+              f"p95 {ms(cached[int(len(cached) * 0.95)])}, max {ms(cached[-1])}")
+        print(f"Python heap growth across cached switches: {grown} bytes")
+        self.on_app_quit()
+        return False
+
+    def benchmark_terminal_pool(self, rounds=20):
+        """Opens and closes read-only tabs and prints time-to-command-output for pooled vs fresh terminals."""
+        def pump(seconds):
+            deadline = time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                while Gtk.events_pending():
+                    Gtk.main_iteration()
+                time.sleep(0.005)
+
+        pool_size = self.terminal_pool.size
+        # First with the configured pool, then with the pool off so every tab spawns its own shell
+        for size in (max(pool_size, 1), 0):
+            self.terminal_pool.resize(size)
+            pump(1.0)
+            for i in range(rounds):
+                terminal = self.create_terminal_tab("bench_tab", f"Bench {i}")
+                # Timed by _run_simple_command like any other tab
+                self._run_simple_command(terminal, f"echo bench_{i}\n", delay=300)
+                pump(0.6)
+                self.terminals["bench_tab"]["close"]()
+                pump(0.2)
+        self.terminal_pool.resize(pool_size)
+        for kind, (count, p50) in self.terminal_pool.stats().items():
+            shown = f"{p50 * 1000:.1f} ms" if p50 is not None else "n/a"
+            print(f"{kind}: {count} tabs, time to command output p50 {shown}")
+        self.on_app_quit()
+        return False
         
     # License logic removed
 
@@ -248,7 +4707,7 @@ class SrsRanGuiApp(Gtk.Window):
         getattr(self, content_attr).set_margin_start(15)
         getattr(self, content_attr).set_margin_top(10)
         vbox_main.pack_start(getattr(self, content_attr), True, True, 0)
-        self.content_box.pack_start(vbox_main, True, True, 0)
+        self.section_box.pack_start(vbox_main, True, True, 0)
         
         # --- RETURN THE HBOX SO WE CAN ADD EXTRA BUTTONS ---
         return hbox_buttons
@@ -257,9 +4716,6 @@ class SrsRanGuiApp(Gtk.Window):
     # NETWORK OVERVIEW - MODIFIED LAYOUT
     # -------------------------------------------------------------------------
     def show_network_overview(self):
-        for child in self.content_box.get_children():
-            self.content_box.remove(child)
-
         # Create a single row with 4 distinct columns
         hbox_columns = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=15)
         hbox_columns.set_homogeneous(True)
@@ -287,8 +4743,15 @@ class SrsRanGuiApp(Gtk.Window):
         self.create_tshark_control_ui(vbox_tshark)
         hbox_columns.pack_start(vbox_tshark, True, True, 0)
 
-        self.content_box.pack_start(hbox_columns, False, False, 0)
-        self.content_box.show_all()
+        self.section_box.pack_start(hbox_columns, False, False, 0)
+
+        # --- Live NGAP counters below the columns ---
+        vbox_live = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        vbox_live.set_margin_start(15)
+        vbox_live.set_margin_end(15)
+        vbox_live.set_margin_top(15)
+        self.create_live_ngap_ui(vbox_live)
+        self.section_box.pack_start(vbox_live, True, True, 0)
 
     def create_title(self, text):
         lbl = Gtk.Label(label=text)
@@ -324,7 +4787,7 @@ class SrsRanGuiApp(Gtk.Window):
         parent_box.pack_start(self.create_title("Tshark Capture"), False, False, 0)
 
         # Open Folder Button (Below Start)
-        open_folder_btn = Gtk.Button(label="Open Capture Folder")
+        open_folder_btn = Gtk.Button(label="Browse Captures")
         open_folder_btn.connect("clicked", self.on_open_capture_folder_clicked)
         parent_box.pack_start(open_folder_btn, False, False, 8)
 
@@ -337,6 +4800,99 @@ class SrsRanGuiApp(Gtk.Window):
         self.tshark_button_ref.connect("clicked", self.toggle_tshark_process)
         parent_box.pack_start(self.tshark_button_ref, False, False, 5)
 
+        # Ring buffer mode (bounded disk usage for soak tests)
+        self.tshark_ring_check = Gtk.CheckButton(
+            label=f"Ring buffer ({RING_SEGMENT_MB} MB / {RING_SEGMENT_SECONDS // 60} min x {RING_MAX_SEGMENTS})")
+        self.tshark_ring_check.set_active(self.tshark_ring_mode)
+        self.tshark_ring_check.set_sensitive(not self.tshark_running)
+        self.tshark_ring_check.connect("toggled", lambda w: setattr(self, 'tshark_ring_mode', w.get_active()))
+        parent_box.pack_start(self.tshark_ring_check, False, False, 0)
+
+        self.tshark_ring_label = Gtk.Label(label="")
+        self.tshark_ring_label.set_opacity(0.7)
+        parent_box.pack_start(self.tshark_ring_label, False, False, 0)
+
+        # What to capture: NGAP signalling, or GTP-U headers on N3
+        self.tshark_mode_combo = Gtk.ComboBoxText()
+        for mode_id, label in TSHARK_CAPTURE_MODES.items():
+            self.tshark_mode_combo.append(mode_id, label)
+        self.tshark_mode_combo.set_active_id(self.tshark_capture_mode)
+        self.tshark_mode_combo.set_sensitive(not self.tshark_running)
+        self.tshark_mode_combo.connect("changed", lambda w: setattr(self, 'tshark_capture_mode', w.get_active_id()))
+        parent_box.pack_start(self.tshark_mode_combo, False, False, 0)
+
+        self.tshark_compress_check = Gtk.CheckButton(label="Compress finished captures (zstd)")
+        self.tshark_compress_check.set_active(self.tshark_compress)
+        self.tshark_compress_check.connect("toggled", self.on_tshark_compress_toggled)
+        parent_box.pack_start(self.tshark_compress_check, False, False, 0)
+
+    def create_live_ngap_ui(self, parent_box):
+        frame = Gtk.Frame(label="Live NGAP")
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        vbox.set_margin_start(10)
+        vbox.set_margin_end(10)
+        vbox.set_margin_bottom(10)
+
+        self.ngap_live_label = Gtk.Label(label="Start Tshark to see live NGAP counters.")
+        self.ngap_live_label.set_xalign(0.0)
+        vbox.pack_start(self.ngap_live_label, False, False, 0)
+
+        hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        hbox.set_homogeneous(True)
+        self.ngap_live_proc_store = Gtk.ListStore(str, str, str, str)
+        self.ngap_live_ue_store = Gtk.ListStore(str, str, str)
+        self.ngap_live_proc_rows = {}
+        for store, titles in ((self.ngap_live_proc_store, ["Procedure", "Messages", "Failures", "msg/s"]),
+                              (self.ngap_live_ue_store, ["RAN UE ID", "Messages", "Last message"])):
+            treeview = Gtk.TreeView(model=store)
+            for i, col_title in enumerate(titles):
+                column = Gtk.TreeViewColumn(col_title, Gtk.CellRendererText(), text=i)
+                column.set_resizable(True)
+                treeview.append_column(column)
+            scrolled = Gtk.ScrolledWindow()
+            scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+            scrolled.set_size_request(-1, 180)
+            scrolled.add(treeview)
+            hbox.pack_start(scrolled, True, True, 0)
+        vbox.pack_start(hbox, True, True, 0)
+        frame.add(vbox)
+        parent_box.pack_start(frame, True, True, 0)
+        self._draw_live_ngap_stats()
+
+    def _update_live_ngap_stats(self):
+        if self.is_closing:
+            return False
+        self._draw_live_ngap_stats()
+        if not self.tshark_running and not self.capture_indexer:
+            self.ngap_live_update_id = None
+            return False
+        return True
+
+    def _draw_live_ngap_stats(self):
+        live = self.ngap_live
+        if live is None or not hasattr(self, 'ngap_live_proc_store'):
+            return
+        if not self.ngap_live_label.get_mapped():
+            return    # overview is hidden; redrawn when it is shown again
+        total, rate, procs, ues = live.snapshot()
+        state = "capturing" if self.tshark_running else "stopped"
+        self.ngap_live_label.set_text(f"{total} NGAP messages, {rate:.1f} msg/s ({state})")
+
+        # Procedure rows are updated in place; only new procedures add rows
+        store = self.ngap_live_proc_store
+        for proc, count, failures, proc_rate in procs:
+            values = [ngap_procedure_name(proc), str(count), str(failures), f"{proc_rate:.1f}"]
+            it = self.ngap_live_proc_rows.get(proc)
+            if it is None:
+                self.ngap_live_proc_rows[proc] = store.append(values)
+            else:
+                store.set(it, [0, 1, 2, 3], values)
+
+        self.ngap_live_ue_store.clear()
+        for ran_ue_id, count, proc, pdu_type in ues:
+            self.ngap_live_ue_store.append([str(ran_ue_id), str(count),
+                                            f"{ngap_procedure_name(proc)} ({NGAP_PDU_TYPES[pdu_type]})"])
+
     def create_gnb_control_ui(self, parent_box):
         parent_box.pack_start(self.create_title("gNB"), False, False, 0)
         
@@ -367,6 +4923,18 @@ class SrsRanGuiApp(Gtk.Window):
         gnb_webui_btn.connect("clicked", self.on_gnb_webview)
         parent_box.pack_start(gnb_webui_btn, False, False, 5)
 
+        # Grafana is optional: the Web UI shows native charts when it is off
+        grafana_check = Gtk.CheckButton(label="Start Grafana with gNB")
+        grafana_check.set_active(self.settings["grafana_enabled"])
+        grafana_check.connect("toggled", self.on_grafana_setting_toggled)
+        grafana_row = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        grafana_row.pack_start(grafana_check, False, False, 0)
+        grafana_stop_btn = Gtk.Button(label="Stop Grafana")
+        grafana_stop_btn.set_tooltip_text("Grafana stays up across gNB restarts until stopped here or the app exits")
+        grafana_stop_btn.connect("clicked", lambda w: self.stop_grafana())
+        grafana_row.pack_start(grafana_stop_btn, False, False, 0)
+        parent_box.pack_start(grafana_row, False, False, 0)
+
     def create_core_control_ui(self, parent_box):
         parent_box.pack_start(self.create_title("5G Core"), False, False, 0)
         
@@ -412,16 +4980,20 @@ class SrsRanGuiApp(Gtk.Window):
             ctx.add_class("stop-button")
             self.core_button_ref.set_label(f"{STOP_SYMBOL} Stop 5G Core")
 
+            self.process_start_times['core'] = time.time()
+            self.history.record("core", "start")
+
             def startup_complete():
                 self.core_running = True
                 self.core_button_ref.set_sensitive(True)
                 self.fetch_and_display_core_ip()
+                self._record_ready_when_running("core", "docker compose")
 
             commands = [
                 "sudo su",
                 "cd",
                 "cd srsRAN_Project/docker",
-                "sudo docker compose up 5gc"
+                self._logged("core", "sudo docker compose up 5gc")
             ]
             
             self._send_commands_sequentially(
@@ -459,32 +5031,40 @@ class SrsRanGuiApp(Gtk.Window):
             if self.core_terminal_ref:
                 self.core_terminal_ref.feed_child(b'\x03') # Ctrl+C
             
+            self.history.record("core", "stop")
             self.reset_core_button()
 
     def reset_core_button(self):
         self.core_running = False
         self.reset_core_ip_display()
-        def update_ui():
-            if self.is_closing: return
-            if self.core_button_ref and self.core_button_ref.get_realized():
-                self.core_button_ref.set_sensitive(True)
-                ctx = self.core_button_ref.get_style_context()
-                ctx.remove_class("stop-button")
-                ctx.add_class("start-button")
-                self.core_button_ref.set_label(f"{PLAY_SYMBOL} Start 5G Core")
-        GLib.idle_add(update_ui)
+        self.state.set("core_button", "start", force=True)
+
+    def _render_start_button(self, key, label):
+        button = getattr(self, f"{key}_button_ref", None)
+        if self.is_closing or not button or not button.get_realized():
+            return
+        button.set_sensitive(True)
+        ctx = button.get_style_context()
+        ctx.remove_class("stop-button")
+        ctx.add_class("start-button")
+        button.set_label(f"{PLAY_SYMBOL} {label}")
+
+    def _set_label_text(self, attr, text):
+        label = getattr(self, attr, None)
+        if label and not self.is_closing:
+            label.set_text(text)
 
     # -------------------------------------------------------------------------
     # PROCESS LOGIC
     # -------------------------------------------------------------------------
 
-    def _show_alert(self, message):
+    def _show_alert(self, message, title="Startup Order Error"):
         dialog = Gtk.MessageDialog(
             transient_for=self,
             flags=0,
             message_type=Gtk.MessageType.WARNING,
             buttons=Gtk.ButtonsType.OK,
-            text="Startup Order Error",
+            text=title,
         )
         dialog.format_secondary_text(message)
         dialog.run()
@@ -501,26 +5081,12 @@ class SrsRanGuiApp(Gtk.Window):
 
             self.gnb_button_ref.set_sensitive(False)
 
-            # 2. Start Grafana (Foreground Mode)
-            grafana_terminal = self.create_terminal_tab("grafana", "Grafana Service")
-            self.grafana_terminal_ref = grafana_terminal
-            
-            # Use absolute path for safety
-            grafana_cmd = [
-                "sudo su",
-                "cd",
-                "cd srsRAN_Project/", 
-                "sudo docker compose -f docker/docker-compose.yml up grafana" 
-            ]
-            self._send_commands_sequentially(grafana_terminal, grafana_cmd, "grafana_scheduler_id")
-            
-            # 3. Resize Terminal (Optional, if you added this helper previously)
-            if hasattr(self, 'maximize_terminal_view'):
-                self.maximize_terminal_view()
+            # 2. Native metrics: listen for the gNB's JSON reports
+            self._start_metrics_receiver()
 
             # --- KEY FIX: NON-BLOCKING DELAY ---
-            # Instead of time.sleep(2), we define the gNB startup as a separate function
-            # and schedule it to run in 2000ms (2 seconds).
+            # The gNB startup is a separate function so it can run once Grafana
+            # answers (or straight away when Grafana is off or already warm).
             
             def start_gnb_delayed():
                 if self.is_closing: return False
@@ -535,16 +5101,20 @@ class SrsRanGuiApp(Gtk.Window):
                 ctx.add_class("stop-button")
                 self.gnb_button_ref.set_label(f"{STOP_SYMBOL} Stop gNB")
 
+                self.process_start_times['gnb'] = time.time()
+                self.history.record("gnb", "start", config_path=GNB_CONFIG_PATH)
+
                 def startup_complete():
                     self.gnb_running = True
                     self.gnb_button_ref.set_sensitive(True)
                     self.fetch_and_display_gnb_ips()
+                    self._record_ready_when_running("gnb", "gnb -c")
 
                 commands = [
                     "sudo su",
                     "cd",
                     "cd srsRAN_Project/build/apps/gnb", # Absolute path
-                    "sudo gnb -c /home/student/Downloads/gnb_zmq.yaml" # Absolute path
+                    self._logged("gnb", f"sudo gnb -c {GNB_CONFIG_PATH}") # Absolute path
                 ]
                 
                 self._send_commands_sequentially(
@@ -561,8 +5131,14 @@ class SrsRanGuiApp(Gtk.Window):
                     
                 return False # Run once
 
-            # Schedule the gNB start for 2 seconds later (allows Grafana to init)
-            GLib.timeout_add(2000, start_gnb_delayed)
+            if self.settings["grafana_enabled"]:
+                # 3. Reuse a healthy Grafana; the probe must not block the GTK thread
+                def probe():
+                    healthy = grafana_is_healthy()
+                    GLib.idle_add(self._start_grafana_then, healthy, start_gnb_delayed)
+                threading.Thread(target=probe, daemon=True).start()
+            else:
+                start_gnb_delayed()
             
         else:
             # --- STOPPING SEQUENCE (Unchanged) ---
@@ -590,14 +5166,9 @@ class SrsRanGuiApp(Gtk.Window):
             if self.gnb_terminal_ref:
                 self.gnb_terminal_ref.feed_child(b'\x03') 
             
-            # 3. Stop Grafana
-            if self.grafana_terminal_ref:
-                try:
-                    self.grafana_terminal_ref.feed_child(b'\x03') 
-                except:
-                    pass
-                self.grafana_terminal_ref = None
+            # Grafana stays up for the next gNB start (see stop_grafana)
 
+            self.history.record("gnb", "stop")
             self.reset_gnb_button()
 
     def toggle_ue_process(self, _):
@@ -623,6 +5194,9 @@ class SrsRanGuiApp(Gtk.Window):
             ctx.add_class("stop-button")
             self.ue_button_ref.set_label(f"{STOP_SYMBOL} Stop UE")
 
+            self.process_start_times['ue'] = time.time()
+            self.history.record("ue", "start", config_path=UE_CONFIG_PATH)
+
             def startup_complete():
                 self.ue_running = True
                 self.ue_button_ref.set_sensitive(True)
@@ -638,7 +5212,7 @@ class SrsRanGuiApp(Gtk.Window):
                 "cd",
                 silent_check_cmd,               # <--- Runs silently
                 "cd srsRAN_4G/build/srsue/src",
-                "sudo srsue /home/student/Downloads/ue_zmq.conf"
+                self._logged("ue", f"sudo srsue {UE_CONFIG_PATH}")
             ]
             # --------------------------------------
 
@@ -655,6 +5229,7 @@ class SrsRanGuiApp(Gtk.Window):
                 self.ue_command_scheduler_id = None
             if self.ue_terminal_ref:
                 self.ue_terminal_ref.feed_child(b'\x03')
+            self.history.record("ue", "stop")
             self.reset_ue_button()
 
     def toggle_tshark_process(self, _):
@@ -676,7 +5251,8 @@ class SrsRanGuiApp(Gtk.Window):
             # --- STARTUP ---
             self.tshark_button_ref.set_sensitive(False)
             
-            terminal = self.create_terminal_tab("tshark", "Tshark NGAP Capture")
+            user_plane = self.tshark_capture_mode == "gtpu"
+            terminal = self.create_terminal_tab("tshark", "Tshark GTP-U Capture" if user_plane else "Tshark NGAP Capture")
             terminal.connect("child-exited", self.on_process_exited, "tshark")
             self.tshark_terminal_ref = terminal
             
@@ -686,20 +5262,64 @@ class SrsRanGuiApp(Gtk.Window):
             ctx.add_class("stop-button")
             self.tshark_button_ref.set_label(f"{STOP_SYMBOL} Stop Tshark")
             
+            self.process_start_times['tshark'] = time.time()
+            self.history.record("tshark", "start")
+
             def startup_complete():
                 self.tshark_running = True
                 self.tshark_button_ref.set_sensitive(True)
+                self._record_ready_when_running("tshark", "tshark")
 
-            # --- KEY FIX 1: CAPTURE TO /tmp FIRST ---
-            # AppArmor allows tshark to write to /tmp without issues.
+            # --- CAPTURE INTO A STAGING DIR ---
+            # Prefer the capture folder's own filesystem so finishing is a rename;
+            # fall back to /tmp only if AppArmor confines tshark there.
             timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            filename = f"srs_ngap_{timestamp}.pcap"
+            prefix = f"srs_gtpu_{timestamp}" if user_plane else f"srs_ngap_{timestamp}"
+            filename = f"{prefix}.pcap"
+            staging_root = capture_staging_dir(self.capture_folder_path)
+            # GTP-U: headers only (snaplen) so N3 at full rate stays cheap to write and analyze
+            # and -q instead of printing every packet into the terminal
+            capture_opts = (f'-f "udp port {GTPU_PORT}" -s {GTPU_SNAPLEN}' if user_plane
+                            else '-f "sctp port 38412"')
+            print_opt = "-q" if user_plane else "-P"
+
+            # Live counters are fed by the capture tail thread and drawn at a fixed rate
+            self.ngap_live = None if user_plane else LiveNgapCounters()
+            self.ngap_live_proc_rows = {}
+            if hasattr(self, 'ngap_live_proc_store'):
+                self.ngap_live_proc_store.clear()
+            if self.ngap_live and self.ngap_live_update_id is None:
+                self.ngap_live_update_id = GLib.timeout_add(NGAP_LIVE_REFRESH_MS, self._update_live_ngap_stats)
             
-            self.temp_pcap_path = f"/tmp/{filename}"
+            self.temp_pcap_path = os.path.join(staging_root, filename)
             self.final_pcap_path = os.path.join(self.capture_folder_path, filename)
             
-            # Run tshark pointing to the TEMP path
-            commands = [f'sudo tshark -i any -f "sctp port 38412" -w "{self.temp_pcap_path}" -P']
+            if self.tshark_ring_mode:
+                # Ring buffer: tshark rotates segments in a staging dir, closed ones
+                # are moved to the capture folder while the capture is still running
+                staging_dir = os.path.join(staging_root, f"{prefix}_ring")
+                os.makedirs(staging_dir, exist_ok=True)
+                self.temp_pcap_path = os.path.join(staging_dir, f"{prefix}.pcapng")
+                if self.ngap_live:
+                    self.capture_indexer = LiveCaptureIndexer(staging_dir, on_message=self.ngap_live.add,
+                                                              follow_dir=True)
+                    self.capture_indexer.start()
+                self.ring_mover = RingCaptureMover(
+                    staging_dir, self.capture_folder_path, prefix, on_segment=self._on_ring_segment_saved,
+                    before_move=self.capture_indexer.segment_closed if self.capture_indexer else None)
+                self.ring_mover.start()
+                ring_opts = f"-b filesize:{RING_SEGMENT_MB * 1000} -b duration:{RING_SEGMENT_SECONDS}"
+                commands = [self._logged("tshark", f'sudo tshark -i any {capture_opts} {ring_opts} -w "{self.temp_pcap_path}" {print_opt}')]
+                self.tshark_ring_check.set_sensitive(False)
+                self.tshark_ring_label.set_text("Segments saved: 0")
+            else:
+                # Run tshark pointing to the TEMP path
+                commands = [self._logged("tshark", f'sudo tshark -i any {capture_opts} -w "{self.temp_pcap_path}" {print_opt}')]
+                if self.ngap_live:
+                    # Index the capture as it grows so the timeline is ready as soon as it is saved
+                    self.capture_indexer = LiveCaptureIndexer(self.temp_pcap_path, on_message=self.ngap_live.add)
+                    self.capture_indexer.start()
+            self.tshark_mode_combo.set_sensitive(False)
             
             self._send_commands_sequentially(
                 terminal, 
@@ -713,6 +5333,7 @@ class SrsRanGuiApp(Gtk.Window):
             # --- KEY FIX 2: Tell Watchdog to ignore Tshark IMMEDIATELY ---
             # This prevents the "Watchdog: tshark stopped unexpectedly" error.
             self.tshark_running = False 
+            self.history.record("tshark", "stop")
             
             # Disable button and show status while we save
             self.tshark_button_ref.set_sensitive(False)
@@ -728,34 +5349,126 @@ class SrsRanGuiApp(Gtk.Window):
                     self.tshark_terminal_ref.feed_child(b'\x03') 
                 except:
                     pass
-            
-            # Wait and Move (Bypasses AppArmor)
-            def move_capture_file():
-                try:
-                    if hasattr(self, 'temp_pcap_path') and os.path.exists(self.temp_pcap_path):
-                        # FIX: Use 'sudo mv' via subprocess instead of shutil.move
-                        # This works even if the script is running as a normal user.
-                        subprocess.run(["sudo", "mv", self.temp_pcap_path, self.final_pcap_path], check=True)
-                        
-                        # FIX: Change ownership to the real user
-                        # (Because 'sudo mv' keeps the file owned by root)
-                        real_user = os.environ.get('SUDO_USER') or os.environ.get('USER')
-                        if real_user:
-                            subprocess.run(["sudo", "chown", f"{real_user}:{real_user}", self.final_pcap_path], check=True)
-                            
-                    else:
-                        print("Warning: No capture file found in /tmp")
-                except Exception as e:
-                    print(f"Error moving capture file: {e}")
-                
+
+            def show_progress(fraction):
+                def update_gui():
+                    if not self.is_closing and self.tshark_button_ref and not self.tshark_running:
+                        self.tshark_button_ref.set_label(f"Saving... {int(fraction * 100)}%")
+                    return False
+                GLib.idle_add(update_gui)
+
+            ring = self.ring_mover is not None
+            finalize = self._take_capture_finalizer(progress=show_progress)
+            if ring:
+                # Closed segments are already in place; only the current one is left to
+                # move, so the button comes back immediately and the move runs in the background
+                threading.Thread(target=finalize, daemon=True).start()
+                self.reset_tshark_button()
+                return
+
+            def finalize_worker():
+                finalize()
                 # Restore button state
                 self.reset_tshark_button()
-                return False # Run once
 
-            # Schedule the move operation (1.5s delay allows tshark to close file)
-            GLib.timeout_add(1500, move_capture_file)
+            threading.Thread(target=finalize_worker, daemon=True).start()
+
+    def _take_capture_finalizer(self, progress=None, archive=True):
+        """
+        Detaches the running capture from the app (GTK thread) and returns a
+        blocking finalize() that waits for tshark to close its file, then renames
+        it into place (or copies it with progress across filesystems) and indexes
+        it. Ring captures only have their last segment left to move.
+        """
+        mover, self.ring_mover = self.ring_mover, None
+        indexer, self.capture_indexer = self.capture_indexer, None
+        if mover:
+            if indexer:
+                indexer.stop()
+
+            def finalize_ring():
+                done = threading.Event()
+                mover.finish(on_done=lambda moved: done.set())
+                done.wait()
+            return finalize_ring
+
+        temp_path, final_path = self.temp_pcap_path, self.final_pcap_path
+        compress = archive and self.tshark_compress
+
+        def finalize():
+            try:
+                closed = wait_for_capture_closed(temp_path)
+                if not closed:
+                    print("Warning: tshark still holds the capture file open, finalizing anyway")
+                if os.path.exists(temp_path):
+                    finalize_capture_file(temp_path, final_path, progress=progress)
+                    if indexer:
+                        indexer.finish(final_path)
+                    size_mb = os.path.getsize(final_path) / 1e6
+                    self.history.record("tshark", "capture", value=round(size_mb, 3), detail=final_path)
+                    if compress and closed:
+                        self._archive_capture(final_path)
+                    elif compress:
+                        # Compressing removes the original: never do that to a capture that may be incomplete
+                        print(f"Not compressing {os.path.basename(final_path)}: it may still be written to")
+                else:
+                    print(f"Warning: No capture file found at {temp_path}")
+                    if indexer:
+                        indexer.stop()
+            except Exception as e:
+                print(f"Error moving capture file: {e}")
+        return finalize
+
+    def on_tshark_compress_toggled(self, widget):
+        if widget.get_active() and not zstd_available():
+            widget.set_active(False)
+            self._show_alert("Compression needs python3-zstandard or the zstd tool.\n"
+                             "Install one with: pip install zstandard  (or: sudo apt install zstd)",
+                             title="Missing Dependency")
+            return
+        self.tshark_compress = widget.get_active()
+
+    def _archive_capture(self, path):
+        # Runs on the archiver pool; the UI only hears about the result
+        def on_done(src, result):
+            if result is None:
+                return
+            dest, size_in, size_out, seconds, deduplicated = result
+            how = "deduplicated" if deduplicated else f"{size_in / max(size_out, 1):.1f}x in {seconds:.1f} s"
+            print(f"Archived {os.path.basename(dest)} ({how})")
+            self.history.record("tshark", "archive", value=round(size_out / 1e6, 3), detail=dest)
+            def update_gui():
+                if not self.is_closing and hasattr(self, 'pcap_store'):
+                    self._refresh_pcap_list()
+                return False
+            GLib.idle_add(update_gui)
+        self.capture_archiver.submit(path, on_done)
+
+    def _on_ring_segment_saved(self, path, mover):
+        # Called from the ring mover thread
+        try:
+            size_mb = os.path.getsize(path) / 1e6
+        except OSError:
+            size_mb = None
+        self.history.record("tshark", "capture", value=None if size_mb is None else round(size_mb, 3), detail=path)
+        if self.tshark_compress and path not in mover.still_open:
+            self._archive_capture(path)
+
+        def update_gui():
+            if self.is_closing: return False
+            if hasattr(self, 'tshark_ring_label'):
+                text = f"Segments saved: {len(mover.moved) + mover.dropped}"
+                if mover.dropped:
+                    text += f" ({mover.dropped} rotated out)"
+                self.tshark_ring_label.set_text(text)
+            return False
+        GLib.idle_add(update_gui)
 
     def on_open_capture_folder_clicked(self, button):
+        # Browse captures in-app; the library page still offers the file manager
+        self.listbox.select_row(self.listbox.get_row_at_index(self.main_menu_items.index("Capture Library")))
+
+    def open_capture_folder_externally(self, button=None):
         try:
             os.makedirs(self.capture_folder_path, exist_ok=True)
             sudo_user = os.environ.get('SUDO_USER')
@@ -772,7 +5485,7 @@ class SrsRanGuiApp(Gtk.Window):
     def fetch_and_display_core_ip(self):
         def worker_thread():
             core_ip = "<N/A>" 
-            config_path = "/home/student/Downloads/gnb_zmq.yaml"
+            config_path = GNB_CONFIG_PATH
             
             try:
                 if os.path.exists(config_path):
@@ -801,20 +5514,14 @@ class SrsRanGuiApp(Gtk.Window):
             except Exception:
                 pass
 
-            def update_gui():
-                if self.is_closing: return
-                self.core_ip = core_ip
-                if hasattr(self, 'core_ip_label'):
-                    # CHANGED: Update text to "AMF IP"
-                    self.core_ip_label.set_text(f"AMF IP: {self.core_ip}")
-            
-            GLib.idle_add(update_gui)
+            # The "AMF IP" label follows self.core_ip through the state store
+            self.core_ip = core_ip
         threading.Thread(target=worker_thread, daemon=True).start()
 
     def fetch_and_display_gnb_ips(self):
         def worker_thread():
             link_ip = "<N/A>"
-            config_path = "/home/student/Downloads/gnb_zmq.yaml"
+            config_path = GNB_CONFIG_PATH
             
             try:
                 if os.path.exists(config_path):
@@ -834,33 +5541,14 @@ class SrsRanGuiApp(Gtk.Window):
             except Exception:
                 pass
 
-            def update_gui():
-                if self.is_closing: return
-                self.gnb_link_ip = link_ip
-                if hasattr(self, 'gnb_ip_label'):
-                    # CHANGED: Update text to "gNB IP"
-                    self.gnb_ip_label.set_text(f"gNB IP: {self.gnb_link_ip}")
-            
-            GLib.idle_add(update_gui)
+            self.gnb_link_ip = link_ip
         threading.Thread(target=worker_thread, daemon=True).start()
         
     def reset_core_ip_display(self):
         self.core_ip = "<N/A>"
-        def update_gui():
-            if self.is_closing: return
-            if hasattr(self, 'core_ip_label'):
-                # CHANGED: Reset to "AMF IP"
-                self.core_ip_label.set_text(f"AMF IP: {self.core_ip}")
-        GLib.idle_add(update_gui)
 
     def reset_gnb_ip_display(self):
         self.gnb_link_ip = "<N/A>"
-        def update_gui():
-            if self.is_closing: return
-            if hasattr(self, 'gnb_ip_label'):
-                # CHANGED: Reset to "gNB IP"
-                self.gnb_ip_label.set_text("gNB IP: <N/A>")
-        GLib.idle_add(update_gui)
         
     def fetch_and_display_ue_ips(self):
         def worker_thread():
@@ -894,83 +5582,62 @@ class SrsRanGuiApp(Gtk.Window):
                 
                 time.sleep(1) # Wait 1s before retrying
 
-            # Update GUI
-            def update_gui():
-                if self.is_closing: return
-                self.ue_ip = ue_ip
-                # Check if label exists and is valid
-                if hasattr(self, 'ue_ip_label') and self.ue_ip_label:
-                    self.ue_ip_label.set_text(f"UE IP: {self.ue_ip}")
-            
-            GLib.idle_add(update_gui)
+            if ue_ip != "<N/A>" and 'ue' in self.process_start_times:
+                # Attach time: from "Start UE" click until the tunnel has an address
+                elapsed = time.time() - self.process_start_times['ue']
+                self.history.record("ue", "ready", value=round(elapsed, 3), detail=ue_ip)
+
+            # Update GUI (the label is bound to self.ue_ip)
+            self.ue_ip = ue_ip
         
         threading.Thread(target=worker_thread, daemon=True).start()
 
     def reset_ue_ip_display(self):
-        # FIX: Reset the persistent variable too
         self.ue_ip = "<N/A>"
-        
-        def update_gui():
-            if self.is_closing: return
-            if hasattr(self, 'ue_ip_label'):
-                self.ue_ip_label.set_text("UE IP: <N/A>")
-        GLib.idle_add(update_gui)
 
     def reset_gnb_button(self):
         self.gnb_running = False
         self.reset_gnb_ip_display()
-        def update_ui():
-            if self.is_closing: return
-            if self.gnb_button_ref and self.gnb_button_ref.get_realized():
-                self.gnb_button_ref.set_sensitive(True)
-                ctx = self.gnb_button_ref.get_style_context()
-                ctx.remove_class("stop-button")
-                ctx.add_class("start-button")
-                self.gnb_button_ref.set_label(f"{PLAY_SYMBOL} Start gNB")
-        GLib.idle_add(update_ui)
+        self.state.set("gnb_button", "start", force=True)
 
     def reset_ue_button(self):
         self.ue_running = False
         self.reset_ue_ip_display()
-        def update_ui():
-            if self.is_closing: return
-            if self.ue_button_ref and self.ue_button_ref.get_realized():
-                self.ue_button_ref.set_sensitive(True)
-                ctx = self.ue_button_ref.get_style_context()
-                ctx.remove_class("stop-button")
-                ctx.add_class("start-button")
-                self.ue_button_ref.set_label(f"{PLAY_SYMBOL} Start UE")
-        GLib.idle_add(update_ui)
+        self.state.set("ue_button", "start", force=True)
 
     def reset_tshark_button(self):
         self.tshark_running = False
-        def update_ui():
-            if self.is_closing: return
-            if self.tshark_button_ref and self.tshark_button_ref.get_realized():
-                self.tshark_button_ref.set_sensitive(True)
-                ctx = self.tshark_button_ref.get_style_context()
-                ctx.remove_class("stop-button")
-                ctx.add_class("start-button")
-                self.tshark_button_ref.set_label(f"{PLAY_SYMBOL} Start Tshark")
-        GLib.idle_add(update_ui)
+        if self.ring_mover:
+            # tshark went away on its own: still collect whatever segments it left behind
+            mover, self.ring_mover = self.ring_mover, None
+            mover.finish()
+        if self.capture_indexer:
+            # The index is rebuilt lazily when the capture is opened
+            indexer, self.capture_indexer = self.capture_indexer, None
+            indexer.stop()
+        self.state.set("tshark_button", "start", force=True)
+
+    def _on_tshark_idle(self):
+        if self.is_closing: return
+        if hasattr(self, 'tshark_ring_check'):
+            self.tshark_ring_check.set_sensitive(True)
+            self.tshark_mode_combo.set_sensitive(True)
+        # Last frame includes the tail read while the capture was finalized
+        self._draw_live_ngap_stats()
 
     def on_process_exited(self, _terminal, _exit_status, key):
         if key not in self.terminals:
             return
 
+        if getattr(self, f"{key}_running", False):
+            self.history.record(key, "crash", detail=f"shell exited (status {_exit_status})")
+            self._save_crash_bundle(key, f"shell exited (status {_exit_status})")
+
         if key == "gnb" and self.gnb_running:
             self.reset_gnb_button()
-            if self.grafana_terminal_ref:
-                try:
-                    self.grafana_terminal_ref.feed_child(b'\x03')
-                except Exception:
-                    pass
-                self.grafana_terminal_ref = None
         elif key == "grafana":
-            if self.ue_running:
-                self.toggle_ue_process(None) # Auto stop UE if gNB dies
-            if self.gnb_running:
-                self.toggle_gnb_process(None, force=True) # Auto stop gNB if gNB dies
+            # Grafana is independent of the gNB; the next gNB start brings it back
+            self.grafana_terminal_ref = None
         elif key == "ue" and self.ue_running:
             self.reset_ue_button()
         elif key == "core" and self.core_running:
@@ -1012,6 +5679,167 @@ class SrsRanGuiApp(Gtk.Window):
             pass
         return False
     
+    def _logged(self, key, command):
+        # The tab keeps its small scrollback; the full output goes to <app data>/logs/<key>.log
+        if not self.settings["process_logs_enabled"]:
+            return command
+        return self.output_logs.wrap(key, command)
+
+    def _scan_processes_native(self, patterns):
+        """
+        Like _check_process_running_native, but one pass over /proc answers
+        several patterns at once: returns pattern -> list of matching pids.
+        """
+        found = {pattern: [] for pattern in patterns}
+        if not patterns:
+            return found
+        try:
+            for pid in os.listdir('/proc'):
+                if not pid.isdigit():
+                    continue
+                try:
+                    with open(f'/proc/{pid}/cmdline', 'rb') as f:
+                        content = f.read()
+                except OSError:
+                    continue
+                if not content:
+                    continue
+                cmd_str = content.replace(b'\x00', b' ').decode('utf-8', errors='ignore')
+                for pattern in patterns:
+                    if pattern in cmd_str:
+                        found[pattern].append(int(pid))
+        except OSError:
+            pass
+        return found
+
+    def _sample_resources(self, key, pids, now):
+        # Runs in the watchdog thread; summed over the whole job (script, sudo and the process itself)
+        ring = self.resource_rings.get(key)
+        if ring is None:
+            return
+        cpu = rss = threads = 0
+        for pid in pids:
+            usage = read_proc_usage(pid)
+            if usage:
+                cpu += usage[0]
+                rss += usage[1]
+                threads += usage[2]
+        ring.add(now, cpu, rss, threads)
+
+    def _save_crash_bundle(self, key, reason):
+        # Called on the GTK thread the moment an unexpected exit is seen; written in the background
+        if self.is_closing:
+            return
+        log = self.output_logs.get(key)
+        ring = self.resource_rings.get(key)
+        samples = ring.rows() if ring else []
+        def worker():
+            if log:
+                # The tail of the output may still be on its way through the FIFO
+                log.wait_drained(CRASH_DRAIN_TIMEOUT)
+            output = log.ring.snapshot() if log else None
+            try:
+                path = write_crash_bundle(get_crash_dir(), key, reason, output, samples, CRASH_CONFIGS.get(key))
+            except OSError as e:
+                print(f"Could not write crash bundle for {key}: {e}")
+                return
+            print(f"Crash bundle for {key}: {path}")
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _record_ready_when_running(self, key, pattern, timeout=60):
+        # Ready time = from the start click until the process shows up in /proc
+        started_at = self.process_start_times.get(key, time.time())
+        def worker():
+            while time.time() - started_at < timeout and not self.is_closing:
+                if self._check_process_running_native(pattern):
+                    self.history.record(key, "ready", value=round(time.time() - started_at, 3))
+                    return
+                time.sleep(0.25)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _record_iperf_summary(self, key, log_path):
+        # Parsed in the history writer thread, never on the GTK thread
+        def producer():
+            return [(round(mbps, 3), role) for role, mbps in parse_iperf_summary(log_path)]
+        self.history.record_deferred(key, "throughput", producer)
+
+    def start_metrics_exporter(self, port):
+        if self.metrics_exporter:
+            return
+        exporter = MetricsExporter(port)
+        try:
+            exporter.start()
+        except OSError as e:
+            print(f"Metrics exporter: cannot listen on port {port}: {e}")
+            return
+        exporter.publish(self._collect_testbed_metrics())
+        self.metrics_exporter = exporter
+        print(f"Metrics exporter: serving http://0.0.0.0:{port}/metrics")
+
+    def _on_history_event(self, process, kind, value, detail):
+        # Runs in the history writer thread
+        with self._exporter_lock:
+            if kind in ("start", "crash"):
+                self.exporter_counters[(kind, process)] += 1
+            if kind == "crash" and (detail or "").startswith("watchdog:"):
+                self.exporter_counters[("watchdog", process)] += 1
+            if kind == "throughput" and value is not None:
+                self.exporter_iperf[(process, detail)] = value
+
+    def _collect_testbed_metrics(self):
+        processes = ("core", "gnb", "ue", "tshark", "core_iperf", "ue_iperf")
+        running = {p: bool(getattr(self, f"{p}_running", False)) for p in processes}
+        now = time.time()
+        started = {p: self.process_start_times.get(p) or getattr(self, f"{p}_start_time", 0) for p in processes}
+        with self._exporter_lock:
+            counters = dict(self.exporter_counters)
+            iperf = sorted(self.exporter_iperf.items())
+        _, supervision_drops = self.supervision.counts()
+        ue_ip = self.ue_ip
+        attached = ue_ip != "<N/A>"
+        tab_usage = self.tab_memory.usage
+        tab_pool = sorted(self.terminal_pool.stats().items())
+
+        def per_process(kind):
+            return [({"process": p}, counters.get((kind, p), 0)) for p in processes]
+
+        return [
+            ("srsran_gui_up", "gauge", "The testbed GUI is running.",
+             [({"host": socket.gethostname()}, 1)]),
+            ("srsran_gui_process_running", "gauge", "1 while the GUI has the process started.",
+             [({"process": p}, int(running[p])) for p in processes]),
+            ("srsran_gui_process_uptime_seconds", "gauge", "Seconds since the GUI started the running process.",
+             [({"process": p}, round(now - started[p], 1)) for p in processes if running[p] and started[p]]),
+            ("srsran_gui_process_starts_total", "counter", "Process starts since the GUI was launched.",
+             per_process("start")),
+            ("srsran_gui_process_crashes_total", "counter", "Unexpected process exits since the GUI was launched.",
+             per_process("crash")),
+            ("srsran_gui_watchdog_detections_total", "counter", "Crashes found by the watchdog process scan.",
+             per_process("watchdog")),
+            ("srsran_gui_watchdog_dropped_total", "counter",
+             "Watchdog actions dropped because one for the same process was still pending.",
+             [({"process": p}, supervision_drops.get(p, 0)) for p in processes]),
+            ("srsran_gui_ue_attached", "gauge", "1 once the UE has an IP address.",
+             [({}, int(attached))]),
+            ("srsran_gui_ue_info", "gauge", "Current UE IP address.",
+             [({"ip": ue_ip}, 1)] if attached else []),
+            ("srsran_gui_iperf_last_mbps", "gauge", "Bitrate of the last finished iperf test in Mbit/s.",
+             [({"process": p, "role": role}, mbps) for (p, role), mbps in iperf]),
+            ("srsran_gui_gnb_metrics_reports_total", "counter", "gNB JSON metric reports received.",
+             [({}, self.gnb_metrics.reports)]),
+            ("srsran_gui_tab_memory_bytes", "gauge",
+             "Estimated memory per terminal tab: VTE buffer and RSS of the tab's shell with its children.",
+             [({"tab": key, "kind": kind}, cost[i]) for key, cost in sorted(tab_usage.items())
+              for i, kind in enumerate(("buffer", "rss"))]),
+            ("srsran_gui_tab_evictions_total", "counter", "Read-only tabs closed to stay within the tab memory budget.",
+             [({}, self.tab_memory.evictions)]),
+            ("srsran_gui_tabs_opened_total", "counter", "Terminal tabs opened, by whether the shell came from the pool.",
+             [({"kind": kind}, count) for kind, (count, _) in tab_pool]),
+            ("srsran_gui_tab_first_output_seconds", "gauge",
+             "Median time from opening a tab until its command printed output, over the last 200 tabs.",
+             [({"kind": kind}, round(p50, 4)) for kind, (_, p50) in tab_pool if p50 is not None]),
+        ]
+
     def _watchdog_loop(self):
         while self.watchdog_running:
             time.sleep(2) # Keep the 2-second interval
@@ -1019,29 +5847,50 @@ class SrsRanGuiApp(Gtk.Window):
             if self.is_closing:
                 break
 
-            # key: (is_running_flag, cleanup_function, pattern)
+            # key: (is_running_flag, cleanup_function, pattern); flags from one consistent snapshot
+            state = self.state.snapshot()
             checks = [
-                ('gnb', self.gnb_running, self.handle_gnb_stopped_unexpectedly, "gnb -c",None),
-                ('ue', self.ue_running, self.reset_ue_button, "srsue",None),
-                ('tshark', self.tshark_running, self.reset_tshark_button, "tshark",None),
+                ('gnb', state.get('gnb_running'), self.handle_gnb_stopped_unexpectedly, "gnb -c",None),
+                ('ue', state.get('ue_running'), self.reset_ue_button, "srsue",None),
+                ('tshark', state.get('tshark_running'), self.reset_tshark_button, "tshark",None),
                 # Note: "docker compose" often appears as "docker-compose" or just "docker" depending on version
-                ('core', self.core_running, self.handle_core_stopped_unexpectedly, "docker compose",None),
-                ('core_iperf', self.core_iperf_running, self.reset_core_iperf_button, "iperf3 -s",'core_iperf_start_time'),
-                ('ue_iperf', self.ue_iperf_running, self.reset_ue_iperf_button, "iperf3 -c",'ue_iperf_start_time')
+                ('core', state.get('core_running'), self.handle_core_stopped_unexpectedly, "docker compose",None),
+                ('core_iperf', state.get('core_iperf_running'), self.reset_core_iperf_button, "iperf3 -s",'core_iperf_start_time'),
+                ('ue_iperf', state.get('ue_iperf_running'), self.reset_ue_iperf_button, "iperf3 -c",'ue_iperf_start_time')
             ]
             try:
+                # One /proc pass serves both the liveness checks and the crash forensics samples
+                found = self._scan_processes_native([ptrn for _, running, _, ptrn, _ in checks if running])
+                now = time.time()
                 for key, running, func, ptrn, grace_attr in checks:
                     if running:
+                        pids = found[ptrn]
+                        if pids:
+                            self._sample_resources(key, pids, now)
                         if grace_attr:
                             start_ts = getattr(self, grace_attr, 0)
-                            if time.time() - start_ts < 15:
+                            if now - start_ts < 15:
                                 continue
-                        # USE THE NEW OPTIMIZED CHECK
-                        if not self._check_process_running_native(ptrn):
-                            GLib.idle_add(func)
+                        if not pids:
+                            # Coalesced: a detection still waiting for the main loop is not queued again
+                            self.supervision.post(key, self._on_watchdog_detection, key, ptrn, func)
+                if self.metrics_exporter:
+                    self.metrics_exporter.publish(self._collect_testbed_metrics())
             except Exception as e:
                 print(f"Watchdog Error: {e}")       
 
+    def _on_watchdog_detection(self, key, pattern, cleanup):
+        # Re-checked on the GTK thread: the user may have stopped it since the scan
+        if self.is_closing or not getattr(self, f"{key}_running"):
+            return False
+        if key.endswith('_iperf'):
+            self.history.record(key, "stop", detail="exited")
+        else:
+            self.history.record(key, "crash", detail=f"watchdog: '{pattern}' not found")
+            self._save_crash_bundle(key, f"watchdog: '{pattern}' not found")
+        cleanup()
+        return False
+
     def handle_core_stopped_unexpectedly(self):
         # This function is called by the Watchdog when it sees 
         # "docker compose" is no longer running (e.g., after Ctrl+C)
@@ -1059,12 +5908,6 @@ class SrsRanGuiApp(Gtk.Window):
 
     def handle_gnb_stopped_unexpectedly(self):
         self.reset_gnb_button()
-        if self.grafana_terminal_ref:
-            try:
-                self.grafana_terminal_ref.feed_child(b'\x03')
-            except Exception:
-                pass
-            self.grafana_terminal_ref = None
 
         if self.ue_running:
             self.toggle_ue_process(None) # Auto stop UE if gNB dies
@@ -1276,8 +6119,9 @@ class SrsRanGuiApp(Gtk.Window):
         command = "sudo docker stats\n"
         self._run_simple_command(terminal, command)
 
-    def _run_simple_command(self, terminal, command):
+    def _run_simple_command(self, terminal, command, delay=500):
         # Helper to send a single command safely
+        self.terminal_pool.measure_output(terminal, command)
         def send():
             if not self.is_closing and terminal:
                 try:
@@ -1285,13 +6129,18 @@ class SrsRanGuiApp(Gtk.Window):
                 except:
                     pass
             return False
-        GLib.timeout_add(500, send)
+        # A pooled shell is already at its prompt; only a fresh one needs time to start
+        if self.terminal_pool.at_prompt(terminal):
+            send()
+        else:
+            GLib.timeout_add(delay, send)
 
     def show_gnb_menu(self):
         items = [
             ("Config", self.on_gnb_config),
             ("Logs", self.on_gnb_logs),
             ("Web UI", self.on_gnb_webui),
+            ("Metrics", self.on_gnb_metrics),
             ("Pcap", self.on_gnb_pcap),
         ]
         self.add_toolbar_with_content(items, "gnb_area", "gnb_buttons")
@@ -1302,6 +6151,8 @@ class SrsRanGuiApp(Gtk.Window):
             ("Config", self.on_ue_config),
             ("Logs", self.on_ue_logs),
             ("Pcap", self.on_ue_pcap),
+            ("Scale Test", self.on_ue_scale),
+            ("Latency", self.on_ue_latency),
         ]
         
         # Capture the button container
@@ -1324,6 +6175,105 @@ class SrsRanGuiApp(Gtk.Window):
         hbox.pack_start(self.ue_iperf_button_ref, False, False, 0)
         hbox.show_all()
 
+    # -------------------------------------------------------------------------
+    # RUN HISTORY VIEW
+    # -------------------------------------------------------------------------
+    def show_history_menu(self):
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        vbox.set_margin_top(15)
+        vbox.set_margin_start(15)
+        vbox.set_margin_end(15)
+        vbox.pack_start(self.create_title("Run History"), False, False, 0)
+
+        # --- Filters ---
+        hbox_filters = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        self.history_process_combo = Gtk.ComboBoxText()
+        for item in ["All processes", "core", "gnb", "ue", "tshark", "core_iperf", "ue_iperf"]:
+            self.history_process_combo.append_text(item)
+        self.history_process_combo.set_active(0)
+
+        self.history_kind_combo = Gtk.ComboBoxText()
+        for item in ["All events", "start", "ready", "stop", "crash", "throughput", "capture", "archive"]:
+            self.history_kind_combo.append_text(item)
+        self.history_kind_combo.set_active(0)
+
+        self.history_range_combo = Gtk.ComboBoxText()
+        self.history_ranges = [("Last 24 hours", 86400), ("Last 7 days", 7 * 86400),
+                               ("Last 30 days", 30 * 86400), ("All time", None)]
+        for label, _ in self.history_ranges:
+            self.history_range_combo.append_text(label)
+        self.history_range_combo.set_active(1)
+
+        btn_refresh = Gtk.Button(label="Refresh")
+        btn_refresh.connect("clicked", lambda w: self._refresh_history_view())
+        for combo in (self.history_process_combo, self.history_kind_combo, self.history_range_combo):
+            combo.connect("changed", lambda w: self._refresh_history_view())
+            hbox_filters.pack_start(combo, False, False, 0)
+        hbox_filters.pack_start(btn_refresh, False, False, 0)
+        vbox.pack_start(hbox_filters, False, False, 0)
+
+        # --- KPI summary ---
+        self.history_summary_label = Gtk.Label(label="Loading...")
+        self.history_summary_label.set_xalign(0.0)
+        self.history_summary_label.set_selectable(True)
+        self.history_summary_label.get_style_context().add_class("terminal-style")
+        vbox.pack_start(self.history_summary_label, False, False, 0)
+
+        # --- Event list ---
+        self.history_store = Gtk.ListStore(str, str, str, str, str, str)
+        treeview = Gtk.TreeView(model=self.history_store)
+        for i, title in enumerate(["Time", "Process", "Event", "Value", "Config", "Detail"]):
+            column = Gtk.TreeViewColumn(title, Gtk.CellRendererText(), text=i)
+            column.set_resizable(True)
+            treeview.append_column(column)
+
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        scrolled.add(treeview)
+        vbox.pack_start(scrolled, True, True, 0)
+
+        self.section_box.pack_start(vbox, True, True, 0)
+        self._refresh_history_view()
+
+    def _refresh_history_view(self):
+        process = self.history_process_combo.get_active_text()
+        kind = self.history_kind_combo.get_active_text()
+        window = self.history_ranges[self.history_range_combo.get_active()][1]
+        process = None if process == "All processes" else process
+        kind = None if kind == "All events" else kind
+        since = time.time() - window if window else None
+
+        def worker_thread():
+            try:
+                events = self.history.query_events(process=process, kind=kind, since=since)
+                summary = self.history.query_kpi_summary(since or 0)
+            except sqlite3.Error as e:
+                events, summary = [], []
+                print(f"History query failed: {e}")
+            GLib.idle_add(update_gui, events, summary)
+
+        def update_gui(events, summary):
+            if self.is_closing: return
+            self.history_store.clear()
+            for ts, proc, evt, value, detail, config_hash in events:
+                self.history_store.append([
+                    datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S"),
+                    proc, evt,
+                    "" if value is None else f"{value:g}",
+                    config_hash or "",
+                    detail or ""
+                ])
+            lines = []
+            units = {'ready': 's', 'throughput': 'Mbit/s'}
+            for proc, evt, config_hash, n, avg, vmin, vmax in summary:
+                if avg is None: continue
+                unit = units.get(evt, '')
+                lines.append(f"{proc:<11} {evt:<10} cfg={config_hash or '-':<16} n={n:<4} "
+                             f"avg={avg:.2f}{unit}  min={vmin:.2f}  max={vmax:.2f}")
+            self.history_summary_label.set_text("\n".join(lines) or "No KPI samples in this range.")
+
+        threading.Thread(target=worker_thread, daemon=True).start()
+
     def on_gnb_logs(self, _):
         # 1. Switch to terminal view
         self.content_paned.set_position(self.default_terminal_pane_position)
@@ -1352,6 +6302,9 @@ class SrsRanGuiApp(Gtk.Window):
     def on_gnb_webui(self, _):
         allocation = self.content_paned.get_allocation()
         self.content_paned.set_position(allocation.height)
+        if not self.settings["grafana_enabled"]:
+            self.on_gnb_metrics(None)
+            return
         if self.webview_container: return
         self.original_content_pane = self.content_box
         self.webview_container = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
@@ -1360,7 +6313,7 @@ class SrsRanGuiApp(Gtk.Window):
         back_btn.connect("clicked", lambda w: self._restore_main_view())
         header.pack_start(back_btn, False, False, 10)
         webview = WebKit2.WebView()
-        webview.load_uri("http://127.0.0.1:3300/")
+        webview.load_uri(GRAFANA_URL)
         self.webview_container.pack_start(header, False, False, 0)
         self.webview_container.pack_start(webview, True, True, 0)
         self.content_paned.remove(self.original_content_pane)
@@ -1392,40 +6345,321 @@ class SrsRanGuiApp(Gtk.Window):
         # 5. Execute
         self._send_commands_sequentially(terminal, commands, "ue_logs_scheduler_id")
 
-    def on_ue_webui(self, _):
-        # Placeholder for UE Web UI
-        allocation = self.content_paned.get_allocation()
-        self.content_paned.set_position(allocation.height)
-        if self.webview_container: return
-        
-        self.original_content_pane = self.content_box
-        self.webview_container = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
-        
-        header = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
-        back_btn = Gtk.Button(label="Back")
-        back_btn.connect("clicked", lambda w: self._restore_main_view())
-        header.pack_start(back_btn, False, False, 10)
-        
-        webview = WebKit2.WebView()
-        webview.load_uri("about:blank") # Placeholder URL
-        
-        self.webview_container.pack_start(header, False, False, 0)
-        self.webview_container.pack_start(webview, True, True, 0)
-        
-        self.content_paned.remove(self.original_content_pane)
-        self.content_paned.pack1(self.webview_container, resize=True, shrink=False)
-        self.webview_container.show_all()
+    def on_ue_webui(self, _):
+        # Placeholder for UE Web UI
+        allocation = self.content_paned.get_allocation()
+        self.content_paned.set_position(allocation.height)
+        if self.webview_container: return
+        
+        self.original_content_pane = self.content_box
+        self.webview_container = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
+        
+        header = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=6)
+        back_btn = Gtk.Button(label="Back")
+        back_btn.connect("clicked", lambda w: self._restore_main_view())
+        header.pack_start(back_btn, False, False, 10)
+        
+        webview = WebKit2.WebView()
+        webview.load_uri("about:blank") # Placeholder URL
+        
+        self.webview_container.pack_start(header, False, False, 0)
+        self.webview_container.pack_start(webview, True, True, 0)
+        
+        self.content_paned.remove(self.original_content_pane)
+        self.content_paned.pack1(self.webview_container, resize=True, shrink=False)
+        self.webview_container.show_all()
+
+    def on_ue_pcap(self, _):
+        # Placeholder for Pcap
+        allocation = self.content_paned.get_allocation()
+        self.content_paned.set_position(allocation.height)
+        box = self.ue_area
+        for c in box.get_children(): box.remove(c)
+        lbl = Gtk.Label(label="Pcap functionality coming soon")
+        box.pack_start(lbl, True, True, 0)
+        box.show_all()
+
+    def on_ue_scale(self, _):
+        allocation = self.content_paned.get_allocation()
+        self.content_paned.set_position(allocation.height)
+        box = self.ue_area
+        for c in box.get_children(): box.remove(c)
+
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        title = Gtk.Label(label="Multi-UE Scale Test")
+        title.get_style_context().add_class("header-title")
+        title.set_xalign(0.0)
+        vbox.pack_start(title, False, False, 0)
+
+        # --- Parameters ---
+        grid = Gtk.Grid()
+        grid.set_column_spacing(10)
+        grid.set_row_spacing(6)
+        self.scale_n_spin = Gtk.SpinButton.new_with_range(1, 32, 1)
+        self.scale_n_spin.set_value(4)
+        self.scale_duration_spin = Gtk.SpinButton.new_with_range(5, 3600, 5)
+        self.scale_duration_spin.set_value(30)
+        self.scale_bitrate_entry = Gtk.Entry()
+        self.scale_bitrate_entry.set_text("10M")
+        for row, (label, widget) in enumerate([("Number of UEs", self.scale_n_spin),
+                                               ("Duration (s)", self.scale_duration_spin),
+                                               ("Bitrate per UE", self.scale_bitrate_entry)]):
+            lbl = Gtk.Label(label=label)
+            lbl.set_xalign(0.0)
+            grid.attach(lbl, 0, row, 1, 1)
+            grid.attach(widget, 1, row, 1, 1)
+        vbox.pack_start(grid, False, False, 0)
+
+        self.scale_button_ref = Gtk.Button()
+        self.scale_button_ref.set_size_request(180, 40)
+        self.scale_button_ref.connect("clicked", self.toggle_scale_test)
+        hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        hbox.pack_start(self.scale_button_ref, False, False, 0)
+        vbox.pack_start(hbox, False, False, 0)
+
+        note = Gtk.Label(label=f"UE n uses namespace ue<n>, ZMQ ports {ZMQ_UE_BASE_PORT}+2(n-1) and IMSI = base + n-1.\n"
+                               "All IMSIs must be provisioned in the core.")
+        note.set_opacity(0.7)
+        note.set_xalign(0.0)
+        vbox.pack_start(note, False, False, 0)
+
+        self.scale_status_label = Gtk.Label(label="Idle")
+        self.scale_status_label.set_xalign(0.0)
+        vbox.pack_start(self.scale_status_label, False, False, 0)
+
+        # --- Results ---
+        self.scale_store = Gtk.ListStore(str, str, str)
+        treeview = Gtk.TreeView(model=self.scale_store)
+        for i, col_title in enumerate(["UE", "IP", "DL Throughput"]):
+            treeview.append_column(Gtk.TreeViewColumn(col_title, Gtk.CellRendererText(), text=i))
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        scrolled.add(treeview)
+        vbox.pack_start(scrolled, True, True, 0)
+
+        box.pack_start(vbox, True, True, 0)
+        self._update_scale_button()
+        box.show_all()
+
+    def _update_scale_button(self):
+        btn = getattr(self, 'scale_button_ref', None)
+        if not btn: return
+        ctx = btn.get_style_context()
+        if self.scale_run:
+            btn.set_label(f"{STOP_SYMBOL} Stop Scale Test")
+            ctx.remove_class("start-button")
+            ctx.add_class("stop-button")
+        else:
+            btn.set_label(f"{PLAY_SYMBOL} Start Scale Test")
+            ctx.remove_class("stop-button")
+            ctx.add_class("start-button")
+
+    def toggle_scale_test(self, widget):
+        if self.scale_run:
+            self.scale_run.stop()
+            self.scale_status_label.set_text("Stopping...")
+            widget.set_sensitive(False)
+            return
+
+        if zmq is None or np is None:
+            self._show_alert("Scale mode needs pyzmq and NumPy.\nInstall them with: pip install pyzmq numpy",
+                             title="Missing Dependency")
+            return
+        if not self.core_running:
+            self._show_alert("Please start the 5G Core Network first.")
+            return
+        if not self.gnb_running:
+            self._show_alert("Please start the gNB first.")
+            return
+        if self.ue_running:
+            self._show_alert("Please stop the single UE first (it uses the same ZMQ ports).")
+            return
+
+        n_ues = int(self.scale_n_spin.get_value())
+        duration = int(self.scale_duration_spin.get_value())
+        bitrate = self.scale_bitrate_entry.get_text().strip() or "10M"
+        self.scale_store.clear()
 
-    def on_ue_pcap(self, _):
-        # Placeholder for Pcap
+        def on_status(text):
+            def update_gui():
+                if not self.is_closing:
+                    self.scale_status_label.set_text(text)
+                return False
+            GLib.idle_add(update_gui)
+
+        def on_finished(result):
+            for ue in result['ues']:
+                if ue['mbps'] is not None:
+                    self.history.record("scale", "throughput", value=round(ue['mbps'], 3),
+                                        detail=f"{ue['ue']} of {n_ues}")
+            if result['ues']:
+                self.history.record("scale", "throughput", value=round(result['aggregate_mbps'], 3),
+                                    detail=f"aggregate of {n_ues} (late events: {result['late_events']})")
+            GLib.idle_add(show_result, result)
+
+        def show_result(result):
+            if self.is_closing: return
+            self.scale_run = None
+            self.scale_button_ref.set_sensitive(True)
+            self._update_scale_button()
+            for ue in result['ues']:
+                mbps = "-" if ue['mbps'] is None else f"{ue['mbps']:.2f} Mbit/s"
+                self.scale_store.append([ue['ue'], ue['ip'], mbps])
+            if result['error']:
+                self.scale_status_label.set_text(f"Failed: {result['error']}")
+            else:
+                self.scale_status_label.set_text(
+                    f"Aggregate: {result['aggregate_mbps']:.2f} Mbit/s over {len(result['ues'])} UEs, "
+                    f"gNB late/underflow reports: {result['late_events']}"
+                    + (f", stalled UEs: {', '.join(result['stalled_ues'])}" if result['stalled_ues'] else ""))
+
+        self.history.record("scale", "start", detail=f"{n_ues} UEs, {duration}s, {bitrate}", config_path=UE_CONFIG_PATH)
+        self.scale_run = MultiUeScaleRun(n_ues, duration, bitrate, on_status, on_finished)
+        self.scale_run.start()
+        self._update_scale_button()
+
+    def on_ue_latency(self, _):
         allocation = self.content_paned.get_allocation()
         self.content_paned.set_position(allocation.height)
         box = self.ue_area
         for c in box.get_children(): box.remove(c)
-        lbl = Gtk.Label(label="Pcap functionality coming soon")
-        box.pack_start(lbl, True, True, 0)
+
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        title = Gtk.Label(label="Latency / Jitter Probe (ue1)")
+        title.get_style_context().add_class("header-title")
+        title.set_xalign(0.0)
+        vbox.pack_start(title, False, False, 0)
+
+        grid = Gtk.Grid()
+        grid.set_column_spacing(10)
+        grid.set_row_spacing(6)
+        self.latency_target_combo = Gtk.ComboBoxText.new_with_entry()
+        for target in ["10.53.1.1", "10.45.1.1"]:
+            self.latency_target_combo.append_text(target)
+        self.latency_target_combo.set_active(0)
+        self.latency_interval_spin = Gtk.SpinButton.new_with_range(1, 1000, 1)
+        self.latency_interval_spin.set_value(10)
+        self.latency_payload_spin = Gtk.SpinButton.new_with_range(16, 1400, 16)
+        self.latency_payload_spin.set_value(64)
+        for row, (label, widget) in enumerate([("Target", self.latency_target_combo),
+                                               ("Interval (ms)", self.latency_interval_spin),
+                                               ("Payload (bytes)", self.latency_payload_spin)]):
+            lbl = Gtk.Label(label=label)
+            lbl.set_xalign(0.0)
+            grid.attach(lbl, 0, row, 1, 1)
+            grid.attach(widget, 1, row, 1, 1)
+        vbox.pack_start(grid, False, False, 0)
+
+        self.latency_button_ref = Gtk.Button()
+        self.latency_button_ref.set_size_request(180, 40)
+        self.latency_button_ref.connect("clicked", self.toggle_latency_probe)
+        hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        hbox.pack_start(self.latency_button_ref, False, False, 0)
+        vbox.pack_start(hbox, False, False, 0)
+
+        note = Gtk.Label(label=f"A built-in UDP echo server answers on the host (10.53.1.1:{LATENCY_ECHO_PORT}).\n"
+                               f"Other targets need a UDP echo service on port {LATENCY_ECHO_PORT}.")
+        note.set_opacity(0.7)
+        note.set_xalign(0.0)
+        vbox.pack_start(note, False, False, 0)
+
+        self.latency_stats_label = Gtk.Label(label="Idle")
+        self.latency_stats_label.set_xalign(0.0)
+        self.latency_stats_label.set_yalign(0.0)
+        self.latency_stats_label.get_style_context().add_class("terminal-style")
+        vbox.pack_start(self.latency_stats_label, True, True, 0)
+
+        box.pack_start(vbox, True, True, 0)
+        self._update_latency_button()
         box.show_all()
 
+    def _update_latency_button(self):
+        btn = getattr(self, 'latency_button_ref', None)
+        if not btn: return
+        ctx = btn.get_style_context()
+        if self.latency_probe:
+            btn.set_label(f"{STOP_SYMBOL} Stop Probe")
+            ctx.remove_class("start-button")
+            ctx.add_class("stop-button")
+        else:
+            btn.set_label(f"{PLAY_SYMBOL} Start Probe")
+            ctx.remove_class("stop-button")
+            ctx.add_class("start-button")
+
+    def toggle_latency_probe(self, _):
+        if self.latency_probe:
+            self._stop_latency_probe()
+            return
+
+        if not self.ue_running:
+            self._show_alert("Please start the User Equipment first.")
+            return
+
+        target = self.latency_target_combo.get_active_text().strip()
+        try:
+            if self.latency_echo_server is None:
+                self.latency_echo_server = UdpEchoServer()
+                self.latency_echo_server.start()
+        except OSError as e:
+            self.latency_echo_server = None
+            self._show_alert(f"Could not start the echo server: {e}", title="Latency Probe")
+            return
+
+        self.latency_probe = LatencyProbe("ue1", target,
+                                          interval_ms=self.latency_interval_spin.get_value(),
+                                          payload=int(self.latency_payload_spin.get_value()))
+        self.latency_probe.start()
+        self.history.record("latency", "start", detail=target)
+        self.latency_update_id = GLib.timeout_add(500, self._update_latency_stats)
+        self._update_latency_button()
+
+    def _stop_latency_probe(self):
+        probe = self.latency_probe
+        if not probe: return
+        probe.stop()
+        if self.latency_update_id:
+            GLib.source_remove(self.latency_update_id)
+            self.latency_update_id = None
+        if self.latency_echo_server:
+            self.latency_echo_server.stop()
+            self.latency_echo_server = None
+
+        _, total = probe.snapshot()
+        if total['count']:
+            for name in ('p50', 'p99', 'p999'):
+                self.history.record("latency", "latency", value=total[name] / 1000.0, detail=f"{name} ms")
+        self.latency_probe = None
+        self._update_latency_button()
+
+    def _update_latency_stats(self):
+        probe = self.latency_probe
+        if self.is_closing or not probe:
+            return False
+        window, total = probe.snapshot()
+
+        def ms(us): return f"{us / 1000.0:8.3f}"
+        lost = max(0, total['sent'] - total['received'])
+        loss_pct = 100.0 * lost / total['sent'] if total['sent'] else 0.0
+        lines = [
+            f"{'':<12}{'p50':>9}{'p99':>9}{'p999':>9}{'min':>9}{'max':>9}  (ms)",
+            f"{'Last 0.5s':<12}{ms(window['p50'])}{ms(window['p99'])}{ms(window['p999'])}"
+            f"{ms(window['min'])}{ms(window['max'])}",
+            f"{'Since start':<12}{ms(total['p50'])}{ms(total['p99'])}{ms(total['p999'])}"
+            f"{ms(total['min'])}{ms(total['max'])}",
+            "",
+            f"Sent: {total['sent']}  Received: {total['received']}  Lost/in flight: {lost} ({loss_pct:.2f}%)",
+            f"Jitter: {total['jitter'] / 1000.0:.3f} ms  Reordered: {total['reordered']}  "
+            f"Skipped send slots: {total['skipped']}",
+        ]
+        if probe.error:
+            lines.append(f"Error: {probe.error}")
+        if hasattr(self, 'latency_stats_label'):
+            self.latency_stats_label.set_text("\n".join(lines))
+        if not probe.running:
+            self._stop_latency_probe()
+            return False
+        return True
+
     def toggle_ue_iperf(self, widget):
         # Ensure we switch to terminal view so user sees the result
         self.content_paned.set_position(self.default_terminal_pane_position)
@@ -1435,6 +6669,7 @@ class SrsRanGuiApp(Gtk.Window):
             terminal = self.create_terminal_tab("ue_iperf", "UE iPerf Client")
             self.ue_iperf_running = True
             self.ue_iperf_start_time = time.time()
+            self.history.record("ue_iperf", "start")
             
             # Update Button to Red/Stop
             widget.set_label(f"{STOP_SYMBOL} Stop Speedtest")
@@ -1449,7 +6684,7 @@ class SrsRanGuiApp(Gtk.Window):
                 "route -n",
                 "sudo ip netns exec ue1 ip route add default via 10.45.1.1 dev tun_srsue",
                 "sudo ip netns exec ue1 route -n",
-                "sudo ip netns exec ue1 iperf3 -c 10.53.1.1 -i 1 -t 60 -b 60M -R"
+                f"sudo ip netns exec ue1 iperf3 -c 10.53.1.1 -i 1 -t 60 -b 60M -R --forceflush | tee {UE_IPERF_LOG}"
             ]
             self._send_commands_sequentially(terminal, commands, "ue_speedtest_scheduler_id", delay=400)
         else:
@@ -1470,28 +6705,547 @@ class SrsRanGuiApp(Gtk.Window):
             self.reset_ue_iperf_button()
 
     def reset_ue_iperf_button(self):
+        if self.ue_iperf_running:
+            self._record_iperf_summary("ue_iperf", UE_IPERF_LOG)
         self.ue_iperf_running = False
-        def update_ui():
-            if self.is_closing: return
-            # Check if the button exists (user might have switched menus)
-            if self.ue_iperf_button_ref and self.ue_iperf_button_ref.get_realized():
-                self.ue_iperf_button_ref.set_sensitive(True)
-                ctx = self.ue_iperf_button_ref.get_style_context()
-                ctx.remove_class("stop-button")
-                ctx.add_class("start-button")
-                self.ue_iperf_button_ref.set_label(f"{PLAY_SYMBOL} Start Speedtest")
-        GLib.idle_add(update_ui)
+        self.state.set("ue_iperf_button", "start", force=True)
+
+    def on_grafana_setting_toggled(self, widget):
+        self.settings["grafana_enabled"] = widget.get_active()
+        save_app_settings(self.settings)
+
+    def _start_grafana_then(self, healthy, start_gnb, interrupted=False):
+        if self.is_closing:
+            return False
+        if healthy:
+            print("Grafana already running, reusing it")
+            start_gnb()
+            return False
+
+        tab = self.terminals.get("grafana")
+        if tab and not self.terminal_pool.at_prompt(tab['terminal'], nested=True):
+            if interrupted:
+                print("Grafana tab is still busy, starting the gNB without Grafana")
+                start_gnb()
+            else:
+                self._reclaim_grafana_tab(tab['terminal'], start_gnb)
+            return False
+
+        # Start Grafana (Foreground Mode); an existing tab is back at its shell prompt
+        reuse_tab = tab is not None
+        grafana_terminal = self.create_terminal_tab("grafana", "Grafana Service")
+        self.grafana_terminal_ref = grafana_terminal
+        grafana_cmd = [self._logged("grafana", "sudo docker compose -f docker/docker-compose.yml up grafana")]
+        if not reuse_tab:
+            grafana_cmd = ["sudo su", "cd", "cd srsRAN_Project/"] + grafana_cmd
+        self._send_commands_sequentially(grafana_terminal, grafana_cmd, "grafana_scheduler_id")
+        if hasattr(self, 'maximize_terminal_view'):
+            self.maximize_terminal_view()
+
+        def wait_ready():
+            deadline = time.monotonic() + GRAFANA_START_GRACE
+            while time.monotonic() < deadline and not grafana_is_healthy(timeout=0.25):
+                time.sleep(0.25)
+            GLib.idle_add(start_gnb)
+        threading.Thread(target=wait_ready, daemon=True).start()
+        return False
+
+    def _reclaim_grafana_tab(self, terminal, start_gnb):
+        # The previous compose run still owns the tab: give it the start grace to become
+        # healthy, otherwise interrupt it and wait for the prompt before starting again.
+        # A run stop_grafana already interrupted is only waited for.
+        def wait_healthy():
+            deadline = time.monotonic() + GRAFANA_START_GRACE
+            while time.monotonic() < deadline:
+                if grafana_is_healthy(timeout=0.25):
+                    GLib.idle_add(self._start_grafana_then, True, start_gnb)
+                    return
+                time.sleep(0.25)
+            GLib.idle_add(interrupt, True)
+
+        def interrupt(send_ctrl_c):
+            if self.is_closing:
+                return False
+            if send_ctrl_c:
+                try:
+                    terminal.feed_child(b'\x03')
+                except Exception:
+                    pass
+            deadline = time.monotonic() + GRAFANA_STOP_GRACE
+            def poll_prompt():
+                if self.terminal_pool.at_prompt(terminal, nested=True) or time.monotonic() >= deadline:
+                    self._start_grafana_then(False, start_gnb, interrupted=True)
+                    return False
+                return True
+            GLib.timeout_add(250, poll_prompt)
+            return False
+
+        if self.grafana_terminal_ref is terminal:
+            threading.Thread(target=wait_healthy, daemon=True).start()
+        else:
+            interrupt(False)
+
+    def stop_grafana(self):
+        if self.grafana_scheduler_id:
+            GLib.source_remove(self.grafana_scheduler_id)
+            self.grafana_scheduler_id = None
+        if not self.grafana_terminal_ref:
+            self._show_alert("Grafana was not started from this GUI, stop it with docker compose.", title="Grafana")
+            return
+        try:
+            self.grafana_terminal_ref.feed_child(b'\x03')
+        except Exception:
+            pass
+        self.grafana_terminal_ref = None
+
+    def _start_metrics_receiver(self):
+        if self.gnb_metrics_receiver.running:
+            return
+        try:
+            self.gnb_metrics_receiver.start()
+        except OSError as e:
+            print(f"gNB metrics receiver: cannot listen on UDP {self.gnb_metrics_receiver.port}: {e}")
+
+    def on_gnb_metrics(self, _):
+        allocation = self.content_paned.get_allocation()
+        self.content_paned.set_position(allocation.height)
+        box = self.gnb_area
+        for c in box.get_children(): box.remove(c)
+        self._start_metrics_receiver()
+        self.gnb_metrics_view = self.create_metrics_view()
+        box.pack_start(self.gnb_metrics_view, True, True, 0)
+        box.show_all()
+
+    def create_metrics_view(self):
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=8)
+        header = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        title = Gtk.Label(label="gNB Metrics")
+        title.get_style_context().add_class("header-title")
+        header.pack_start(title, False, False, 0)
+        self.metrics_source_combo = Gtk.ComboBoxText()
+        self.metrics_source_ids = ()
+        self.metrics_source_combo.connect("changed", lambda w: [c.queue_draw() for c in self.metrics_charts])
+        header.pack_start(self.metrics_source_combo, False, False, 0)
+        self.metrics_window_combo = Gtk.ComboBoxText()
+        for seconds, label in GNB_METRICS_WINDOWS:
+            self.metrics_window_combo.append(str(seconds), label)
+        self.metrics_window_combo.set_active(0)
+        self.metrics_window_combo.connect("changed", lambda w: [c.queue_draw() for c in self.metrics_charts])
+        header.pack_start(self.metrics_window_combo, False, False, 0)
+        self.metrics_status_label = Gtk.Label(label="")
+        self.metrics_status_label.set_opacity(0.7)
+        header.pack_start(self.metrics_status_label, False, False, 0)
+        vbox.pack_start(header, False, False, 0)
+
+        grid = Gtk.Grid()
+        grid.set_row_spacing(8)
+        grid.set_column_spacing(8)
+        grid.set_row_homogeneous(True)
+        grid.set_column_homogeneous(True)
+        self.metrics_charts = []
+        for i, spec in enumerate(GNB_METRICS_CHARTS):
+            chart = Gtk.DrawingArea()
+            chart.set_size_request(300, 180)
+            chart.set_hexpand(True)
+            chart.set_vexpand(True)
+            chart.connect("draw", self._draw_metrics_chart, spec)
+            grid.attach(chart, i % 2, i // 2, 1, 1)
+            self.metrics_charts.append(chart)
+        vbox.pack_start(grid, True, True, 0)
+
+        self._update_metrics_sources()
+        if self.metrics_update_id is None:
+            self.metrics_update_id = GLib.timeout_add(1000, self._refresh_metrics_view)
+        return vbox
+
+    def _update_metrics_sources(self):
+        store = self.gnb_metrics
+        ids = tuple([f"ue:{k}" for k in store.keys("ue")] + [f"cell:{k}" for k in store.keys("cell")])
+        if ids != self.metrics_source_ids:
+            selected = self.metrics_source_combo.get_active_id()
+            self.metrics_source_combo.remove_all()
+            for source_id in ids:
+                scope, key = source_id.split(":", 1)
+                pci, _, rnti = key.partition("/")
+                label = f"UE rnti={rnti} (pci {pci})" if scope == "ue" else f"Cell pci {key} (total)"
+                self.metrics_source_combo.append(source_id, label)
+            self.metrics_source_ids = ids
+            if selected in ids:
+                self.metrics_source_combo.set_active_id(selected)
+            elif ids:
+                self.metrics_source_combo.set_active(0)
+
+        receiver = self.gnb_metrics_receiver
+        if not receiver.running:
+            status = f"Not listening on UDP {receiver.port}"
+        elif store.last_report is None or time.time() - store.last_report > 5:
+            issue = gnb_metrics_config_issue(GNB_CONFIG_PATH, receiver.port, receiver.host)
+            if issue:
+                status = (f"Waiting for metrics on UDP {receiver.port}: {issue}. Add "
+                          f"'metrics: {{enable_json_metrics: true, addr: 127.0.0.1, port: {receiver.port}}}'")
+            else:
+                status = f"Waiting for metrics on UDP {receiver.port} (the gNB config has the metrics section)"
+        else:
+            status = f"{store.reports} reports received"
+        self.metrics_status_label.set_text(status)
+
+    def _refresh_metrics_view(self):
+        if self.is_closing:
+            return False
+        if not self.metrics_charts or not self.metrics_charts[0].get_mapped():
+            # View was closed; the next create_metrics_view() restarts the timer
+            self.metrics_update_id = None
+            return False
+        self._update_metrics_sources()
+        for chart in self.metrics_charts:
+            chart.queue_draw()
+        return True
+
+    def _draw_metrics_chart(self, widget, cr, spec):
+        title, unit, scale, fields = spec
+        source = self.metrics_source_combo.get_active_id()
+        end = time.time()
+        start = end - int(self.metrics_window_combo.get_active_id() or GNB_METRICS_WINDOWS[0][0])
+        alloc = widget.get_allocation()
+        # Roughly one point per horizontal pixel, whatever the window length
+        max_points = max(alloc.width - 58, 3)
+        series = []
+        if source:
+            scope, key = source.split(":", 1)
+            for field, label, rgb in fields:
+                points = self.gnb_metrics.series(scope, key, field, since=start, max_points=max_points)
+                series.append((label, rgb, [(ts, v * scale) for ts, v in points]))
+        draw_time_series(cr, alloc.width, alloc.height, title, unit, series, start, end)
+        return False
 
     def on_gnb_pcap(self, _):
-        # Placeholder for Pcap
         allocation = self.content_paned.get_allocation()
         self.content_paned.set_position(allocation.height)
         box = self.gnb_area
         for c in box.get_children(): box.remove(c)
-        lbl = Gtk.Label(label="Pcap functionality coming soon")
-        box.pack_start(lbl, True, True, 0)
+        self.gnb_pcap_holder = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
+        box.pack_start(self.gnb_pcap_holder, True, True, 0)
+        self._ensure_capture_browser(self.gnb_pcap_holder, "Capture Analyzer")
         box.show_all()
 
+    def show_capture_library(self):
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        vbox.set_margin_top(15)
+        vbox.set_margin_start(15)
+        vbox.set_margin_end(15)
+        self.library_browser_holder = vbox
+        self.section_box.pack_start(vbox, True, True, 0)
+        self._ensure_capture_browser(vbox, "Capture Library", list_height=320)
+
+    def _ensure_capture_browser(self, holder, title_text, list_height=160):
+        # The library page and the gNB Pcap tab share the self.pcap_* widgets,
+        # so the browser is rebuilt into 'holder' only if the other one was built last
+        treeview = getattr(self, 'pcap_treeview', None)
+        if treeview is None or not treeview.is_ancestor(holder):
+            for c in holder.get_children(): holder.remove(c)
+            holder.pack_start(self.create_capture_browser(title_text, list_height), True, True, 0)
+            holder.show_all()
+        self._refresh_pcap_list()
+
+    def _refresh_gnb_section(self):
+        holder = getattr(self, 'gnb_pcap_holder', None)
+        if holder is not None and holder.get_parent() is self.gnb_area:
+            self._ensure_capture_browser(holder, "Capture Analyzer")
+            return
+        view = getattr(self, 'gnb_metrics_view', None)
+        if view is not None and view.get_parent() is self.gnb_area:
+            if self.metrics_charts and self.metrics_charts[0].is_ancestor(view):
+                if self.metrics_update_id is None:
+                    self.metrics_update_id = GLib.timeout_add(1000, self._refresh_metrics_view)
+            else:
+                self.on_gnb_metrics(None)
+
+    def create_capture_browser(self, title_text, list_height=160):
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        title = Gtk.Label(label=title_text)
+        title.get_style_context().add_class("header-title")
+        title.set_xalign(0.0)
+        vbox.pack_start(title, False, False, 0)
+
+        # --- Capture list (metadata columns fill in from the cache / thread pool) ---
+        self.pcap_store = Gtk.ListStore(str, str, str, str, str, str, str)
+        self.pcap_rows = {}
+        self.pcap_treeview = Gtk.TreeView(model=self.pcap_store)
+        for i, col_title in enumerate(["Capture", "Size", "Modified", "Duration", "Packets", "Summary"]):
+            column = Gtk.TreeViewColumn(col_title, Gtk.CellRendererText(), text=i)
+            column.set_resizable(True)
+            self.pcap_treeview.append_column(column)
+        self.pcap_treeview.connect("row-activated", lambda *a: self.on_analyze_pcap_clicked(None))
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        scrolled.set_size_request(-1, list_height)
+        scrolled.add(self.pcap_treeview)
+        vbox.pack_start(scrolled, False, True, 0)
+
+        hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        self.pcap_analyze_button = Gtk.Button(label="Analyze")
+        self.pcap_analyze_button.connect("clicked", self.on_analyze_pcap_clicked)
+        btn_refresh = Gtk.Button(label="Refresh")
+        btn_refresh.connect("clicked", lambda w: self._refresh_pcap_list())
+        self.pcap_progress = Gtk.ProgressBar()
+        self.pcap_progress.set_show_text(True)
+        self.pcap_progress.set_text("")
+        self.pcap_timeline_button = Gtk.Button(label="Timeline")
+        self.pcap_timeline_button.connect("clicked", self.on_open_pcap_timeline_clicked)
+        btn_folder = Gtk.Button(label="Open in File Manager")
+        btn_folder.connect("clicked", self.open_capture_folder_externally)
+        hbox.pack_start(self.pcap_analyze_button, False, False, 0)
+        hbox.pack_start(self.pcap_timeline_button, False, False, 0)
+        hbox.pack_start(btn_refresh, False, False, 0)
+        hbox.pack_start(btn_folder, False, False, 0)
+        hbox.pack_start(self.pcap_progress, True, True, 0)
+        vbox.pack_start(hbox, False, False, 0)
+
+        self.pcap_notebook = Gtk.Notebook()
+
+        # --- Report ---
+        self.pcap_report_view = Gtk.TextView()
+        self.pcap_report_view.set_editable(False)
+        self.pcap_report_view.set_monospace(True)
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        scrolled.add(self.pcap_report_view)
+        self.pcap_notebook.append_page(scrolled, Gtk.Label(label="Summary"))
+
+        # --- Timeline ---
+        timeline = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        filters = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
+        self.pcap_proc_combo = Gtk.ComboBoxText()
+        self.pcap_proc_combo.append("", "All procedures")
+        for code, name in sorted(NGAP_PROCEDURES.items(), key=lambda kv: kv[1]):
+            self.pcap_proc_combo.append(str(code), name)
+        self.pcap_proc_combo.set_active(0)
+        self.pcap_ue_entry = Gtk.Entry()
+        self.pcap_ue_entry.set_placeholder_text("RAN UE NGAP ID")
+        self.pcap_time_entry = Gtk.Entry()
+        self.pcap_time_entry.set_placeholder_text("Jump to +seconds")
+        btn_go = Gtk.Button(label="Go")
+        btn_go.connect("clicked", lambda w: self._refresh_pcap_timeline())
+        for entry in (self.pcap_ue_entry, self.pcap_time_entry):
+            entry.connect("activate", lambda w: self._refresh_pcap_timeline())
+        for widget in (self.pcap_proc_combo, self.pcap_ue_entry, self.pcap_time_entry, btn_go):
+            filters.pack_start(widget, False, False, 0)
+        timeline.pack_start(filters, False, False, 0)
+
+        self.pcap_timeline_store = Gtk.ListStore(str, str, str, str, str, str)
+        treeview = Gtk.TreeView(model=self.pcap_timeline_store)
+        for i, col_title in enumerate(["Time (+s)", "Procedure", "Type", "RAN UE", "AMF UE"]):
+            column = Gtk.TreeViewColumn(col_title, Gtk.CellRendererText(), text=i)
+            column.set_resizable(True)
+            treeview.append_column(column)
+        treeview.connect("row-activated", self.on_pcap_timeline_row_activated)
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.AUTOMATIC, Gtk.PolicyType.AUTOMATIC)
+        scrolled.add(treeview)
+        timeline.pack_start(scrolled, True, True, 0)
+
+        self.pcap_packet_label = Gtk.Label(label="Double-click a message to read it from the capture.")
+        self.pcap_packet_label.set_xalign(0.0)
+        self.pcap_packet_label.set_selectable(True)
+        self.pcap_packet_label.get_style_context().add_class("terminal-style")
+        timeline.pack_start(self.pcap_packet_label, False, False, 0)
+        self.pcap_notebook.append_page(timeline, Gtk.Label(label="Timeline"))
+
+        vbox.pack_start(self.pcap_notebook, True, True, 0)
+        return vbox
+
+    def _refresh_pcap_list(self):
+        folder = self.capture_folder_path
+        store = self.pcap_store
+
+        def worker_thread():
+            rows = self.capture_cache.scan(folder)
+            GLib.idle_add(update_gui, rows)
+
+        def update_gui(rows):
+            if self.is_closing or store is not self.pcap_store: return False
+            store.clear()
+            self.pcap_rows = {}
+            for name, path, size, mtime_ns, meta in rows:
+                modified = datetime.fromtimestamp(mtime_ns / 1e9).strftime("%Y-%m-%d %H:%M:%S")
+                self.pcap_rows[path] = store.append([name, f"{size / 1e6:.1f} MB", modified, "", "", "", path])
+                if meta is None:
+                    store.set(self.pcap_rows[path], [5], ["computing..."])
+                    self.capture_cache.request(path, size, mtime_ns, on_metadata)
+                else:
+                    self._set_pcap_row_metadata(path, meta)
+            return False
+
+        def on_metadata(path, meta):
+            # Called on a pool thread
+            def update():
+                if not self.is_closing and store is self.pcap_store:
+                    self._set_pcap_row_metadata(path, meta)
+                return False
+            GLib.idle_add(update)
+
+        threading.Thread(target=worker_thread, daemon=True).start()
+
+    def _set_pcap_row_metadata(self, path, meta):
+        it = self.pcap_rows.get(path)
+        if it is None:
+            return
+        duration = meta.get('duration')
+        packets = meta.get('packets')
+        self.pcap_store.set(it, [3, 4, 5], [
+            "" if duration is None else f"{duration:.1f} s",
+            "" if packets is None else str(packets),
+            meta.get('summary', ""),
+        ])
+
+    def on_analyze_pcap_clicked(self, button):
+        model, it = self.pcap_treeview.get_selection().get_selected()
+        if it is None:
+            return
+        path = model[it][6]
+        self.pcap_analyze_button.set_sensitive(False)
+        self.pcap_progress.set_fraction(0.0)
+        self.pcap_progress.set_text("Analyzing...")
+
+        def set_progress(fraction):
+            def update():
+                if not self.is_closing:
+                    self.pcap_progress.set_fraction(min(1.0, fraction))
+                return False
+            GLib.idle_add(update)
+
+        user_plane = os.path.basename(path).startswith("srs_gtpu_")
+        if user_plane and np is None:
+            self._show_alert("GTP-U analysis needs NumPy.\nInstall it with: pip install numpy",
+                             title="Missing Dependency")
+            self.pcap_analyze_button.set_sensitive(True)
+            self.pcap_progress.set_text("")
+            return
+
+        def worker_thread():
+            try:
+                analyze = analyze_gtpu_capture if user_plane else analyze_capture
+                report = analyze(path, progress=set_progress).format_report()
+            except (OSError, ValueError) as e:
+                report = f"Could not analyze {os.path.basename(path)}: {e}"
+            GLib.idle_add(update_gui, report)
+
+        def update_gui(report):
+            if self.is_closing: return False
+            self.pcap_analyze_button.set_sensitive(True)
+            self.pcap_progress.set_fraction(1.0)
+            self.pcap_progress.set_text(os.path.basename(path))
+            self.pcap_report_view.get_buffer().set_text(report)
+            self.pcap_notebook.set_current_page(0)
+            return False
+
+        threading.Thread(target=worker_thread, daemon=True).start()
+
+    def on_open_pcap_timeline_clicked(self, button):
+        model, it = self.pcap_treeview.get_selection().get_selected()
+        if it is None:
+            return
+        path = model[it][6]
+        self.pcap_timeline_button.set_sensitive(False)
+        self.pcap_progress.set_fraction(0.0)
+        self.pcap_progress.set_text("Indexing...")
+
+        def set_progress(fraction):
+            def update():
+                if not self.is_closing:
+                    self.pcap_progress.set_fraction(min(1.0, fraction))
+                return False
+            GLib.idle_add(update)
+
+        def worker_thread():
+            try:
+                index, error = open_capture_index(path, progress=set_progress), None
+            except (OSError, ValueError) as e:
+                index, error = None, str(e)
+            GLib.idle_add(update_gui, index, error)
+
+        def update_gui(index, error):
+            if self.is_closing: return False
+            self.pcap_timeline_button.set_sensitive(True)
+            self.pcap_progress.set_fraction(1.0)
+            self.pcap_progress.set_text(os.path.basename(path))
+            if index is None:
+                self.pcap_packet_label.set_text(f"Could not index {os.path.basename(path)}: {error}")
+                return False
+            if self.pcap_index:
+                self.pcap_index[1].close()
+            self.pcap_index = (path, index)
+            self.pcap_notebook.set_current_page(1)
+            self._refresh_pcap_timeline()
+            return False
+
+        threading.Thread(target=worker_thread, daemon=True).start()
+
+    def _refresh_pcap_timeline(self):
+        if not self.pcap_index:
+            return
+        path, index = self.pcap_index
+        self.pcap_timeline_store.clear()
+        if not len(index):
+            self.pcap_packet_label.set_text("No NGAP messages in this capture.")
+            return
+
+        origin = index.record(0)[0]
+        try:
+            start_ts = origin + float(self.pcap_time_entry.get_text() or 0)
+            ue_text = self.pcap_ue_entry.get_text().strip()
+            ran_ue_id = int(ue_text) if ue_text else None
+        except ValueError:
+            self.pcap_packet_label.set_text("Time and UE ID must be numbers.")
+            return
+        proc_id = self.pcap_proc_combo.get_active_id()
+
+        # Each filter is a bisect into the index; only the visible window is read
+        if ran_ue_id is not None:
+            rows = index.by_ue(ran_ue_id, start_ts=start_ts)
+            if proc_id:
+                rows = [i for i in rows if index.record(i)[2] == int(proc_id)]
+            rows = rows[:PCAP_TIMELINE_ROWS]
+        elif proc_id:
+            rows = index.by_procedure(int(proc_id), start_ts=start_ts, limit=PCAP_TIMELINE_ROWS)
+        else:
+            first = index.first_at_or_after(start_ts)
+            rows = range(first, min(len(index), first + PCAP_TIMELINE_ROWS))
+
+        for i in rows:
+            ts, offset, proc, pdu_type, ran_id, amf_id = index.record(i)
+            self.pcap_timeline_store.append([
+                f"{ts - origin:.6f}", ngap_procedure_name(proc), NGAP_PDU_TYPES[pdu_type],
+                "" if ran_id is None else str(ran_id), "" if amf_id is None else str(amf_id), str(offset)
+            ])
+        self.pcap_packet_label.set_text(f"{len(self.pcap_timeline_store)} of {len(index)} messages shown.")
+
+    def on_pcap_timeline_row_activated(self, treeview, tree_path, column):
+        if not self.pcap_index:
+            return
+        offset = int(treeview.get_model()[tree_path][5])
+        try:
+            record = read_capture_record(self.pcap_index[1].capture_path, offset)
+        except (OSError, ValueError) as e:
+            self.pcap_packet_label.set_text(f"Could not read message: {e}")
+            return
+        if record is None:
+            self.pcap_packet_label.set_text(f"No packet at offset {offset}.")
+            return
+        ts, linktype, orig_len, data = record
+        lines = [f"Offset {offset}  {datetime.fromtimestamp(ts or 0).strftime('%H:%M:%S.%f')}  {orig_len} bytes"]
+        ip = ip_layer(linktype, data)
+        if ip and ip[0] == IPPROTO_SCTP:
+            for ppid, payload in sctp_data_chunks(data, ip[1]):
+                decoded = decode_ngap(payload) if ppid == NGAP_PPID else None
+                if decoded:
+                    pdu_type, proc, ies = decoded
+                    extra = "  ".join(f"{k}={v}" for k, v in ies.items())
+                    lines.append(f"{ngap_procedure_name(proc)} ({NGAP_PDU_TYPES[pdu_type]})  {extra}")
+        for i in range(0, min(len(data), 256), 16):
+            lines.append(f"{i:04x}  {data[i:i + 16].hex(' ')}")
+        self.pcap_packet_label.set_text("\n".join(lines))
+
 
     def on_ue_binaries(self, _):
         self.content_paned.set_position(self.default_terminal_pane_position)
@@ -1499,7 +7253,7 @@ class SrsRanGuiApp(Gtk.Window):
         for c in box.get_children(): box.remove(c)
         terminal = self.create_terminal_tab("ue_bin", "UE Binaries")
         command = "ls -l ~/srsRAN_Project/build/ue\n"
-        GLib.timeout_add(300, lambda: (terminal.feed_child(command.encode()) or False) if not self.is_closing else False)
+        self._run_simple_command(terminal, command, delay=300)
 
     def on_gnb_config(self, _):
         # 1. Switch to terminal view
@@ -1561,7 +7315,7 @@ class SrsRanGuiApp(Gtk.Window):
         self.content_paned.set_position(self.default_terminal_pane_position)
         terminal = self.create_terminal_tab(f"conf-{filename}", "Conf: " + filename)
         command = f'cat /etc/open5gs/{filename}\n'
-        GLib.timeout_add(300, lambda: (terminal.feed_child(command.encode()) or False) if not self.is_closing else False)
+        self._run_simple_command(terminal, command, delay=300)
 
     def _show_config_view(self, area_box, key_prefix, config_path, config_file, scheduler_id_attr):
         self.content_paned.set_position(self.default_terminal_pane_position)
@@ -1605,6 +7359,7 @@ class SrsRanGuiApp(Gtk.Window):
             terminal = self.create_terminal_tab("core_iperf", "Core iPerf Server")
             self.core_iperf_running = True
             self.core_iperf_start_time = time.time()
+            self.history.record("core_iperf", "start")
             
             # Update Button to Red/Stop
             widget.set_label(f"{STOP_SYMBOL} Stop Speedtest")
@@ -1612,7 +7367,7 @@ class SrsRanGuiApp(Gtk.Window):
             ctx.remove_class("start-button")
             ctx.add_class("stop-button")
 
-            cmd = "iperf3 -s -i 1"
+            cmd = f"iperf3 -s -i 1 --forceflush | tee {CORE_IPERF_LOG}"
             self._send_commands_sequentially(terminal, [cmd], "core_speedtest_scheduler_id")
         else:
             # --- STOP ---
@@ -1626,16 +7381,10 @@ class SrsRanGuiApp(Gtk.Window):
             self.reset_core_iperf_button()
 
     def reset_core_iperf_button(self):
+        if self.core_iperf_running:
+            self._record_iperf_summary("core_iperf", CORE_IPERF_LOG)
         self.core_iperf_running = False
-        def update_ui():
-            if self.is_closing: return
-            if self.core_iperf_button_ref and self.core_iperf_button_ref.get_realized():
-                self.core_iperf_button_ref.set_sensitive(True)
-                ctx = self.core_iperf_button_ref.get_style_context()
-                ctx.remove_class("stop-button")
-                ctx.add_class("start-button")
-                self.core_iperf_button_ref.set_label(f"{PLAY_SYMBOL} Start Speedtest")
-        GLib.idle_add(update_ui)
+        self.state.set("core_iperf_button", "start", force=True)
     # -------------------------------------------------------------------------
     # UTILS & HELPERS
     # -------------------------------------------------------------------------
@@ -1649,6 +7398,7 @@ class SrsRanGuiApp(Gtk.Window):
             page_num = self.terminal_notebook.page_num(frame)
             if page_num != -1:
                 self.terminal_notebook.set_current_page(page_num)
+                self.tab_memory.touch(key)
                 return terminal
             else:
                 self.terminals.pop(key, None)
@@ -1662,18 +7412,18 @@ class SrsRanGuiApp(Gtk.Window):
         header.pack_start(lbl, True, True, 5)
         header.pack_start(btn_close, False, False, 0)
         
-        terminal = Vte.Terminal()
-        terminal.set_scrollback_lines(1000)
-        terminal.spawn_async(Vte.PtyFlags.DEFAULT, os.environ['HOME'], ["/bin/bash"], [], GLib.SpawnFlags.DEFAULT, None, None, -1, None, None)
+        # Pre-spawned shell from the pool when one is ready
+        terminal = self.terminal_pool.acquire()
         
         # --- RESTORED LISTENER: This makes Ctrl+C work ---
-        terminal.connect("child-exited", self.on_process_exited, key)
+        exit_handler = terminal.connect("child-exited", self.on_process_exited, key)
         # -------------------------------------------------
 
         # 3. Graceful Close Logic (The previous fix)
         def close_tab(_):
             # A. Unregister from dictionary immediately
             self.terminals.pop(key, None)
+            self.tab_memory.forget(key)
 
             # B. CASCADE SHUTDOWN
             # If "Core" tab is closed manually, kill dependencies
@@ -1698,14 +7448,25 @@ class SrsRanGuiApp(Gtk.Window):
                     self.tshark_terminal_ref = None
                 elif key == "core_iperf":
                     self.core_iperf_running = False
+                elif key == "grafana":
+                    self.grafana_terminal_ref = None
 
             # C. Define Destruction Logic
-            def do_destroy(*args):
+            def remove_page():
                 if self.terminal_notebook:
                     page = self.terminal_notebook.page_num(frame)
-                    if page != -1: 
+                    if page != -1:
                         self.terminal_notebook.remove_page(page)
                 GLib.idle_add(frame.destroy)
+
+            # Read-only tabs back at their prompt go back to the pool instead of being destroyed
+            if key not in MANAGED_TERMINAL_KEYS and self.terminal_pool.release(terminal):
+                terminal.disconnect(exit_handler)
+                remove_page()
+                return
+
+            def do_destroy(*args):
+                remove_page()
                 return False
 
             # D. Wait for process death before hiding UI
@@ -1738,7 +7499,8 @@ class SrsRanGuiApp(Gtk.Window):
         GLib.idle_add(self.terminal_notebook.set_current_page, new_page_num)
         
         # Store valid reference
-        self.terminals[key] = {'frame': frame, 'terminal': terminal}
+        self.terminals[key] = {'frame': frame, 'terminal': terminal, 'close': lambda: close_tab(None)}
+        self.tab_memory.touch(key)
         
         self.terminal_notebook.show_all()
         return terminal
@@ -1809,12 +7571,17 @@ class SrsRanGuiApp(Gtk.Window):
         back_btn.connect("clicked", lambda w: self._restore_main_view())
         header.pack_start(back_btn, False, False, 10)
         
-        # Webview
-        webview = WebKit2.WebView()
-        webview.load_uri("http://127.0.0.1:3300/") 
+        if self.settings["grafana_enabled"]:
+            # Webview
+            page = WebKit2.WebView()
+            page.load_uri(GRAFANA_URL) 
+        else:
+            page = self.create_metrics_view()
+            page.set_margin_start(10)
+            page.set_margin_end(10)
         
         self.webview_container.pack_start(header, False, False, 0)
-        self.webview_container.pack_start(webview, True, True, 0)
+        self.webview_container.pack_start(page, True, True, 0)
         
         self.content_paned.remove(self.original_content_pane)
         self.content_paned.pack1(self.webview_container, resize=True, shrink=False)
@@ -1852,6 +7619,58 @@ class SrsRanGuiApp(Gtk.Window):
         GLib.idle_add(self.content_paned.set_position, self.default_terminal_pane_position)
         return False
 
+    def _terminal_key_for_page(self, page):
+        for key, info in self.terminals.items():
+            if info['frame'] is page:
+                return key
+        return None
+
+    def on_terminal_page_switched(self, notebook, page, page_num):
+        key = self._terminal_key_for_page(page)
+        if key:
+            self.tab_memory.touch(key)
+
+    def _check_tab_memory(self):
+        # Buffer sizes come from the widgets (GTK thread); RSS is read from /proc in a worker
+        if self.is_closing:
+            self.tab_memory_update_id = None
+            return False
+        if self._tab_memory_measuring:
+            return True
+        tabs = {}
+        for key, info in self.terminals.items():
+            terminal = info.get('terminal')
+            if terminal is None:
+                continue
+            rows = int(terminal.get_vadjustment().get_upper())
+            tabs[key] = (rows * terminal.get_column_count() * VTE_BYTES_PER_CELL,
+                         getattr(terminal, "shell_pid", None))
+        self._tab_memory_measuring = True
+        def worker():
+            usage = TabMemoryManager.measure(tabs)
+            GLib.idle_add(self._apply_tab_memory, usage)
+        threading.Thread(target=worker, daemon=True).start()
+        return True
+
+    def _apply_tab_memory(self, usage):
+        self._tab_memory_measuring = False
+        if self.is_closing:
+            return False
+        # Tabs closed while the worker was measuring are dropped
+        self.tab_memory.usage = {key: cost for key, cost in usage.items() if key in self.terminals}
+        current = self._terminal_key_for_page(
+            self.terminal_notebook.get_nth_page(self.terminal_notebook.get_current_page()))
+        for key in self.tab_memory.victims(MANAGED_TERMINAL_KEYS, keep=(current,)):
+            print(f"Tab memory: closing '{key}' (least recently viewed, {sum(self.tab_memory.usage[key]) / 2**20:.1f} MiB)")
+            self.tab_memory.evictions += 1
+            self.tab_memory.usage.pop(key, None)
+            self.terminals[key]['close']()
+        budgeted, protected = self.tab_memory.totals(MANAGED_TERMINAL_KEYS)
+        self.tab_memory_label.set_text(
+            f"Tabs: {budgeted / 2**20:.0f} / {self.tab_memory.budget / 2**20:.0f} MiB"
+            + (f"  (+{protected / 2**20:.0f} MiB processes)" if protected else ""))
+        return False
+
     def _send_commands_sequentially(self, terminal, commands, scheduler_id_attr, delay=1000, on_complete=None):
         command_queue = list(commands)
         def send_next():
@@ -1879,6 +7698,55 @@ class SrsRanGuiApp(Gtk.Window):
         source_id = GLib.timeout_add(delay, send_next)
         setattr(self, scheduler_id_attr, source_id)
 
+    def create_file_list_view(self, entries, on_activate):
+        """
+        Searchable list of (label, payload) entries; on_activate(payload) runs on
+        click. Rows are TreeView cells rather than widgets, so only visible rows
+        are rendered, and typing refilters the same model in place.
+        """
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        search = Gtk.SearchEntry()
+        search.set_placeholder_text(f"Filter {len(entries)} entries")
+        vbox.pack_start(search, False, False, 0)
+
+        store = Gtk.ListStore(str, int)
+        for i, (label, _) in enumerate(entries):
+            store.append([label, i])
+        index = FuzzyFilterIndex([label for label, _ in entries])
+        visible = [None]    # set of entry indices, None while the query is empty
+        model = store.filter_new()
+        model.set_visible_func(lambda m, it, _: visible[0] is None or m.get_value(it, 1) in visible[0])
+
+        treeview = Gtk.TreeView(model=model)
+        treeview.set_headers_visible(False)
+        treeview.set_enable_search(False)
+        treeview.set_activate_on_single_click(True)
+        column = Gtk.TreeViewColumn("Name", Gtk.CellRendererText(), text=0)
+        column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+        treeview.append_column(column)
+        treeview.set_fixed_height_mode(True)
+        treeview.connect("row-activated", lambda view, path, col: on_activate(entries[model[path][1]][1]))
+
+        def on_search_changed(entry):
+            query = entry.get_text()
+            visible[0] = set(index.matches(query)) if query.strip() else None
+            model.refilter()
+
+        def on_search_activate(entry):
+            # Enter opens the first remaining entry
+            it = model.get_iter_first()
+            if it is not None:
+                on_activate(entries[model.get_value(it, 1)][1])
+
+        search.connect("search-changed", on_search_changed)
+        search.connect("activate", on_search_activate)
+
+        scrolled = Gtk.ScrolledWindow()
+        scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
+        scrolled.add(treeview)
+        vbox.pack_start(scrolled, True, True, 0)
+        return vbox
+
     def _browse_docker_container(self, container_name, current_path, root_path):
         """
         A recursive file browser for Docker containers.
@@ -1928,47 +7796,21 @@ class SrsRanGuiApp(Gtk.Window):
         if error_message:
             vbox.pack_start(Gtk.Label(label=error_message), False, False, 0)
         else:
-            listbox = Gtk.ListBox()
-            listbox.set_selection_mode(Gtk.SelectionMode.NONE)
-
-            # Separate folders and files for cleaner sorting
+            # Folders first, then files; payload is (is_folder, path)
             folders = [x for x in items if x.endswith('/')]
             files = [x for x in items if not x.endswith('/')]
-            
-            # --- RENDER FOLDERS ---
-            for folder in folders:
-                row = Gtk.ListBoxRow()
-                btn = Gtk.Button(label=f"📂 {folder}") # Add folder icon
-                if isinstance(btn.get_child(), Gtk.Label):
-                    btn.get_child().set_xalign(0.0)
-                btn.set_relief(Gtk.ReliefStyle.NONE)
-                
-                # Click handler: Go deeper into this directory
-                new_path = os.path.join(current_path, folder)
-                btn.connect("clicked", lambda w, p=new_path: self._browse_docker_container(container_name, p, root_path))
-                
-                row.add(btn)
-                listbox.add(row)
-
-            # --- RENDER FILES ---
-            for f in files:
-                row = Gtk.ListBoxRow()
-                btn = Gtk.Button(label=f"📄 {f}") # Add file icon
-                if isinstance(btn.get_child(), Gtk.Label):
-                    btn.get_child().set_xalign(0.0)
-                btn.set_relief(Gtk.ReliefStyle.NONE)
-                
-                # Click handler: View file content
-                full_file_path = os.path.join(current_path, f)
-                btn.connect("clicked", self.on_docker_file_clicked, container_name, full_file_path, "core")
-                
-                row.add(btn)
-                listbox.add(row)
+            entries = ([(f"📂 {folder}", (True, os.path.join(current_path, folder))) for folder in folders] +
+                       [(f"📄 {f}", (False, os.path.join(current_path, f))) for f in files])
 
-            scrolled = Gtk.ScrolledWindow()
-            scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
-            scrolled.add(listbox)
-            vbox.pack_start(scrolled, True, True, 0)
+            def on_activate(payload):
+                is_folder, path = payload
+                if is_folder:
+                    # Go deeper into this directory
+                    self._browse_docker_container(container_name, path, root_path)
+                else:
+                    self.on_docker_file_clicked(None, container_name, path, "core")
+
+            vbox.pack_start(self.create_file_list_view(entries, on_activate), True, True, 0)
 
         box.pack_start(vbox, True, True, 0)
         box.show_all()
@@ -1979,7 +7821,7 @@ class SrsRanGuiApp(Gtk.Window):
 
     def _display_docker_file_list_menu(self, area_box, container_name, directory, extension, key_prefix):
         """
-        Lists files residing INSIDE a Docker container as buttons.
+        Lists files residing INSIDE a Docker container in a searchable list.
         """
         # 1. Clear the content area
         for child in area_box.get_children():
@@ -2008,42 +7850,18 @@ class SrsRanGuiApp(Gtk.Window):
         except subprocess.CalledProcessError:
             error_message = f"Error: Could not list files.\nIs container '{container_name}' running?"
 
-        # 3. Create the ListBox
-        listbox = Gtk.ListBox()
-        listbox.set_selection_mode(Gtk.SelectionMode.NONE)
-
+        # 3. Create the list (one model row per file, no per-file widgets)
         if error_message:
-            row = Gtk.ListBoxRow()
-            row.add(Gtk.Label(label=error_message))
-            listbox.add(row)
+            file_list = Gtk.Label(label=error_message)
         elif not files:
-            row = Gtk.ListBoxRow()
-            row.add(Gtk.Label(label=f"No files found in {directory} inside {container_name}"))
-            listbox.add(row)
+            file_list = Gtk.Label(label=f"No files found in {directory} inside {container_name}")
         else:
-            for f in files:
-                row = Gtk.ListBoxRow()
-                btn = Gtk.Button(label=f)
-                if isinstance(btn.get_child(), Gtk.Label):
-                    btn.get_child().set_xalign(0.0)
-                btn.set_relief(Gtk.ReliefStyle.NONE)
-                
-                # Connect click to the Docker file opener
-                # We pass the full path inside the container
-                full_path_in_container = f"{directory}/{f}"
-                # Remove double slashes just in case
-                full_path_in_container = full_path_in_container.replace('//', '/')
-                
-                btn.connect("clicked", self.on_docker_file_clicked, container_name, full_path_in_container, key_prefix)
-                row.add(btn)
-                listbox.add(row)
+            # We pass the full path inside the container; remove double slashes just in case
+            entries = [(f, f"{directory}/{f}".replace('//', '/')) for f in files]
+            file_list = self.create_file_list_view(
+                entries, lambda path: self.on_docker_file_clicked(None, container_name, path, key_prefix))
 
-        # 4. Wrap in ScrolledWindow
-        scrolled = Gtk.ScrolledWindow()
-        scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
-        scrolled.add(listbox)
-        
-        # 5. Add title and list
+        # 4. Add title and list
         vbox_header = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=5)
         lbl_title = Gtk.Label(label=f"Container: {container_name}")
         lbl_title.get_style_context().add_class("header-title")
@@ -2053,7 +7871,7 @@ class SrsRanGuiApp(Gtk.Window):
         vbox_header.pack_start(lbl_path, False, False, 0)
         
         area_box.pack_start(vbox_header, False, False, 10)
-        area_box.pack_start(scrolled, True, True, 0)
+        area_box.pack_start(file_list, True, True, 0)
         area_box.show_all()
         
         allocation = self.content_paned.get_allocation()
@@ -2071,10 +7889,10 @@ class SrsRanGuiApp(Gtk.Window):
         # The command to run inside the terminal tab
         command = f"sudo docker exec {container_name} cat {full_path}\n"
         
-        GLib.timeout_add(300, lambda: (terminal.feed_child(command.encode()) or False) if not self.is_closing else False)
+        self._run_simple_command(terminal, command, delay=300)
     def _display_file_list_menu(self, area_box, directory, extension, key_prefix):
         """
-        Generic function to list files in a directory as buttons.
+        Generic function to list files in a directory in a searchable list.
         """
         # 1. Clear the content area (gnb_area, ue_area, etc.)
         for child in area_box.get_children():
@@ -2083,57 +7901,59 @@ class SrsRanGuiApp(Gtk.Window):
         # 2. Expand the user path (e.g., turn '~' into '/home/student')
         full_dir_path = os.path.expanduser(directory)
         
-        # 3. List files
-        if os.path.exists(full_dir_path):
-            files = sorted([f for f in os.listdir(full_dir_path) if f.endswith(extension)])
-        else:
-            files = []
-            
-        # 4. Create the ListBox for buttons
-        listbox = Gtk.ListBox()
-        listbox.set_selection_mode(Gtk.SelectionMode.NONE)
-
-        if not files:
-            row = Gtk.ListBoxRow()
-            lbl = Gtk.Label(label=f"No {extension} files found in {full_dir_path}")
-            lbl.set_margin_top(10)
-            lbl.set_margin_bottom(10)
-            row.add(lbl)
-            listbox.add(row)
-        else:
-            for f in files:
-                row = Gtk.ListBoxRow()
-                # Create a button for the file
-                btn = Gtk.Button(label=f)
-                if isinstance(btn.get_child(), Gtk.Label):
-                    btn.get_child().set_xalign(0.0)
-                btn.set_relief(Gtk.ReliefStyle.NONE) 
-                
-                # Connect the click event
-                full_file_path = os.path.join(full_dir_path, f)
-                btn.connect("clicked", self.on_generic_file_clicked, full_file_path, key_prefix)
-                
-                row.add(btn)
-                listbox.add(row)
-
-        # 5. Wrap in ScrolledWindow
-        scrolled = Gtk.ScrolledWindow()
-        scrolled.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
-        scrolled.add(listbox)
-        
-        # 6. Add title and list to the area
+        # 3. Add title and a holder the listing is rendered into once it is ready
         lbl_dir = Gtk.Label(label=f"Directory: {full_dir_path}")
         lbl_dir.get_style_context().add_class("header-title")
         lbl_dir.set_margin_bottom(10)
+        holder = Gtk.Box(orientation=Gtk.Orientation.VERTICAL)
         
         area_box.pack_start(lbl_dir, False, False, 0)
-        area_box.pack_start(scrolled, True, True, 0)
+        area_box.pack_start(holder, True, True, 0)
+        self._fill_file_list(holder, full_dir_path, extension, key_prefix)
         area_box.show_all()
         
         # Ensure the view panel is set to show this content (hiding terminal temporarily)
         allocation = self.content_paned.get_allocation()
         self.content_paned.set_position(allocation.height)
 
+    def _fill_file_list(self, holder, full_dir_path, extension, key_prefix):
+        """
+        Renders the listing of full_dir_path into holder: straight from the
+        directory cache when it is warm, otherwise after the background scan.
+        """
+        def on_ready(dir_entries):
+            # The user may have moved on to another view while the scan ran
+            if self.is_closing or holder.get_parent() is None:
+                return
+            for child in holder.get_children():
+                holder.remove(child)
+            files = [name for name, is_dir in dir_entries or [] if not is_dir and name.endswith(extension)]
+            # One model row per file, no per-file widgets
+            if not files:
+                file_list = Gtk.Label(label=f"No {extension} files found in {full_dir_path}")
+                file_list.set_margin_top(10)
+                file_list.set_margin_bottom(10)
+            else:
+                entries = [(f, os.path.join(full_dir_path, f)) for f in files]
+                file_list = self.create_file_list_view(
+                    entries, lambda path: self.on_generic_file_clicked(None, path, key_prefix))
+            holder.pack_start(file_list, True, True, 0)
+            holder.show_all()
+
+        shown = [view for view in self.displayed_file_lists.get(full_dir_path, [])
+                 if view[0] is not holder and view[0].get_parent() is not None]
+        self.displayed_file_lists[full_dir_path] = shown + [(holder, extension, key_prefix)]
+        # A listing already on screen stays up until the rescan replaces it
+        if not self.dir_listings.request(full_dir_path, on_ready) and not holder.get_children():
+            holder.pack_start(Gtk.Label(label="Loading..."), False, False, 0)
+            holder.show_all()
+
+    def _on_listed_directory_changed(self, full_dir_path):
+        """Re-scans a cached directory that changed, if its listing is still on screen."""
+        for holder, extension, key_prefix in self.displayed_file_lists.pop(full_dir_path, []):
+            if holder.get_parent() is not None:
+                self._fill_file_list(holder, full_dir_path, extension, key_prefix)
+
     def on_generic_file_clicked(self, button, full_file_path, key_prefix):
         """
         Opens a terminal tab and 'cats' the file when a button is clicked.
@@ -2151,11 +7971,13 @@ class SrsRanGuiApp(Gtk.Window):
         command = f"cat {full_file_path}\n"
         
         # 5. Execute
-        GLib.timeout_add(300, lambda: (terminal.feed_child(command.encode()) or False) if not self.is_closing else False)
+        self._run_simple_command(terminal, command, delay=300)
         
     def on_delete_event(self, widget, event):
-        self.is_closing = True
-        return self.on_app_quit()
+        self.on_app_quit()
+        # Keep the (hidden) terminals alive: destroying them would SIGHUP the
+        # processes the shutdown coordinator is still stopping
+        return True
 
     def on_app_quit(self, *args):
         if self.is_closing and hasattr(self, '_quit_done'):
@@ -2164,13 +7986,16 @@ class SrsRanGuiApp(Gtk.Window):
         
         self.is_closing = True
         self._quit_done = True
+        self.state.close()
+        self.dir_listings.close()
         
         # 1. Stop all schedulers/timers
         schedulers = [
             'process_watchdog_id', 'gnb_command_scheduler_id', 'ue_command_scheduler_id',
             'core_monitor_scheduler_id', 'gnb_config_scheduler_id', 'ue_config_scheduler_id',
             'core_scheduler_id', 'tshark_scheduler_id','core_logs_scheduler_id', 'core_speedtest_scheduler_id',
-            'ue_speedtest_scheduler_id', 'ue_logs_scheduler_id','gnb_logs_scheduler_id', 'grafana_scheduler_id'
+            'ue_speedtest_scheduler_id', 'ue_logs_scheduler_id','gnb_logs_scheduler_id', 'grafana_scheduler_id',
+            'ngap_live_update_id', 'metrics_update_id', 'tab_memory_update_id'
         ]
         
         for sched_attr in schedulers:
@@ -2183,46 +8008,84 @@ class SrsRanGuiApp(Gtk.Window):
             except Exception:
                 pass
 
-        # 2. Stop UE (Check if running AND reference exists)
-        if self.ue_running and self.ue_terminal_ref:
-            try:
-                self.ue_terminal_ref.feed_child(b'\x03') # Send Ctrl+C
-            except Exception:
-                pass
-            time.sleep(0.5) 
+        # 2. Stop the processes of the managed tabs (UE -> gNB -> core/Grafana -> tshark)
+        # off the GTK thread; the window is hidden rather than frozen meanwhile
+        stages = self._collect_shutdown_stages()
+        try:
+            self.hide()
+        except Exception:
+            pass
 
-        # 3. Stop gNB
-        if self.gnb_running and self.gnb_terminal_ref:
-            try:
-                self.gnb_terminal_ref.feed_child(b'\x03')
-            except Exception:
-                pass
-            time.sleep(0.5)
-        
-        # 3. Stop Grafana
-        if self.grafana_terminal_ref:
-            try:
-                self.grafana_terminal_ref.feed_child(b'\x03')
-            except Exception:
-                pass
-            time.sleep(0.5)
+        if self.scale_run:
+            self.scale_run.stop()
+        if self.latency_probe:
+            self._stop_latency_probe()
+        # The capture is saved as a Stop would save it, once tshark (the last stage) has exited
+        finalize_capture = self._take_capture_finalizer(archive=False) if self.tshark_running else None
+        if self.capture_indexer:
+            self.capture_indexer.stop()
+        self.gnb_metrics_receiver.stop()
+        if self.metrics_exporter:
+            self.metrics_exporter.stop()
+
+        def interrupt(name):
+            GLib.idle_add(self._interrupt_tab, name)
+
+        def worker():
+            report, elapsed = ShutdownCoordinator(grace=SHUTDOWN_GRACE, interrupt=interrupt).run(stages)
+            if finalize_capture:
+                finalize_capture()
+            GLib.idle_add(self._finish_quit, report, elapsed)
+        threading.Thread(target=worker, daemon=True).start()
+        return False
 
-        # 4. Stop Core
-        if self.core_running and self.core_terminal_ref:
-            try:
-                self.core_terminal_ref.feed_child(b'\x03')
-            except Exception:
-                pass
-        
-        # 5. Stop Tshark (This was the cause of your crash)
-        # We added the check 'if self.tshark_terminal_ref:' to prevent the AttributeError
-        if self.tshark_running and self.tshark_terminal_ref:
+    def _managed_terminal(self, name):
+        return getattr(self, f"{name}_terminal_ref", None) or self.terminals.get(name, {}).get('terminal')
+
+    def _interrupt_tab(self, name):
+        # Ctrl+C typed into the tab: the tty delivers SIGINT even to a job started with sudo
+        terminal = self._managed_terminal(name)
+        if terminal:
             try:
-                self.tshark_terminal_ref.feed_child(b'\x03')
-            except Exception:
-                pass
-        
-        # 6. Quit GTK
+                terminal.feed_child(b'\x03')
+            except Exception as e:
+                print(f"Shutdown: cannot interrupt {name}: {e}")
+        return False
+
+    def _collect_shutdown_stages(self):
+        # Runs on the GTK thread: the foreground job of each tab is read from its pty
+        stages = []
+        for names in SHUTDOWN_ORDER:
+            stage = []
+            for name in names:
+                terminal = self._managed_terminal(name)
+                if not terminal:
+                    continue
+                try:
+                    pgid = os.tcgetpgrp(terminal.get_pty().get_fd())
+                except (AttributeError, OSError):
+                    continue
+                pids = foreground_job_pids(pgid)
+                if pids:
+                    stage.append((name, pgid, pids))
+            if stage:
+                stages.append(stage)
+        return stages
+
+    def _finish_quit(self, report, elapsed):
+        for name, outcome, seconds in report:
+            print(f"Shutdown: {name}: {outcome} after {seconds:.2f}s")
+        print(f"Shutdown: done in {elapsed:.2f}s")
+
+        # 3. Flush pending history records and cached capture metadata
+        summary = ", ".join(f"{name}={outcome}" for name, outcome, _ in report)
+        self.history.record("app", "quit", value=round(elapsed, 3), detail=summary or None)
+        self.history.close()
+        self.capture_cache.close()
+        self.capture_archiver.close()
+        self.output_logs.close()
+
+        # 4. Quit GTK
         try:
             Gtk.main_quit()
         except Exception:
@@ -2232,7 +8095,35 @@ class SrsRanGuiApp(Gtk.Window):
         sys.exit(0)
 
 if __name__ == "__main__":
+    if "--bench-ngap" in sys.argv:
+        idx = sys.argv.index("--bench-ngap")
+        size_mb = float(sys.argv[idx + 1]) if len(sys.argv) > idx + 1 else 200
+        benchmark_ngap_analyzer(size_mb)
+        sys.exit(0)
+    if "--fake-gnb-metrics" in sys.argv:
+        idx = sys.argv.index("--fake-gnb-metrics")
+        port = int(sys.argv[idx + 1]) if len(sys.argv) > idx + 1 and sys.argv[idx + 1].isdigit() else GNB_METRICS_PORT
+        run_fake_gnb_metrics(port, legacy="--legacy" in sys.argv)
+        sys.exit(0)
+    if "--bench-zstd" in sys.argv:
+        idx = sys.argv.index("--bench-zstd")
+        size_mb = float(sys.argv[idx + 1]) if len(sys.argv) > idx + 1 else 200
+        benchmark_zstd(size_mb)
+        sys.exit(0)
+
     app = SrsRanGuiApp()
+    if "--bench-menu" in sys.argv:
+        idx = sys.argv.index("--bench-menu")
+        rounds = int(sys.argv[idx + 1]) if len(sys.argv) > idx + 1 and sys.argv[idx + 1].isdigit() else 50
+        GLib.idle_add(app.benchmark_menu_switching, rounds)
+    if "--bench-terminals" in sys.argv:
+        idx = sys.argv.index("--bench-terminals")
+        rounds = int(sys.argv[idx + 1]) if len(sys.argv) > idx + 1 and sys.argv[idx + 1].isdigit() else 20
+        GLib.idle_add(app.benchmark_terminal_pool, rounds)
+    if "--metrics-port" in sys.argv:
+        idx = sys.argv.index("--metrics-port")
+        port = int(sys.argv[idx + 1]) if len(sys.argv) > idx + 1 and sys.argv[idx + 1].isdigit() else METRICS_EXPORTER_PORT
+        app.start_metrics_exporter(port)
     app.connect("delete-event", app.on_delete_event)
     app.connect("destroy", app.on_app_quit)
     
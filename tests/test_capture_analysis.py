@@ -0,0 +1,86 @@
+import struct
+
+import pytest
+
+
+# InitialContextSetupRequest: AMF-UE-NGAP-ID 258, RAN-UE-NGAP-ID 7
+ICS_REQUEST = bytes.fromhex("000e0010000002000a0003200102005500020007")
+# UEContextReleaseRequest: AMF-UE-NGAP-ID 5, RAN-UE-NGAP-ID 256, cause radioNetwork/user-inactivity
+RELEASE_REQUEST = bytes.fromhex("002a0016000003000a0002000500550003400100000f00020500")
+
+
+def write_pcap(gui, path, packets):
+    """Classic pcap (LINUX_SLL / IPv4 / SCTP); each packet is a list of (ppid, payload) DATA chunks."""
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, 65535, gui.LINKTYPE_LINUX_SLL))
+        for n, chunks in enumerate(packets):
+            sctp = struct.pack('!HHII', 38412, 38412, 0, 0)
+            for tsn, (ppid, payload) in enumerate(chunks):
+                chunk_len = 16 + len(payload)
+                sctp += (struct.pack('!BBHIHHI', 0, 0x03, chunk_len, tsn, 0, 0, ppid) + payload
+                         + b'\x00' * (-chunk_len % 4))
+            ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(sctp), 0, 0, 64, gui.IPPROTO_SCTP, 0,
+                             bytes([10, 53, 1, 1]), bytes([10, 53, 1, 2])) + sctp
+            sll = struct.pack('!HHH8sH', 0, 772, 0, b'\x00' * 8, 0x0800) + ip
+            f.write(struct.pack('<IIII', 1_700_000_000 + n, 0, len(sll), len(sll)) + sll)
+
+
+def test_decode_fixed_pdus(gui):
+    assert gui.decode_ngap(ICS_REQUEST) == (0, 14, {'amf_ue_id': 258, 'ran_ue_id': 7})
+    assert gui.decode_ngap(RELEASE_REQUEST) == (
+        0, 42, {'amf_ue_id': 5, 'ran_ue_id': 256, 'cause': "radioNetwork/user-inactivity"})
+    assert gui.build_ngap_pdu(0, 14, [(gui.NGAP_IE_AMF_UE_ID, bytes([0x20, 1, 2])),
+                                      (gui.NGAP_IE_RAN_UE_ID, bytes([0, 7]))]) == ICS_REQUEST
+
+
+def test_decode_rejects_malformed(gui):
+    assert gui.decode_ngap(b'') is None
+    assert gui.decode_ngap(b'\x80\x0e\x00\x00') is None          # extension bit set
+    assert gui.decode_ngap(b'\x60\x0e\x00\x00') is None          # pdu_type 3
+    # Truncated IE list: header decodes, IEs that do not fit are skipped
+    assert gui.decode_ngap(ICS_REQUEST[:12]) == (0, 14, {})
+
+
+@pytest.mark.parametrize("value, expected", [
+    (b'\x05\x00', "radioNetwork/user-inactivity"),
+    (b'\x48\x00', "nas/deregister"),
+    (b'\x8a', "misc/unspecified"),
+    (b'\x10\x00', "radioNetwork/extension"),
+    (b'', "unknown"),
+])
+def test_decode_cause(gui, value, expected):
+    assert gui.decode_ngap_cause(value) == expected
+
+
+def test_packet_with_undecodable_chunk_counts_once(gui, tmp_path):
+    path = str(tmp_path / "multi.pcap")
+    write_pcap(gui, path, [
+        [(gui.NGAP_PPID, ICS_REQUEST), (gui.NGAP_PPID, b'\x80\x00\x00\x00')],
+        [(gui.NGAP_PPID, b'\x80\x00\x00\x00')],
+    ])
+    with open(path, 'rb') as f:
+        messages = list(gui.iter_ngap_messages(gui.PcapRecordParser(), f.read()))
+    assert [m[3] for m in messages] == [(0, 14, {'amf_ue_id': 258, 'ran_ue_id': 7}), None]
+    assert messages[0][0] != messages[1][0]
+
+    analyzer = gui.analyze_capture(path)
+    assert analyzer.packets == 2
+    assert analyzer.ngap_messages == 1
+    assert analyzer.counts == {(14, 0): 1}
+
+
+def test_synthetic_capture_summary(gui, tmp_path):
+    path = str(tmp_path / "synthetic.pcap")
+    n_ues = 20
+    packets = gui.write_synthetic_ngap_pcap(path, n_ues)
+    analyzer = gui.analyze_capture(path)
+
+    assert analyzer.packets == packets
+    assert analyzer.counts[(15, 0)] == n_ues          # InitialUEMessage
+    assert analyzer.counts[(29, 1)] == n_ues          # PDUSessionResourceSetupResponse
+    assert analyzer.causes == {(42, "misc/unspecified"): n_ues // 10}
+    timings = {name: hist.percentiles(50)[0] / 1e3 for name, hist in analyzer.timings.items()}
+    assert analyzer.timings["Registration"].total == n_ues
+    assert timings["NG Setup"] == pytest.approx(4.0, rel=0.01)
+    assert timings["Registration"] == pytest.approx(9.0, rel=0.01)
+    assert timings["PDU Session Setup"] == pytest.approx(4.0, rel=0.01)
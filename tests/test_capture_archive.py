@@ -0,0 +1,110 @@
+import errno
+import os
+
+import pytest
+
+
+@pytest.fixture
+def zstd(gui):
+    if not gui.zstd_available():
+        pytest.skip("needs python3-zstandard or the zstd tool")
+
+
+def write_capture(gui, path, n_ues=5):
+    gui.write_synthetic_ngap_pcap(str(path), n_ues)
+    return path.read_bytes()
+
+
+def decompressed(gui, path):
+    with open(path, 'rb') as raw, gui.open_zstd_reader(raw) as reader:
+        return b''.join(iter(lambda: reader.read(1 << 20), b''))
+
+
+def test_compress_replaces_the_capture_and_its_index(gui, tmp_path, zstd):
+    path = tmp_path / "a.pcap"
+    data = write_capture(gui, path)
+    gui.open_capture_index(str(path)).close()
+    os.utime(path, ns=(10**18, 10**18))
+
+    dest, size_in, size_out, _, deduplicated = gui.compress_capture(str(path))
+    assert dest == str(path) + gui.ZSTD_SUFFIX and not deduplicated
+    assert (size_in, size_out) == (len(data), os.path.getsize(dest))
+    assert decompressed(gui, dest) == data
+    assert os.stat(dest).st_mtime_ns == 10**18
+    assert sorted(os.listdir(tmp_path)) == ["a.pcap.zst"]
+
+
+def test_identical_captures_share_one_file(gui, tmp_path, zstd):
+    archive = gui.CaptureArchiver(str(tmp_path / "manifest.json"), workers=1)
+    try:
+        write_capture(gui, tmp_path / "a.pcap")
+        write_capture(gui, tmp_path / "b.pcap")
+        first = gui.compress_capture(str(tmp_path / "a.pcap"), archive=archive)[0]
+        second, _, _, _, deduplicated = gui.compress_capture(str(tmp_path / "b.pcap"), archive=archive)
+        assert deduplicated
+        assert os.path.samefile(first, second)
+        assert not os.path.exists(second + ".tmp") and not os.path.exists(second + ".link")
+    finally:
+        archive.close()
+
+
+def test_failed_hardlink_keeps_the_compressed_copy(gui, tmp_path, zstd, monkeypatch):
+    archive = gui.CaptureArchiver(str(tmp_path / "manifest.json"), workers=1)
+    try:
+        data = write_capture(gui, tmp_path / "a.pcap")
+        write_capture(gui, tmp_path / "b.pcap")
+        first = gui.compress_capture(str(tmp_path / "a.pcap"), archive=archive)[0]
+
+        def link(src, dst):
+            raise OSError(errno.EXDEV, "Invalid cross-device link")
+        monkeypatch.setattr(gui.os, "link", link)
+        calls = []
+        compress = gui.compress_capture
+        monkeypatch.setattr(gui, "compress_capture", lambda *a: calls.append(a) or compress(*a))
+
+        second, _, _, _, deduplicated = gui.compress_capture(str(tmp_path / "b.pcap"), gui.ZSTD_LEVEL, archive)
+        # The copy already compressed is published; the capture is not compressed a second time
+        assert len(calls) == 1 and not deduplicated
+        assert not os.path.samefile(first, second)
+        assert decompressed(gui, second) == data
+        assert sorted(os.listdir(tmp_path)) == ["a.pcap.zst", "b.pcap.zst", "manifest.json"]
+    finally:
+        archive.close()
+
+
+def test_capture_removed_during_compression_is_not_published(gui, tmp_path, zstd, monkeypatch):
+    path = tmp_path / "a.pcap"
+    write_capture(gui, path)
+    utime = os.utime
+
+    def remove_source_then_utime(target, *args, **kwargs):
+        # Ring retention drops the segment while its compressed copy is being finished
+        os.remove(path)
+        return utime(target, *args, **kwargs)
+    monkeypatch.setattr(gui.os, "utime", remove_source_then_utime)
+    with pytest.raises(FileNotFoundError):
+        gui.compress_capture(str(path))
+    assert os.listdir(tmp_path) == []
+
+
+def test_timeline_opens_a_compressed_capture(gui, app_home, zstd):
+    path = app_home / "a.pcap"
+    write_capture(gui, path, n_ues=10)
+    expected = gui.open_capture_index(str(path))
+    rows = [expected.record(i) for i in range(len(expected))]
+    expected.close()
+    dest = gui.compress_capture(str(path))[0]
+
+    index = gui.open_capture_index(dest)
+    try:
+        assert [index.record(i) for i in range(len(index))] == rows
+        assert index.capture_path != dest and os.path.dirname(index.capture_path) == gui.get_timeline_cache_dir()
+        ts, offset = rows[-1][:2]
+        assert gui.read_capture_record(index.capture_path, offset)[0] == ts
+        cached = os.stat(index.capture_path).st_mtime_ns
+    finally:
+        index.close()
+
+    # Reopening reuses the decompressed copy
+    gui.open_capture_index(dest).close()
+    assert os.stat(index.capture_path).st_mtime_ns == cached
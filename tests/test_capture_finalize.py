@@ -0,0 +1,101 @@
+import errno
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def fake_tshark(tmp_path):
+    """Starts a process whose comm is 'tshark' holding the given file open for writing."""
+    binary = tmp_path / "tshark"
+    shutil.copy(shutil.which("sleep"), binary)
+    procs = []
+
+    def start(path):
+        out = open(path, "ab")
+        proc = subprocess.Popen([str(binary), "30"], stdout=out)
+        out.close()
+        procs.append(proc)
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            with open(f"/proc/{proc.pid}/comm") as f:
+                if f.read().strip() == "tshark":
+                    break
+            time.sleep(0.01)
+        return proc
+    yield start
+    for proc in procs:
+        proc.kill()
+        proc.wait()
+
+
+def test_open_capture_is_detected(gui, tmp_path, fake_tshark):
+    capture = tmp_path / "capture.pcapng"
+    proc = fake_tshark(capture)
+    assert gui.capture_file_in_use(str(capture))
+    assert gui.capture_file_in_use(str(tmp_path))
+    assert not gui.capture_file_in_use(str(tmp_path / "other.pcapng"))
+    proc.kill()
+    proc.wait()
+    assert gui.wait_for_capture_closed(str(capture), timeout=2)
+
+
+def test_unreadable_fd_table_counts_as_open(gui, tmp_path, fake_tshark, monkeypatch):
+    # A non-root GUI cannot list the fds of a tshark started under sudo
+    capture = tmp_path / "capture.pcapng"
+    proc = fake_tshark(tmp_path / "elsewhere.pcapng")
+    real_listdir = os.listdir
+
+    def listdir(path):
+        if str(path).endswith("/fd"):
+            raise PermissionError(errno.EACCES, "Permission denied", path)
+        return real_listdir(path)
+    monkeypatch.setattr(gui.os, "listdir", listdir)
+
+    assert gui.capture_file_in_use(str(capture))
+    assert not gui.wait_for_capture_closed(str(capture), timeout=0.3)
+    proc.kill()
+    proc.wait()
+    started = time.monotonic()
+    assert gui.wait_for_capture_closed(str(capture), timeout=2)
+    assert time.monotonic() - started < 1
+
+
+def test_finalize_renames_on_the_same_filesystem(gui, tmp_path):
+    src, dst = tmp_path / "a.pcapng", tmp_path / "b.pcapng"
+    src.write_bytes(b"x" * 1000)
+    assert gui.finalize_capture_file(str(src), str(dst)) == "rename"
+    assert dst.read_bytes() == b"x" * 1000 and not src.exists()
+
+
+def test_finalize_copies_across_filesystems(gui, tmp_path, monkeypatch):
+    src, dst = tmp_path / "a.pcapng", tmp_path / "b.pcapng"
+    data = os.urandom(300_000)
+    src.write_bytes(data)
+
+    def rename(a, b):
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+    monkeypatch.setattr(gui.os, "rename", rename)
+    progress = []
+    assert gui.finalize_capture_file(str(src), str(dst), progress=progress.append) == "copy"
+    assert dst.read_bytes() == data and not src.exists()
+    assert progress[-1] == 1.0
+    assert not os.path.exists(str(dst) + ".part")
+
+
+def test_ring_finish_flags_a_segment_that_may_still_be_open(gui, tmp_path, fake_tshark):
+    staging, dest = tmp_path / "staging", tmp_path / "captures"
+    staging.mkdir()
+    dest.mkdir()
+    for i in (1, 2):
+        (staging / f"ring_{i:05d}_20240101120000.pcapng").write_bytes(b"x")
+    fake_tshark(staging / "ring_00002_20240101120000.pcapng")
+    done = threading.Event()
+    mover = gui.RingCaptureMover(str(staging), str(dest), "ring")
+    mover.finish(on_done=lambda moved: done.set(), timeout=0.3)
+    assert done.wait(10)
+    assert mover.still_open == {str(dest / "ring_00002_20240101120000.pcapng")}
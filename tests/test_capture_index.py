@@ -0,0 +1,62 @@
+import os
+
+
+def test_capture_index_lookups(gui, tmp_path):
+    path = str(tmp_path / "indexed.pcap")
+    gui.write_synthetic_ngap_pcap(path, 30)
+    index = gui.open_capture_index(path)
+    try:
+        assert len(index) == gui.analyze_capture(path).ngap_messages
+        refs = index.by_ue(3)
+        assert refs and all(index.record(i)[4] == 3 for i in refs)
+        setups = index.by_procedure(21)
+        assert [index.record(i)[3] for i in setups] == [0, 1]
+        ts = index.record(refs[0])[0]
+        assert index.record(index.first_at_or_after(ts))[0] == ts
+        assert gui.CaptureIndex.is_current(gui.capture_index_path(path), path)
+    finally:
+        index.close()
+
+
+def test_lookups_start_at_a_time_and_respect_limits(gui, tmp_path):
+    path = str(tmp_path / "indexed.pcap")
+    gui.write_synthetic_ngap_pcap(path, 30)
+    index = gui.open_capture_index(path)
+    try:
+        refs = index.by_procedure(15)
+        assert len(refs) == 30
+        start = index.record(refs[10])[0]
+        assert index.by_procedure(15, start_ts=start, limit=5) == refs[10:15]
+        assert index.by_ue(10**6) == []
+    finally:
+        index.close()
+
+
+def test_records_point_at_their_packets(gui, tmp_path):
+    path = str(tmp_path / "indexed.pcap")
+    gui.write_synthetic_ngap_pcap(path, 5)
+    index = gui.open_capture_index(path)
+    try:
+        for i in range(len(index)):
+            ts, offset, proc, pdu_type, ran, amf = index.record(i)
+            rec_ts, linktype, _, data = gui.read_capture_record(path, offset)
+            assert rec_ts == ts
+            ip = gui.ip_layer(linktype, data)
+            (ppid, payload), = [c for c in gui.sctp_data_chunks(data, ip[1]) if c[0] == gui.NGAP_PPID]
+            assert gui.decode_ngap(payload)[:2] == (pdu_type, proc)
+    finally:
+        index.close()
+
+
+def test_stale_index_is_rebuilt(gui, tmp_path):
+    path = str(tmp_path / "indexed.pcap")
+    gui.write_synthetic_ngap_pcap(path, 5)
+    gui.open_capture_index(path).close()
+    gui.write_synthetic_ngap_pcap(path, 8)
+    os.utime(path, ns=(1, 1))
+    assert not gui.CaptureIndex.is_current(gui.capture_index_path(path), path)
+    index = gui.open_capture_index(path)
+    try:
+        assert len(index.by_procedure(15)) == 8
+    finally:
+        index.close()
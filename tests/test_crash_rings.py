@@ -0,0 +1,57 @@
+import json
+import os
+import random
+
+
+def test_byte_ring_matches_the_tail_of_everything_written(gui):
+    rng = random.Random(3)
+    ring, written = gui.ByteRing(1000), b""
+    assert ring.snapshot() == b""
+    for _ in range(300):
+        chunk = bytes(rng.randrange(256) for _ in range(rng.choice((0, 1, 7, 333, 999, 1000, 2500))))
+        ring.write(chunk)
+        written += chunk
+        assert ring.snapshot() == written[-1000:]
+
+
+def test_byte_ring_edges(gui):
+    ring = gui.ByteRing(8)
+    ring.write(b"abcdefgh")
+    # Exactly full: the write position wrapped to the start
+    assert ring.snapshot() == b"abcdefgh"
+    ring.write(b"ij")
+    assert ring.snapshot() == b"cdefghij"
+    ring.write(memoryview(b"0123456789abc"))
+    assert ring.snapshot() == b"56789abc"
+
+
+def test_resource_ring_keeps_the_newest_samples_in_order(gui):
+    ring = gui.ResourceRing(slots=4)
+    assert ring.rows() == []
+    for t in range(3):
+        ring.add(t, t * 0.5, 1000 + t, 4)
+    assert [r[0] for r in ring.rows()] == [0, 1, 2]
+    for t in range(3, 10):
+        ring.add(t, t * 0.5, 1000 + t, 4)
+    assert ring.rows() == [(float(t), t * 0.5, 1000.0 + t, 4.0) for t in range(6, 10)]
+
+
+def test_crash_bundle_contents(gui, tmp_path):
+    config = tmp_path / "gnb.yaml"
+    config.write_text("cell_cfg:\n  pci: 1\n")
+    ring = gui.ResourceRing(slots=2)
+    for t in range(3):
+        ring.add(100.0 + t, 1.5 * t, 2048, 12)
+    path = gui.write_crash_bundle(str(tmp_path), "gnb", "exited with status 134", b"Assertion failed\n",
+                                  ring.rows(), str(config))
+
+    assert sorted(os.listdir(path)) == ["gnb.yaml", "meta.json", "output.log", "resources.csv"]
+    assert open(os.path.join(path, "output.log"), "rb").read() == b"Assertion failed\n"
+    assert open(os.path.join(path, "resources.csv")).read().splitlines() == [
+        "time,cpu_seconds,rss_kb,threads", "101.0,1.50,2048,12", "102.0,3.00,2048,12"]
+    meta = json.load(open(os.path.join(path, "meta.json")))
+    assert (meta["process"], meta["reason"], meta["config_path"]) == ("gnb", "exited with status 134", str(config))
+    assert len(meta["config_sha256"]) == 64
+    # A second crash in the same second gets its own bundle
+    again = gui.write_crash_bundle(str(tmp_path), "gnb", "again", None, [])
+    assert again != path and not any(n.endswith(".tmp") for n in os.listdir(tmp_path))
@@ -0,0 +1,116 @@
+import types
+
+import pytest
+
+
+class FakeMonitor:
+    def __init__(self):
+        self.callbacks, self.cancelled = [], False
+
+    def set_rate_limit(self, ms):
+        pass
+
+    def connect(self, signal_name, callback):
+        self.callbacks.append(callback)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def emit_changed(self):
+        for callback in self.callbacks:
+            callback(self, None, None, None)
+
+
+class WatchError(Exception):
+    pass
+
+
+class Monitors(dict):
+    pass
+
+
+@pytest.fixture
+def monitors(gui, monkeypatch):
+    """Gio directory monitors by path; paths listed in 'unwatchable' fail like GLib.Error."""
+    created, unwatchable = Monitors(), set()
+
+    class FakeFile:
+        def __init__(self, path):
+            self.path = path
+
+        def monitor_directory(self, flags, cancellable):
+            if self.path in unwatchable:
+                raise WatchError("not supported")
+            created[self.path] = FakeMonitor()
+            return created[self.path]
+    monkeypatch.setattr(gui.Gio, "File", types.SimpleNamespace(new_for_path=FakeFile), raising=False)
+    monkeypatch.setattr(gui.GLib, "Error", WatchError)
+    created.unwatchable = unwatchable
+    return created
+
+
+@pytest.fixture
+def listing(gui, idle_queue, monitors):
+    changed = []
+    cache = gui.DirectoryListingCache(on_change=changed.append)
+    cache.changed = changed
+    yield cache
+    cache.close()
+
+
+def finish_scans(cache, idle_queue):
+    # One worker: a no-op queued behind the scans returns once they have posted their results
+    cache._pool.submit(lambda: None).result(timeout=5)
+    idle_queue.run()
+
+
+def test_listing_is_cached_until_the_directory_changes(gui, tmp_path, idle_queue, monitors, listing):
+    (tmp_path / "b.pcap").write_bytes(b"")
+    (tmp_path / "a").mkdir()
+    results = []
+    assert not listing.request(str(tmp_path), results.append)
+    finish_scans(listing, idle_queue)
+    assert results == [[("a", True), ("b.pcap", False)]]
+
+    assert listing.request(str(tmp_path), results.append)
+    assert len(results) == 2
+
+    (tmp_path / "c.pcap").write_bytes(b"")
+    monitors[str(tmp_path)].emit_changed()
+    assert listing.changed == [str(tmp_path)]
+    assert not listing.request(str(tmp_path), results.append)
+    finish_scans(listing, idle_queue)
+    assert results[-1] == [("a", True), ("b.pcap", False), ("c.pcap", False)]
+
+
+def test_scan_overtaken_by_a_change_is_delivered_but_not_cached(gui, tmp_path, idle_queue, monitors, listing):
+    results = []
+    listing.request(str(tmp_path), results.append)
+    listing._pool.submit(lambda: None).result(timeout=5)
+    # The directory changes after the scan but before its result reaches the GTK thread
+    listing.invalidate(str(tmp_path))
+    idle_queue.run()
+    assert results == [[]]
+    assert not listing.request(str(tmp_path), results.append)
+    finish_scans(listing, idle_queue)
+    assert listing.request(str(tmp_path), results.append)
+
+
+def test_unreadable_and_unwatchable_directories_are_not_cached(gui, tmp_path, idle_queue, monitors, listing):
+    results = []
+    listing.request(str(tmp_path / "missing"), results.append)
+    monitors.unwatchable.add(str(tmp_path))
+    listing.request(str(tmp_path), results.append)
+    finish_scans(listing, idle_queue)
+    assert results == [None, []]
+    assert not listing.request(str(tmp_path), results.append)
+    finish_scans(listing, idle_queue)
+
+
+def test_close_cancels_the_monitors(gui, tmp_path, idle_queue, monitors):
+    cache = gui.DirectoryListingCache()
+    cache.request(str(tmp_path), lambda entries: None)
+    finish_scans(cache, idle_queue)
+    cache.close()
+    assert monitors[str(tmp_path)].cancelled
+    assert not cache.request(str(tmp_path / "x"), lambda entries: None)
@@ -0,0 +1,27 @@
+import random
+
+
+def test_fuzzy_index_matches_brute_force(gui):
+    rng = random.Random(7)
+    names = ["".join(rng.choice("abcdefgh_.") for _ in range(rng.randint(3, 20))) for _ in range(2000)]
+    index = gui.FuzzyFilterIndex(names)
+    for query in ("a", "ab", "abc", "abc_", "ab", "h.g", "zz"):
+        expected = [i for i, n in enumerate(names) if gui.fuzzy_match(query, n.lower())]
+        assert index.matches(query) == expected
+
+
+def test_queries_are_case_and_whitespace_insensitive(gui):
+    index = gui.FuzzyFilterIndex(["gNB_zmq.yaml", "ue_zmq.conf", "Open5GS.log"])
+    assert index.matches("  GZY ") == [0]
+    assert index.matches("zmq") == [0, 1]
+    assert index.matches("") == [0, 1, 2]
+    assert index.matches("nothing") == []
+
+
+def test_cache_is_bounded(gui, monkeypatch):
+    monkeypatch.setattr(gui.FuzzyFilterIndex, "MAX_CACHED", 4)
+    names = ["alpha", "beta", "gamma", "delta"]
+    index = gui.FuzzyFilterIndex(names)
+    for query in ("a", "al", "alp", "alph", "alpha", "b", "be", "d"):
+        assert index.matches(query) == [i for i, n in enumerate(names) if gui.fuzzy_match(query, n)]
+        assert len(index._cache) <= 4
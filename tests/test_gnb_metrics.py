@@ -0,0 +1,68 @@
+import pytest
+
+T0 = 1_700_000_000.0
+
+
+def ue(rnti, **fields):
+    return dict({"pci": 1, "rnti": rnti, "dl_brate": 10e6, "ul_brate": 2e6,
+                 "dl_nof_ok": 90, "dl_nof_nok": 10, "ul_nof_ok": 50, "ul_nof_nok": 0}, **fields)
+
+
+def test_both_report_layouts_parse_the_same(gui):
+    ues = [ue(17921), ue(17922)]
+    legacy = {"timestamp": T0, "ue_list": [{"ue_container": u} for u in ues]}
+    per_cell = {"timestamp": T0, "cells": [{"cell_metrics": {"average_latency": 250}, "ue_list": ues}]}
+
+    assert gui.parse_gnb_metrics(legacy) == (T0, [], ues)
+    ts, cells, parsed = gui.parse_gnb_metrics(per_cell)
+    assert (ts, parsed) == (T0, ues)
+    # The cell takes its PCI from its UEs when the report leaves it out
+    assert cells == [{"average_latency": 250, "pci": 1}]
+    assert gui.parse_gnb_metrics({}) == (None, [], [])
+
+
+def test_store_derives_bler_and_cell_totals(gui):
+    store = gui.GnbMetricsStore()
+    for i in range(3):
+        store.ingest({"timestamp": T0 + i, "cells": [{"cell_metrics": {"pci": 1, "average_latency": 200 + i},
+                                                      "ue_list": [ue(17921), ue(17922, dl_brate=30e6)]}]})
+    assert (store.reports, store.last_report) == (3, T0 + 2)
+    assert store.keys("ue") == ["1/17921", "1/17922"]
+    assert store.keys("cell") == ["1"]
+
+    assert [v for _, v in store.series("ue", "1/17921", "dl_bler")] == [10.0] * 3
+    assert [v for _, v in store.series("ue", "1/17921", "ul_bler")] == [0.0] * 3
+    assert [v for _, v in store.series("cell", "1", "dl_brate")] == [40e6] * 3
+    assert [v for _, v in store.series("cell", "1", "nof_ues")] == [2] * 3
+    assert [v for _, v in store.series("cell", "1", "average_latency")] == [200, 201, 202]
+
+
+def test_report_without_timestamp_uses_arrival_time(gui):
+    store = gui.GnbMetricsStore()
+    store.ingest({"ue_list": [ue(1, dl_nof_ok=0, dl_nof_nok=0, ul_nof_ok=0, ul_nof_nok=0)]}, now=T0)
+    assert store.last_report == T0
+    # No transport blocks means no BLER sample rather than a division by zero
+    assert store.series("ue", "1/1", "dl_bler") == []
+    assert store.series("ue", "1/1", "dl_brate") == [(T0, 10e6)]
+
+
+@pytest.mark.parametrize("config, issue", [
+    ("metrics:\n  enable_json_metrics: true\n  addr: 127.0.0.1\n  port: 55555\n", None),
+    ("metrics: { enable_json_metrics: true, port: 55555 }  # inline\n", None),
+    ("cell_cfg:\n  pci: 1\n", "has no 'metrics' section"),
+    ("metrics:\n  pcap: true\n#  enable_json_metrics: true\n", "does not set metrics: enable_json_metrics: true"),
+    ("metrics:\n  enable_json_metrics: true\n  port: 6000\n", "sends metrics to port 6000"),
+    ("metrics:\n  enable_json_metrics: true\n  addr: 10.0.0.5\n", "sends metrics to 10.0.0.5"),
+])
+def test_metrics_config_check(gui, tmp_path, config, issue):
+    path = tmp_path / "gnb.yaml"
+    path.write_text("cu_cp:\n  amf:\n    addr: 10.53.1.2\n" + config)
+    found = gui.gnb_metrics_config_issue(str(path), 55555, "127.0.0.1")
+    assert found == issue if issue is None else issue in found
+
+
+def test_metrics_config_check_with_any_listen_address(gui, tmp_path):
+    path = tmp_path / "gnb.yaml"
+    path.write_text("metrics:\n  enable_json_metrics: true\n  addr: 10.0.0.5\n")
+    assert gui.gnb_metrics_config_issue(str(path), 55555, "0.0.0.0") is None
+    assert "could not read" in gui.gnb_metrics_config_issue(str(tmp_path / "missing.yaml"))
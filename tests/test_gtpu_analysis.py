@@ -0,0 +1,80 @@
+import socket
+import struct
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+T0 = 1_700_000_000.0
+
+
+def gtpu_packet(teid, inner_len, src, dst, pdu_type=None, port=2152):
+    inner = struct.pack('!BBHHHBBH4s4s', 0x45, 0, inner_len, 0, 0, 64, 17, 0,
+                        socket.inet_aton(src), socket.inet_aton(dst))
+    if pdu_type is None:
+        gtp = struct.pack('!BBHI', 0x30, 0xFF, len(inner), teid) + inner
+    else:
+        # Sequence/N-PDU/next-extension words, then a PDU Session Container
+        ext = struct.pack('!HBB', 0, 0, 0x85) + bytes([1, pdu_type << 4, 9, 0])
+        gtp = struct.pack('!BBHI', 0x34, 0xFF, len(ext) + len(inner), teid) + ext + inner
+    udp = struct.pack('!HHHH', port, port, 8 + len(gtp), 0) + gtp
+    ip = struct.pack('!BBHHHBBH4s4s', 0x45, 0, 20 + len(udp), 0, 0, 64, 17, 0,
+                     socket.inet_aton("10.53.1.2"), socket.inet_aton("10.53.1.1")) + udp
+    return struct.pack('!HHH8sH', 0, 1, 0, b'\x00' * 8, 0x0800) + ip
+
+
+def write_capture(gui, path, packets):
+    with open(path, 'wb') as f:
+        f.write(struct.pack('<IHHiIII', 0xa1b2c3d4, 2, 4, 0, 0, 65535, gui.LINKTYPE_LINUX_SLL))
+        for ts, data in packets:
+            sec, usec = int(ts), int(round((ts % 1) * 1e6))
+            # Header-only capture: the wire length is the full inner packet
+            f.write(struct.pack('<IIII', sec, usec, len(data), len(data) + 1000) + data)
+
+
+@pytest.fixture
+def capture(gui, tmp_path):
+    packets = []
+    for i in range(10):
+        packets.append((T0 + i * 0.1, gtpu_packet(0x100, 1000, "10.53.1.1", "10.45.1.2", pdu_type=0)))
+        packets.append((T0 + i * 0.2 + 0.05, gtpu_packet(0x200, 500, "10.45.1.3", f"8.8.8.{i + 1}")))
+    packets.append((T0 + 0.5, gtpu_packet(0x300, 100, "1.1.1.1", "2.2.2.2", port=53)))
+    packets.sort(key=lambda p: p[0])
+    path = str(tmp_path / "gtpu.pcap")
+    write_capture(gui, path, packets)
+    return path
+
+
+def analyze(gui, path, batch):
+    analyzer = gui.GtpuCaptureAnalyzer(batch=batch)
+    gui.feed_capture(path, analyzer.consume)
+    return analyzer
+
+
+def test_per_teid_statistics(gui, capture):
+    a = analyze(gui, capture, gui.GTPU_BATCH)
+    assert (a.packets, a.gtpu_packets) == (21, 20)
+    assert set(a.teids) == {0x100, 0x200}
+
+    dl, ul = a.teids[0x100], a.teids[0x200]
+    assert (dl['packets'], dl['bytes'], dl['direction']) == (10, 10_000, 0)
+    assert gui._ipv4_str(dl['ue_ip']) == "10.45.1.2"
+    assert dl['iat_n'] == 9 and dl['iat_sum'] == pytest.approx(0.9, abs=1e-5)
+    # No PDU session container: one fixed source towards many destinations is uplink
+    assert (ul['packets'], ul['bytes'], ul['direction']) == (10, 5_000, 1)
+    assert gui._ipv4_str(ul['ue_ip']) == "10.45.1.3"
+    assert dl['per_second'].sum() == 10_000
+
+
+def test_batch_size_does_not_change_results(gui, capture):
+    whole, batched = analyze(gui, capture, gui.GTPU_BATCH), analyze(gui, capture, 3)
+    assert batched.packets == whole.packets and batched.gtpu_packets == whole.gtpu_packets
+    for teid, stats in whole.teids.items():
+        other = batched.teids[teid]
+        for key in ('packets', 'bytes', 'direction', 'ue_ip', 'iat_n'):
+            assert other[key] == stats[key], key
+        assert other['iat_sum'] == pytest.approx(stats['iat_sum'])
+        assert other['iat_max'] == pytest.approx(stats['iat_max'])
+        assert np.array_equal(other['per_second'], stats['per_second'])
+    assert np.array_equal(batched.size_hist, whole.size_hist)
+    assert np.array_equal(batched.iat_hist, whole.iat_hist)
@@ -0,0 +1,46 @@
+import sqlite3
+
+
+def test_batched_writes_reach_the_database(gui, tmp_path):
+    db_path = str(tmp_path / "history" / "runs.db")
+    store = gui.RunHistoryStore(db_path)
+    seen = []
+    store.listeners.append(lambda *row: seen.append(row))
+    for i in range(gui.RunHistoryStore.BATCH_SIZE * 2 + 10):
+        store.record("gnb", "sample", value=i)
+    store.close(timeout=10)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        values = [v for (v,) in conn.execute("SELECT value FROM events ORDER BY id")]
+        runs = conn.execute("SELECT id, ended_at FROM runs").fetchall()
+    finally:
+        conn.close()
+    assert values == list(range(gui.RunHistoryStore.BATCH_SIZE * 2 + 10))
+    assert len(seen) == len(values)
+    assert len(runs) == 1 and runs[0][1] is not None
+
+
+def test_config_hash_follows_the_process(gui, tmp_path):
+    config = tmp_path / "gnb.yaml"
+    config.write_text("cell_cfg: {}\n")
+    store = gui.RunHistoryStore(str(tmp_path / "runs.db"))
+    store.record("gnb", "start", config_path=str(config))
+    store.record("gnb", "ready", value=1.5)
+    store.record("ue", "start")
+    store.close(timeout=10)
+
+    rows = {(p, k): h for _, p, k, _, _, h in store.query_events()}
+    assert rows[("gnb", "start")] is not None
+    assert rows[("gnb", "ready")] == rows[("gnb", "start")]
+    assert rows[("ue", "start")] is None
+
+
+def test_deferred_records_run_on_the_writer(gui, tmp_path):
+    store = gui.RunHistoryStore(str(tmp_path / "runs.db"))
+    store.record_deferred("ue_iperf", "throughput", lambda: [(41.5, "receiver"), (42.0, "sender")])
+    store.record_deferred("ue_iperf", "throughput", lambda: 1 / 0)
+    store.close(timeout=10)
+
+    rows = sorted((v, d) for _, _, _, v, d, _ in store.query_events(kind="throughput"))
+    assert rows == [(41.5, "receiver"), (42.0, "sender")]
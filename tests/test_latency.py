@@ -0,0 +1,41 @@
+import pytest
+
+
+def test_hdr_histogram_precision(gui):
+    hist = gui.HdrHistogram(highest=10_000_000, significant_figures=3)
+    for v in range(1, 100_001):
+        hist.record(v)
+    p50, p99, p999 = hist.percentiles(50, 99, 99.9)
+    assert p50 == pytest.approx(50_000, rel=1e-3)
+    assert p99 == pytest.approx(99_000, rel=1e-3)
+    assert p999 == pytest.approx(99_900, rel=1e-3)
+    hist.record(10**9)
+    assert hist.clamped == 1 and hist.max == 10_000_000
+
+
+def test_hdr_histogram_add_and_reset(gui):
+    low, high = gui.HdrHistogram(), gui.HdrHistogram()
+    for v in range(100):
+        low.record(v)
+        high.record(1000 + v)
+    low.add(high)
+    assert (low.total, low.min, low.max) == (200, 0, 1099)
+    assert low.percentiles(25, 75) == [49, 1049]
+    assert low.mean() == pytest.approx((sum(range(100)) + sum(range(1000, 1100))) / 200)
+    low.reset()
+    assert (low.total, low.min, low.percentiles(50)) == (0, None, [0])
+
+
+def test_latency_probe_tracks_reordering_and_jitter(gui):
+    probe = gui.LatencyProbe(None, "127.0.0.1")
+    header = gui.LatencyProbe.HEADER
+    # RTTs of 1, 3 and 2 ms; sequence 1 arrives after sequence 2
+    for seq, rtt_ms in ((0, 1), (2, 3), (1, 2)):
+        probe._record(header.pack(seq, 0), rtt_ms * 1_000_000)
+    window, total = probe.snapshot()
+    assert total['received'] == 3 and total['reordered'] == 1
+    assert total['jitter'] == pytest.approx((2000 / 16) + (1000 - 2000 / 16) / 16)
+    assert (window['min'], window['max']) == (1000, 3000)
+    # The window restarts on every snapshot, the totals do not
+    window, total = probe.snapshot()
+    assert window['count'] == 0 and total['count'] == 3
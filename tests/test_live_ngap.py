@@ -0,0 +1,90 @@
+import os
+
+
+def synthetic_capture(gui, tmp_path, n_ues):
+    path = str(tmp_path / "full.pcap")
+    gui.write_synthetic_ngap_pcap(path, n_ues)
+    with open(path, "rb") as f:
+        data = f.read()
+    return data, gui.analyze_capture(path).ngap_messages
+
+
+def test_ring_segment_tail_is_counted_before_the_move(gui, tmp_path):
+    data, messages = synthetic_capture(gui, tmp_path, 20)
+    staging = tmp_path / "staging"
+    staging.mkdir()
+    seen = []
+    indexer = gui.LiveCaptureIndexer(str(staging), on_message=lambda ts, d: seen.append(d), follow_dir=True)
+
+    # The last poll saw only part of the first segment
+    first = staging / "ring_00001.pcapng"
+    first.write_bytes(data[:len(data) // 2])
+    indexer._following = str(first)
+    indexer._update(str(first))
+    assert 0 < len(seen) < messages
+
+    # tshark finished it and rotated; the mover reports it before moving it away
+    first.write_bytes(data)
+    (staging / "ring_00002.pcapng").write_bytes(data[:24])
+    indexer.segment_closed(str(first))
+    os.rename(first, tmp_path / "ring_00001.pcapng")
+    assert len(seen) == messages
+
+
+def test_segment_the_poller_never_saw_is_counted_whole(gui, tmp_path):
+    data, messages = synthetic_capture(gui, tmp_path, 5)
+    staging = tmp_path / "staging"
+    staging.mkdir()
+    seen = []
+    indexer = gui.LiveCaptureIndexer(str(staging), on_message=lambda ts, d: seen.append(d), follow_dir=True)
+    segment = staging / "ring_00001.pcapng"
+    segment.write_bytes(data)
+    indexer.segment_closed(str(segment))
+    assert len(seen) == messages
+
+
+def test_segment_drained_at_rotation_is_not_counted_twice(gui, tmp_path):
+    data, messages = synthetic_capture(gui, tmp_path, 5)
+    staging = tmp_path / "staging"
+    staging.mkdir()
+    seen = []
+    indexer = gui.LiveCaptureIndexer(str(staging), on_message=lambda ts, d: seen.append(d), follow_dir=True)
+    first = staging / "ring_00001.pcapng"
+    first.write_bytes(data)
+    indexer._following = str(first)
+    (staging / "ring_00002.pcapng").write_bytes(data[:24])
+
+    # One poll of the loop: it notices the rotation and drains the old segment itself
+    indexer._stop.wait = lambda timeout, calls=iter([False, True]): next(calls)
+    indexer._loop()
+    indexer.segment_closed(str(first))
+    assert len(seen) == messages
+
+
+def test_live_counters(gui, monkeypatch):
+    monkeypatch.setattr(gui.LiveNgapCounters, "MAX_UES", 3)
+    counters = gui.LiveNgapCounters()
+    for ue in (1, 2, 3, 1, 4):
+        counters.add(0.0, (0, 15, {'ran_ue_id': ue}))
+    counters.add(0.0, (2, 14, {'ran_ue_id': 4}))
+    counters.add(0.0, (0, 21, {}))
+
+    total, rate, rows, ues = counters.snapshot()
+    assert total == 7
+    assert [(p, c, f) for p, c, f, _ in rows] == [(14, 1, 1), (15, 5, 0), (21, 1, 0)]
+    # Most recently active first; UE 2 was the least recent when UE 4 arrived
+    assert ues == [(4, 2, 14, 2), (1, 2, 15, 0), (3, 1, 15, 0)]
+    assert counters.snapshot(max_ues=1)[3] == [(4, 2, 14, 2)]
+
+
+def test_mover_hands_segments_over_while_still_in_staging(gui, tmp_path):
+    staging, dest = tmp_path / "staging", tmp_path / "captures"
+    staging.mkdir()
+    dest.mkdir()
+    for i in (1, 2, 3):
+        (staging / f"ring_{i:05d}.pcapng").write_bytes(b"x")
+    handed = []
+    mover = gui.RingCaptureMover(str(staging), str(dest), "ring",
+                                 before_move=lambda src: handed.append((os.path.basename(src), os.path.exists(src))))
+    mover._move_closed()
+    assert handed == [("ring_00001.pcapng", True), ("ring_00002.pcapng", True)]
@@ -0,0 +1,50 @@
+import urllib.request
+
+FAMILIES = [
+    ("srsran_gui_crashes_total", "counter", "Process crashes seen", [({"process": "gnb"}, 2), ({"process": "ue"}, 0)]),
+    ("srsran_gui_ues", "gauge", "Attached UEs", [({}, 3)]),
+    ("srsran_gui_info", "gauge", "Build info", [({"note": 'a "quoted"\\path\nline'}, 1)]),
+]
+
+
+def test_prometheus_text(gui):
+    text = gui.render_metrics(FAMILIES).decode()
+    assert text.splitlines()[:4] == [
+        "# HELP srsran_gui_crashes_total Process crashes seen",
+        "# TYPE srsran_gui_crashes_total counter",
+        'srsran_gui_crashes_total{process="gnb"} 2',
+        'srsran_gui_crashes_total{process="ue"} 0',
+    ]
+    assert "srsran_gui_ues 3\n" in text
+    assert 'srsran_gui_info{note="a \\"quoted\\"\\\\path\\nline"} 1' in text
+    assert "# EOF" not in text and text.endswith("\n")
+
+
+def test_openmetrics_names_counter_families_without_total(gui):
+    lines = gui.render_metrics(FAMILIES, openmetrics=True).decode().splitlines()
+    assert lines[:3] == [
+        "# HELP srsran_gui_crashes Process crashes seen",
+        "# TYPE srsran_gui_crashes counter",
+        'srsran_gui_crashes_total{process="gnb"} 2',
+    ]
+    # Gauges keep their name; the exposition ends with exactly one EOF marker
+    assert "# TYPE srsran_gui_ues gauge" in lines
+    assert lines[-1] == "# EOF" and lines.count("# EOF") == 1
+
+
+def test_exporter_negotiates_the_format(gui):
+    exporter = gui.MetricsExporter(port=0, host="127.0.0.1")
+    exporter.publish(FAMILIES)
+    exporter.start()
+    try:
+        url = f"http://127.0.0.1:{exporter._server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as resp:
+            assert resp.headers["Content-Type"] == gui.PROMETHEUS_CONTENT_TYPE
+            assert resp.read() == gui.render_metrics(FAMILIES)
+        request = urllib.request.Request(url, headers={"Accept": "application/openmetrics-text; version=1.0.0"})
+        with urllib.request.urlopen(request, timeout=5) as resp:
+            assert resp.headers["Content-Type"] == gui.OPENMETRICS_CONTENT_TYPE
+            assert resp.read() == gui.render_metrics(FAMILIES, openmetrics=True)
+    finally:
+        exporter.stop()
+    assert not exporter.running
@@ -0,0 +1,109 @@
+import errno
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture
+def make_log(gui, app_home):
+    (app_home / "logs").mkdir()
+    (app_home / "fifo").mkdir()
+    logs = []
+
+    def make(name="gnb", **kwargs):
+        log = gui.ProcessOutputLog(name, str(app_home / "logs"), str(app_home / "fifo"), **kwargs)
+        logs.append(log)
+        return log
+    yield make
+    for log in logs:
+        log.close()
+
+
+def run_writer(log, chunks):
+    """Plays the part of `script`: writes every chunk into the FIFO, then closes it."""
+    with open(log.fifo_path, 'wb', buffering=0) as fifo:
+        for chunk in chunks:
+            fifo.write(chunk)
+    deadline = time.monotonic() + 5
+    while not log.ring.snapshot().endswith(chunks[-1]) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    log.wait_drained(5)
+
+
+def wait_written(log, timeout=5):
+    deadline = time.monotonic() + timeout
+    while (log._pending or log._file is None or log._file.tell() == 0) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)
+
+
+def test_output_reaches_the_log_and_the_ring(gui, make_log):
+    log = make_log()
+    run_writer(log, [b"cell 1 up\n", b"UE attached\n"])
+    log.close()
+    text = open(log.path, 'rb').read()
+    assert text.startswith(b"\n===== gnb started ") and text.endswith(b"cell 1 up\nUE attached\n")
+    assert log.ring.snapshot() == b"cell 1 up\nUE attached\n"
+    assert (log.error, log.dropped) == (None, 0)
+
+
+def test_rotation_cuts_at_a_line_boundary(gui, make_log, monkeypatch):
+    monkeypatch.setattr(gui, "PROCESS_LOG_ROTATE_BYTES", 100)
+    rotated = []
+    log = make_log(on_rotated=rotated.append)
+    # The header takes 45 bytes, so this chunk crosses the limit inside its last line
+    run_writer(log, [b"x" * 29 + b"\n" + b"y" * 40])
+    log.close()
+    assert len(rotated) == 1
+    assert open(rotated[0], 'rb').read().endswith(b"x" * 29 + b"\n")
+    assert open(log.path, 'rb').read() == b"y" * 40
+
+
+def test_disk_errors_drop_output_without_stalling_the_writer(gui, make_log, monkeypatch):
+    monkeypatch.setattr(gui, "PROCESS_LOG_RETRY", 0.0)
+    log = make_log()
+    run_writer(log, [b"before\n"])
+    wait_written(log)
+
+    real_write = log._write
+    failing = threading.Event()
+    failing.set()
+
+    def write(data):
+        if failing.is_set():
+            raise OSError(errno.ENOSPC, "No space left on device")
+        real_write(data)
+    monkeypatch.setattr(log, "_write", write)
+    # `script` keeps writing through the failure and never sees the FIFO close
+    run_writer(log, [b"lost\n"] * 100)
+    deadline = time.monotonic() + 5
+    while log.dropped < 500 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert log.error and "No space left" in log.error
+    assert log.dropped >= 500
+    assert log.ring.snapshot().endswith(b"lost\n" * 10)
+
+    failing.clear()
+    run_writer(log, [b"after\n"])
+    log.close()
+    text = open(log.path, 'rb').read()
+    assert b"before\n" in text and b"lost" not in text and text.endswith(b"after\n")
+    assert b"bytes of output not logged so far (" in text
+    assert log.error is None
+
+
+def test_slow_disk_never_blocks_the_drain(gui, make_log, monkeypatch):
+    monkeypatch.setattr(gui, "PROCESS_LOG_QUEUE_BYTES", 256 * 1024)
+    log = make_log()
+    disk = threading.Event()
+    real_store = log._store
+    monkeypatch.setattr(log, "_store", lambda data, flush: (disk.wait(), real_store(data, flush)))
+
+    writer = threading.Thread(target=run_writer, args=(log, [b"z" * 65536] * 64))
+    writer.start()
+    writer.join(10)
+    # 4 MiB went through the FIFO while the disk wrote nothing
+    assert not writer.is_alive()
+    assert log.error == "log disk too slow" and log.dropped > 3 * 1024 * 1024
+    disk.set()
@@ -0,0 +1,61 @@
+import os
+import threading
+
+
+def make_segments(staging, prefix, count, start=1):
+    names = [f"{prefix}_{i:05d}_20240101120000.pcapng" for i in range(start, start + count)]
+    for name in names:
+        (staging / name).write_bytes(name.encode())
+    return names
+
+
+def test_mover_keeps_the_newest_segment_in_staging(gui, tmp_path):
+    staging, dest = tmp_path / "staging", tmp_path / "captures"
+    staging.mkdir()
+    dest.mkdir()
+    names = make_segments(staging, "ring", 3)
+    (staging / "unrelated.txt").write_text("x")
+    saved = []
+    mover = gui.RingCaptureMover(str(staging), str(dest), "ring", max_segments=10,
+                                 on_segment=lambda path, m: saved.append((path, m)))
+    mover._move_closed()
+
+    assert sorted(os.listdir(staging)) == [names[-1], "unrelated.txt"]
+    assert sorted(os.listdir(dest)) == names[:-1]
+    assert saved == [(str(dest / n), mover) for n in names[:-1]]
+
+
+def test_retention_drops_the_oldest_segments_and_their_sidecars(gui, tmp_path):
+    staging, dest = tmp_path / "staging", tmp_path / "captures"
+    staging.mkdir()
+    dest.mkdir()
+    names = make_segments(staging, "ring", 2)
+    mover = gui.RingCaptureMover(str(staging), str(dest), "ring", max_segments=2)
+    mover._move_closed()
+    # The first segment has since been compressed and indexed
+    first = str(dest / names[0])
+    os.rename(first, first + gui.ZSTD_SUFFIX)
+    with open(first + gui.INDEX_SUFFIX, "w") as f:
+        f.write("idx")
+
+    names += make_segments(staging, "ring", 4, start=3)
+    mover._move_closed()
+    assert mover.moved == [str(dest / n) for n in names[3:5]]
+    assert sorted(os.listdir(dest)) == names[3:5]
+    assert mover.dropped == 3
+
+
+def test_finish_moves_the_last_segment(gui, tmp_path):
+    staging, dest = tmp_path / "staging", tmp_path / "captures"
+    staging.mkdir()
+    dest.mkdir()
+    names = make_segments(staging, "ring", 4)
+    done = threading.Event()
+    result = []
+    mover = gui.RingCaptureMover(str(staging), str(dest), "ring", max_segments=3)
+    mover.finish(on_done=lambda moved: (result.extend(moved), done.set()), timeout=1)
+    assert done.wait(10)
+
+    assert result == [str(dest / n) for n in names[1:]]
+    assert mover.dropped == 1
+    assert not staging.exists()
@@ -0,0 +1,158 @@
+import threading
+import time
+import types
+
+import pytest
+
+UE_TEMPLATE = """\
+# single-UE srsue config
+[rf]
+device_name = zmq
+device_args = tx_port=tcp://127.0.0.1:2001,rx_port=tcp://127.0.0.1:2000,base_srate=23.04e6
+
+[usim]
+imsi = 001010123456780
+
+[gw]
+netns = ue1
+
+[log]
+filename = /tmp/ue.log
+
+[pcap]
+mac_filename = /tmp/ue_mac.pcap
+"""
+
+
+def test_generate_ue_config_derives_per_ue_values(gui):
+    conf = gui.generate_ue_config(UE_TEMPLATE, 3)
+    tx_port, rx_port = gui.ue_zmq_ports(3)
+    assert f"tx_port=tcp://127.0.0.1:{tx_port},rx_port=tcp://127.0.0.1:{rx_port},base_srate=23.04e6" in conf
+    assert "imsi = 001010123456782" in conf
+    assert "netns = ue3" in conf
+    assert "filename = /tmp/ue_ue3.log" in conf
+    assert "mac_filename = /tmp/ue_mac_ue3.pcap" in conf
+    assert conf.startswith("# single-UE srsue config\n")
+
+
+def test_generate_ue_config_needs_a_namespace(gui):
+    with pytest.raises(ValueError):
+        gui.generate_ue_config(UE_TEMPLATE.replace("netns = ue1", ""), 2)
+
+
+class FakeZmq(types.SimpleNamespace):
+    """Just enough of pyzmq for the broker's downlink loop: UE REP sockets and a gNB REQ socket."""
+
+    class Again(Exception):
+        pass
+
+    class ZMQError(Exception):
+        pass
+
+    REQ, REP, LINGER, RCVTIMEO, POLLIN = range(5)
+
+    def __init__(self, silent_ues, first_ue_port):
+        super().__init__()
+        self.silent_ues = silent_ues        # 0-based UEs that never ask for samples
+        self.ue_sockets = {}
+        self.lock = threading.Lock()
+        zmq = self
+
+        class Socket:
+            def __init__(self, kind):
+                self.kind, self.ue, self.pending, self.received = kind, None, False, 0
+
+            def setsockopt(self, *args):
+                pass
+
+            def bind(self, address):
+                port = int(address.rsplit(":", 1)[1])
+                self.ue = (port - first_ue_port) // 2
+                self.pending = self.ue not in zmq.silent_ues
+                zmq.ue_sockets[self.ue] = self
+
+            def connect(self, address):
+                pass
+
+            def recv(self):
+                if self.kind == zmq.REQ:
+                    return b"\x00" * 8       # the gNB answers at once
+                with zmq.lock:
+                    self.pending = False
+                return b"\x01"
+
+            def send(self, data):
+                if self.kind == zmq.REP:
+                    with zmq.lock:
+                        self.received += 1
+                        # The UE asks for its next buffer straight away
+                        self.pending = self.ue not in zmq.silent_ues
+
+            def close(self):
+                pass
+
+        class Poller:
+            def __init__(self):
+                self.sockets = []
+
+            def register(self, sock, flags):
+                self.sockets.append(sock)
+
+            def poll(self, timeout):
+                deadline = time.monotonic() + timeout / 1000.0
+                while True:
+                    with zmq.lock:
+                        ready = [(s, zmq.POLLIN) for s in self.sockets if s.pending]
+                    if ready or time.monotonic() >= deadline:
+                        return ready
+                    time.sleep(0.001)
+
+        self.Context = lambda: types.SimpleNamespace(socket=Socket, term=lambda: None)
+        self.Poller = Poller
+
+
+def run_downlink(gui, broker, rounds):
+    broker.running = True
+    thread = threading.Thread(target=broker._downlink_loop, daemon=True)
+    thread.start()
+    target = broker.dl_buffers + rounds
+    deadline = time.monotonic() + 10
+    while broker.dl_buffers < target and time.monotonic() < deadline:
+        time.sleep(0.001)
+    broker.running = False
+    thread.join(5)
+    return broker
+
+
+def make_broker(gui, monkeypatch, silent_ues, n_ues):
+    fake = FakeZmq(silent_ues, gui.ue_zmq_ports(1)[1])
+    monkeypatch.setattr(gui, "zmq", fake)
+    broker = gui.ZmqSampleBroker(n_ues, timeout_ms=20)
+    broker._ctx = fake.Context()
+    return fake, broker
+
+
+def test_silent_ue_is_dropped_after_missed_rounds(gui, monkeypatch):
+    fake, broker = make_broker(gui, monkeypatch, {2}, n_ues=3)
+    started = time.monotonic()
+    run_downlink(gui, broker, rounds=50)
+    elapsed = time.monotonic() - started
+
+    assert broker.dl_buffers >= 50
+    assert broker.dead_ues == {3} and broker.stalled_ues == {3}
+    # Only the rounds before UE 3 was given up on waited for it
+    assert elapsed < gui.ZmqSampleBroker.DEAD_AFTER_MISSES * 0.02 + 2.0
+    assert fake.ue_sockets[0].received >= 50 and fake.ue_sockets[1].received >= 50
+    assert fake.ue_sockets[2].received == 0
+
+
+def test_returning_ue_is_served_again(gui, monkeypatch):
+    fake, broker = make_broker(gui, monkeypatch, {1}, n_ues=2)
+    run_downlink(gui, broker, rounds=10)
+    assert broker.dead_ues == {2}
+
+    # The UE comes back: the loop restarts with fresh sockets but remembers who was dead
+    fake.silent_ues.clear()
+    run_downlink(gui, broker, rounds=10)
+    assert broker.dead_ues == set() and broker.stalled_ues == {2}
+    assert fake.ue_sockets[1].received >= 10
@@ -0,0 +1,124 @@
+import os
+import signal
+import subprocess
+import sys
+
+import pytest
+
+FAST = ((signal.SIGINT, 0.5), (signal.SIGTERM, 0.5), (signal.SIGKILL, 2.0))
+
+CHILD = """
+import signal, sys, time
+for name in sys.argv[1:]:
+    signal.signal(getattr(signal, name), signal.SIG_IGN)
+print("ready", flush=True)
+time.sleep(60)
+"""
+
+
+@pytest.fixture
+def job():
+    """Starts a process in its own process group that ignores the given signals."""
+    procs = []
+
+    def start(*ignored):
+        proc = subprocess.Popen([sys.executable, "-c", CHILD, *ignored], stdout=subprocess.PIPE,
+                                start_new_session=True, text=True)
+        assert proc.stdout.readline() == "ready\n"
+        procs.append(proc)
+        return proc
+    yield start
+    for proc in procs:
+        proc.kill()
+        proc.wait()
+
+
+def entry(name, proc):
+    return (name, proc.pid, [proc.pid])
+
+
+def test_each_process_moves_on_to_the_next_signal(gui, job):
+    polite, stubborn, hopeless = job(), job("SIGINT"), job("SIGINT", "SIGTERM")
+    coordinator = gui.ShutdownCoordinator(escalation=FAST)
+    report, elapsed = coordinator.run([[entry("ue", polite), entry("gnb", stubborn), entry("core", hopeless)]])
+    outcomes = {name: outcome for name, outcome, _ in report}
+    assert outcomes == {"ue": "SIGINT", "gnb": "SIGTERM", "core": "SIGKILL"}
+    # One stage: the three escalations ran side by side
+    assert elapsed < 2.5
+
+
+def test_stages_run_in_order(gui, job):
+    ue, gnb = job(), job()
+    interrupted = []
+
+    def interrupt(name):
+        interrupted.append((name, [gui.process_alive(p.pid) for p in (ue, gnb)]))
+        os.killpg({"ue": ue, "gnb": gnb}[name].pid, signal.SIGINT)
+    coordinator = gui.ShutdownCoordinator(escalation=FAST, interrupt=interrupt)
+    report, _ = coordinator.run([[entry("ue", ue)], [entry("gnb", gnb)]])
+    assert [name for name, _, _ in report] == ["ue", "gnb"]
+    assert interrupted == [("ue", [True, True]), ("gnb", [False, True])]
+
+
+def test_interrupt_replaces_the_first_signal(gui, job, monkeypatch):
+    proc = job("SIGINT")
+    sent = []
+    monkeypatch.setattr(gui.os, "killpg", lambda pgid, sig: sent.append(sig))
+    coordinator = gui.ShutdownCoordinator(escalation=FAST, grace={"core": 0.2}, interrupt=sent.append)
+    report, _ = coordinator.run([[entry("core", proc)]])
+    # Ctrl+C went through the tab only; the job ignored it and SIGTERM followed after its grace
+    assert sent == ["core"]
+    assert report[0][:2] == ("core", "SIGTERM") and report[0][2] < 0.5
+
+
+def test_denied_signals_fall_back_to_sudo_kill(gui, job, monkeypatch):
+    proc = job("SIGINT")
+    commands = []
+    real_killpg = os.killpg
+
+    def kill(pid, sig):
+        raise PermissionError(1, "Operation not permitted")
+
+    def run(command, **kwargs):
+        commands.append(command)
+        real_killpg(proc.pid, getattr(signal, "SIG" + command[3][1:]))
+        return subprocess.CompletedProcess(command, 0, "", "")
+    monkeypatch.setattr(gui.os, "kill", kill)
+    monkeypatch.setattr(gui.os, "killpg", kill)
+    monkeypatch.setattr(gui.subprocess, "run", run)
+
+    report, _ = gui.ShutdownCoordinator(escalation=FAST).run([[entry("gnb", proc)]])
+    assert commands == [["sudo", "-n", "kill", "-INT", str(proc.pid)], ["sudo", "-n", "kill", "-TERM", str(proc.pid)]]
+    assert report[0][:2] == ("gnb", "SIGTERM")
+
+
+def test_failed_sudo_kill_is_reported_once_per_signal(gui, job, monkeypatch, capsys):
+    proc = job()
+
+    def kill(pid, sig):
+        raise PermissionError(1, "Operation not permitted")
+    monkeypatch.setattr(gui.os, "killpg", kill)
+    monkeypatch.setattr(gui.subprocess, "run", lambda command, **kwargs: subprocess.CompletedProcess(
+        command, 1, "", "sudo: a password is required"))
+    report, _ = gui.ShutdownCoordinator(escalation=((signal.SIGINT, 0.2),)).run([[entry("ue", proc)]])
+    assert report[0][:2] == ("ue", "still running")
+    assert capsys.readouterr().out.count("cannot send SIGINT to ue: sudo: a password is required") == 1
+
+
+def test_quit_saves_the_running_capture(gui, tmp_path):
+    # What on_app_quit runs once tshark has been stopped
+    staging, captures = tmp_path / ".incoming", tmp_path / "captures"
+    staging.mkdir()
+    captures.mkdir()
+    (staging / "srs_ngap.pcap").write_bytes(b"x" * 100)
+    recorded = []
+    app = type("App", (), {})()
+    app.ring_mover = app.capture_indexer = None
+    app.temp_pcap_path, app.final_pcap_path = str(staging / "srs_ngap.pcap"), str(captures / "srs_ngap.pcap")
+    app.tshark_compress = True
+    app.history = type("History", (), {"record": lambda self, *args, **kwargs: recorded.append(args)})()
+    app._archive_capture = lambda path: pytest.fail("compressing would hold up the exit")
+
+    gui.SrsRanGuiApp._take_capture_finalizer(app, archive=False)()
+    assert os.listdir(staging) == [] and (captures / "srs_ngap.pcap").read_bytes() == b"x" * 100
+    assert recorded == [("tshark", "capture")]
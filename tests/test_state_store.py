@@ -0,0 +1,71 @@
+import threading
+
+
+def test_changes_are_coalesced_into_one_flush(gui, idle_queue):
+    store = gui.StateStore()
+    seen = []
+    store.subscribe("ue_ip", lambda v: seen.append(("ue_ip", v)))
+    store.subscribe("gnb_running", lambda v: seen.append(("gnb_running", v)))
+    for i in range(100):
+        store.set("ue_ip", f"10.45.1.{i}")
+    store.set("gnb_running", True)
+    store.set("unwatched", 1)
+
+    assert len(idle_queue.calls) == 1
+    idle_queue.run()
+    assert seen == [("ue_ip", "10.45.1.99"), ("gnb_running", True)]
+    assert store.get("unwatched") == 1
+
+
+def test_unchanged_values_notify_only_when_forced(gui, idle_queue):
+    store = gui.StateStore()
+    seen = []
+    store.set("core_running", False)
+    store.subscribe("core_running", seen.append)
+    store.set("core_running", False)
+    assert idle_queue.run() == 0
+    store.set("core_running", False, force=True)
+    idle_queue.run()
+    assert seen == [False]
+
+
+def test_failing_subscriber_does_not_block_the_others(gui, idle_queue):
+    store = gui.StateStore()
+    seen = []
+    store.subscribe("k", lambda v: 1 / 0)
+    store.subscribe("k", seen.append)
+    store.set("k", 1)
+    idle_queue.run()
+    # The next change schedules a new flush
+    store.set("k", 2)
+    idle_queue.run()
+    assert seen == [1, 2]
+
+
+def test_closed_store_stops_notifying(gui, idle_queue):
+    store = gui.StateStore()
+    seen = []
+    store.subscribe("k", seen.append)
+    store.set("k", 1)
+    store.close()
+    store.set("k", 2)
+    idle_queue.run()
+    assert seen == [] and store.get("k") == 2
+
+
+def test_writers_on_many_threads(gui, idle_queue):
+    store = gui.StateStore()
+    seen = []
+    store.subscribe("counter", seen.append)
+
+    def writer(offset):
+        for i in range(500):
+            store.set("counter", offset + i)
+    threads = [threading.Thread(target=writer, args=(n * 1000,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    idle_queue.run()
+    assert seen == [store.get("counter")]
+    assert store.snapshot() == {"counter": store.get("counter")}
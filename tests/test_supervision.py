@@ -0,0 +1,33 @@
+def test_repeats_are_dropped_while_a_handler_is_outstanding(gui, idle_queue):
+    queue = gui.SupervisionQueue()
+    ran = []
+    assert queue.post("gnb", ran.append, 1)
+    assert not queue.post("gnb", ran.append, 2)
+    assert not queue.post("gnb", ran.append, 3)
+    assert queue.post("ue", ran.append, "ue")
+    assert queue.counts() == ({"gnb": 1, "ue": 1}, {"gnb": 2})
+
+    idle_queue.run()
+    assert ran == [1, "ue"]
+    # Once the handler has run, the key can be posted again
+    assert queue.post("gnb", ran.append, 4)
+    idle_queue.run()
+    assert ran == [1, "ue", 4]
+    assert queue.counts() == ({"gnb": 2, "ue": 1}, {"gnb": 2})
+
+
+def test_key_is_released_when_a_handler_fails(gui, idle_queue):
+    queue = gui.SupervisionQueue()
+    queue.post("core", lambda: 1 / 0)
+    idle_queue.run()
+    assert queue.post("core", lambda: None)
+
+
+def test_posting_from_a_running_handler_is_dropped(gui, idle_queue):
+    # A handler that blocks in a modal dialog keeps its key outstanding
+    queue = gui.SupervisionQueue()
+    results = []
+    queue.post("gnb", lambda: results.append(queue.post("gnb", lambda: None)))
+    idle_queue.run()
+    assert results == [False]
+    assert queue.counts()[1] == {"gnb": 1}
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+
+MIB = 2**20
+
+
+def manager(gui, usage, viewed):
+    tabs = gui.TabMemoryManager(10 * MIB)
+    tabs.usage = {key: (cost * MIB, 0) for key, cost in usage.items()}
+    tabs.last_viewed = dict(viewed)
+    return tabs
+
+
+def test_least_recently_viewed_tabs_go_first(gui):
+    tabs = manager(gui, {"core_logs": 4, "gnb_config": 4, "ue_bin": 4, "docker_stats": 2},
+                   {"core_logs": 30.0, "gnb_config": 10.0, "ue_bin": 20.0, "docker_stats": 40.0})
+    # 14 MiB against a 10 MiB budget: closing the oldest 4 MiB tab is enough
+    assert tabs.victims(protected=()) == ["gnb_config"]
+    tabs.budget = 5 * MIB
+    assert tabs.victims(protected=()) == ["gnb_config", "ue_bin", "core_logs"]
+
+
+def test_protected_tabs_are_never_closed_nor_budgeted(gui):
+    tabs = manager(gui, {"gnb": 500, "core_logs": 6, "ue_bin": 6}, {"gnb": 0.0, "core_logs": 2.0, "ue_bin": 1.0})
+    assert tabs.totals(protected={"gnb"}) == (12 * MIB, 500 * MIB)
+    assert tabs.victims(protected={"gnb"}) == ["ue_bin"]
+    # The tab on screen is kept even if it is the oldest
+    assert tabs.victims(protected={"gnb"}, keep={"ue_bin"}) == ["core_logs"]
+
+
+def test_within_budget_nothing_is_closed(gui):
+    tabs = manager(gui, {"a": 3, "b": 3}, {})
+    assert tabs.victims(protected=()) == []
+    # Never viewed counts as the oldest
+    tabs.touch("a")
+    tabs.budget = 4 * MIB
+    assert tabs.victims(protected=()) == ["b"]
+    tabs.forget("a")
+    assert "a" not in tabs.last_viewed
+
+
+def test_measure_counts_the_shell_and_its_children(gui):
+    child = subprocess.Popen([sys.executable, "-c", "import time; b = bytearray(32 * 2**20); time.sleep(30)"])
+    try:
+        usage = gui.TabMemoryManager.measure({"self": (1000, os.getpid()), "empty": (500, None)})
+        # The test process's tree includes the child
+        assert usage["empty"] == (500, 0)
+        assert usage["self"][0] == 1000 and usage["self"][1] > gui.process_tree_rss([child.pid])[child.pid] > 0
+    finally:
+        child.kill()
+        child.wait()
@@ -0,0 +1,63 @@
+import time
+
+
+class FakeTerminal:
+    """The bits of Vte.Terminal the pool's timing uses: screen text and 'contents-changed'."""
+    def __init__(self, kind="pooled", age=0.25):
+        self.text = "user@host:~$ "
+        self.handlers = {}
+        self.handed_out_at = (kind, time.perf_counter() - age)
+
+    def get_text(self, *args):
+        return (self.text, None)
+
+    def connect(self, signal_name, callback):
+        handler = len(self.handlers) + 1
+        self.handlers[handler] = callback
+        return handler
+
+    def disconnect(self, handler):
+        del self.handlers[handler]
+
+    def show(self, text):
+        self.text += text
+        for callback in list(self.handlers.values()):
+            callback(self)
+
+    def get_parent(self):
+        return None
+
+    def reset(self, *args):
+        self.text = ""
+
+    def feed_child(self, data):
+        pass
+
+
+def test_tab_is_timed_to_its_commands_first_output(gui):
+    pool = gui.TerminalPool(0)
+    terminal = FakeTerminal("fresh")
+    pool.measure_output(terminal, "ls -l ~/srsRAN_Project/build/ue\n")
+    terminal.show("ls -l ~/srsRAN_Project/build/ue\n")
+    # The echo of the command line alone is not output
+    assert not pool.first_output["fresh"]
+    terminal.show("total 12\n")
+    assert len(pool.first_output["fresh"]) == 1 and pool.first_output["fresh"][0] >= 0.25
+    assert not terminal.handlers
+
+    # Later commands in the same tab are not timed again
+    pool.measure_output(terminal, "ls\n")
+    terminal.show("ls\nfile\n")
+    assert len(pool.first_output["fresh"]) == 1
+    assert pool.stats()["fresh"][1] == pool.first_output["fresh"][0]
+    assert pool.stats()["pooled"] == (0, None)
+
+
+def test_released_tab_drops_its_pending_timing(gui, monkeypatch):
+    pool = gui.TerminalPool(1)
+    monkeypatch.setattr(pool, "at_prompt", lambda terminal, nested=False: True)
+    terminal = FakeTerminal()
+    pool.measure_output(terminal, "cat gnb_zmq.yaml\n")
+    assert pool.release(terminal)
+    terminal.show("cat gnb_zmq.yaml\ncell_cfg:\n")
+    assert not pool.first_output["pooled"] and not terminal.handlers
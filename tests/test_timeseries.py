@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+
+def test_lttb_keeps_endpoints_and_spikes(gui):
+    points = [(x, 0.0) for x in range(10_000)]
+    points[4321] = (4321, 100.0)
+    out = gui.lttb(points, 200)
+    assert len(out) == 200
+    assert out[0] == points[0] and out[-1] == points[-1]
+    assert (4321, 100.0) in out
+    assert gui.lttb(points[:50], 200) == points[:50]
+
+
+def test_rollups_keep_min_max_and_mean(gui):
+    store = gui.TimeSeriesStore(((0, 100), (10, 10)))
+    for t in range(25):
+        store.add("k", float(t), t % 10)
+    # Raw samples first; the coarse ring when the window no longer fits
+    assert len(store.rollups("k")) == 25
+    store.add("k", 25.0, 0)
+    assert store.rollups("k", max_points=1) == [(0.0, 0, 9, 4.5), (10.0, 0, 9, 4.5), (20.0, 0, 4, pytest.approx(10 / 6))]
+    assert store.rollups("missing") == []
+
+
+def test_raw_ring_wraps_around_and_falls_back_to_coarser_rings(gui):
+    store = gui.TimeSeriesStore(((0, 10), (5, 100)))
+    for t in range(30):
+        store.add("k", float(t), float(t))
+    # Only the last ten raw samples are left, so an older window reads the 5 s buckets
+    assert [ts for ts, _ in store.series("k", since=20.0)] == [float(t) for t in range(20, 30)]
+    assert [ts for ts, _ in store.series("k", since=0.0)] == [0.0, 5.0, 10.0, 15.0, 20.0, 25.0]
+    assert store.series("k", since=22.0, until=24.0) == [(22.0, 22.0), (23.0, 23.0), (24.0, 24.0)]
+
+
+def test_late_samples_never_unsort_a_ring(gui):
+    raw, buckets = gui.TimeSeriesStore(((0, 10),)), gui.TimeSeriesStore(((10, 10),))
+    for t, v in ((1.0, 1.0), (12.0, 2.0), (5.0, 9.0), (13.0, 4.0)):
+        raw.add("k", t, v)
+        buckets.add("k", t, v)
+    assert raw.series("k") == [(1.0, 1.0), (12.0, 2.0), (13.0, 4.0)]
+    # The late sample folds into the open 10 s bucket instead
+    assert buckets.rollups("k") == [(0.0, 1.0, 1.0, 1.0), (10.0, 2.0, 9.0, 5.0)]
+
+
+def test_series_is_downsampled_to_max_points(gui):
+    store = gui.TimeSeriesStore(((0, 2000),))
+    for t in range(1000):
+        store.add("k", float(t), float(t % 7))
+    out = store.series("k", max_points=50)
+    assert len(out) == 50 and out[0][0] == 0.0 and out[-1][0] == 999.0
+
+
+def test_concurrent_writers(gui):
+    store = gui.TimeSeriesStore(((0, 10_000), (1, 100)))
+
+    def writer(key):
+        for t in range(2000):
+            store.add(key, float(t), 1.0)
+    threads = [threading.Thread(target=writer, args=(k,)) for k in ("a", "b", "c", "d")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(store.keys()) == ["a", "b", "c", "d"]
+    assert all(len(store.series(k)) == 2000 for k in store.keys())